@@ -1,4 +1,11 @@
 import arcpy
+import os
+import sys
+
+# Columnar table reads from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Final_Project'))
+from analysis.columnar import ColumnarReader
+
 arcpy.env.workspace = r"C:\Users\benlj\OneDrive\Documents\School\SpringSemester2025\ProgrammingForGIS\ProgrammingLabs\ProgrammingLabs.gdb"
 arcpy.env.overwriteOutput = True
 arcpy.SelectLayerByAttribute_management("cities", "CLEAR_SELECTION")
@@ -17,12 +24,10 @@ my_cnt = arcpy.management.GetCount(flayer)
 print(f"Selected cities is: {my_cnt}")
 
 field = 'POP1990'
-total = 0
-i = 1
-with arcpy.da.SearchCursor(flayer, field) as cursor:
-    for row in cursor:
-        print(i, str(row[0]))
-        total = total + row[0]
-        i = i + 1
+# One columnar read of the selected cities instead of a row-by-row cursor
+populations = ColumnarReader(flayer, [field]).arrays()[field]
+for i, population in enumerate(populations.tolist(), 1):
+    print(i, str(population))
+total = populations.sum().item() if len(populations) else 0
 
 print(f"Total population is: {total:,}")
\ No newline at end of file
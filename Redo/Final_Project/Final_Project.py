@@ -1,8 +1,30 @@
 import logging
-import arcpy
 import os
+import time
+import numpy as np
 import yaml
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+try:
+    import arcpy
+except ImportError:
+    # Linux workers without ArcGIS can still run the analysis with geometry_backend: numpy
+    arcpy = None
 from etl.Assignment11_SpatialEtl import GSheetEtl
+from etl.geocoder_client import GeocoderClient
+from analysis.columnar import ColumnarReader
+from analysis.geometry_backend import geometry_backend
+from analysis.distance_index import DistanceIndex, build_distance_index, distance_index_path, fingerprint_func, \
+    refresh_avoid_distances, source_fingerprints
+from analysis.pipeline import Stage, StageCache
+from analysis.point_in_polygon import join_counts, read_points, read_polygons
+from analysis.raster_surface import RasterGrid, risk_surface, vectorize
+from analysis.tiling import make_tiles
+from analysis.rtree_index import address_index
+import instrumentation
+import intermediates
+from instrumentation import instrument
 """
 Final Project: West Nile Virus Outbreak Simulation
 GIS 3005
@@ -33,10 +55,14 @@ def setup():
     )
 
     logging.debug("Entered setup function")
+    instrumentation.configure(config, network_counter=lambda: GeocoderClient.requests_sent)
+    if geometry_backend(config).name != 'arcpy':
+        instrumentation.RUN.count_features = geometry_backend(config).feature_count
     logging.debug("Exited setup function")
     return config
 
 #Buffer Analysis
+@instrument(inputs=['layer_name'])
 def buffer_layer(layer_name, distance_ft, config_dict):
     """Buffers a given input layer by a specified distance.
 
@@ -54,17 +80,9 @@ def buffer_layer(layer_name, distance_ft, config_dict):
 
         # Define output name and path
         output_name = f"{layer_name}_buffer"
-        output_path = os.path.join(config_dict['destination'], output_name)
-        distance_str = f"{distance_ft} Feet"
+        output_path = intermediates.output_path(config_dict, output_name)
 
-        arcpy.Buffer_analysis(
-            in_features=layer_name,
-            out_feature_class=output_path,
-            buffer_distance_or_field=distance_str,
-            line_side="FULL",
-            line_end_type="ROUND",
-            dissolve_option="ALL"
-        )
+        geometry_backend(config_dict).buffer(layer_name, output_path, distance_ft)
 
         logging.info(f"Buffer created for {layer_name}")
         logging.debug(f'Exiting buffer_layer for {layer_name}')
@@ -75,8 +93,29 @@ def buffer_layer(layer_name, distance_ft, config_dict):
         logging.error(f'Error in buffer_layer: {e}')
         print('An error occurred in buffer_layer.')
 
+BUFFER_LAYERS = [
+    "Mosquito_Larval_Sites",
+    "Wetlands",
+    "Lakes_and_Reservoirs___Boulder_County",
+    "OSMP_Properties"
+]
+
+def prompt_buffer_distance():
+    """
+    Asks the user for the buffer distance until a valid number is entered.
+
+    Returns:
+        float: Buffer distance in feet.
+    """
+    while True:
+        try:
+            return float(input("Enter buffer distance in feet for all layers: "))
+        except ValueError:
+            print("Please enter a valid number.")
+
 #Loop through layers
-def buffer_loop(config_dict):
+@instrument()
+def buffer_loop(config_dict, distance=None, layers=None):
     """
     Prompts the user for a buffer distance and applies that buffer to a predefined list of layers.
 
@@ -85,29 +124,27 @@ def buffer_loop(config_dict):
 
     Args:
         config_dict (dict): Configuration dictionary containing project paths and workspace settings.
+        distance (float): Buffer distance in feet. The user is prompted if not given.
+        layers (list): Layers to buffer. Defaults to BUFFER_LAYERS.
 
     Returns:
         list: A list of paths to the buffered output feature classes.
     """
 
-    layers = [
-        "Mosquito_Larval_Sites",
-        "Wetlands",
-        "Lakes_and_Reservoirs___Boulder_County",
-        "OSMP_Properties"
-    ]
+    layers = layers or BUFFER_LAYERS
 
-    while True:
-        try:
-            distance = float(input("Enter buffer distance in feet for all layers: "))
-            break
-        except ValueError:
-            print("Please enter a valid number.")
+    if distance is None:
+        distance = prompt_buffer_distance()
 
     buffer_outputs = []
     try:
+        if config_dict.get('parallel_buffers', False) and geometry_backend(config_dict).name == 'arcpy':
+            return parallel_buffer_loop(layers, distance, config_dict)
+
         for layer in layers:
+            start = time.perf_counter()
             output_path = buffer_layer(layer, distance, config_dict)
+            logging.info(f'Buffered {layer} in {time.perf_counter() - start:.2f}s')
             buffer_outputs.append(output_path)
 
         logging.debug(f'Entered buffer_loop')
@@ -117,25 +154,93 @@ def buffer_loop(config_dict):
         logging.error(f'Error in buffer_loop: {e}')
         print('An error occurred in buffer_loop.')
 
+def buffer_layer_worker(layer_name, distance_ft, config_dict):
+    """
+    Runs buffer_layer in a worker process, writing to the worker's own scratch geodatabase
+    so parallel buffers never contend for locks on the project geodatabase.
+
+    Args:
+        layer_name (str): Name of the layer to buffer.
+        distance_ft (float): Buffer distance in feet.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        tuple: (layer name, path to the scratch output, seconds taken)
+    """
+    start = time.perf_counter()
+    scratch_dir = config_dict.get('scratch_dir') or os.path.join(config_dict['proj_dir'], 'scratch')
+    os.makedirs(scratch_dir, exist_ok=True)
+    scratch_gdb = os.path.join(scratch_dir, f'{layer_name}.gdb')
+    if not arcpy.Exists(scratch_gdb):
+        arcpy.management.CreateFileGDB(scratch_dir, f'{layer_name}.gdb')
+
+    # Inputs are read from the project geodatabase, output goes to scratch (never to this
+    # process's memory workspace, which goes away with the worker)
+    arcpy.env.workspace = config_dict['destination']
+    arcpy.env.overwriteOutput = True
+    output_path = buffer_layer(layer_name, distance_ft,
+                               dict(config_dict, destination=scratch_gdb, intermediate_storage='destination'))
+    if output_path is None:
+        raise RuntimeError(f'Buffer failed for {layer_name}')
+
+    return layer_name, output_path, time.perf_counter() - start
+
+def parallel_buffer_loop(layers, distance, config_dict):
+    """
+    Buffers the layers in a process pool and copies the results into the project geodatabase.
+
+    Args:
+        layers (list): Layer names to buffer.
+        distance (float): Buffer distance in feet.
+        config_dict (dict): Configuration dictionary, `buffer_workers` sets the pool size.
+
+    Returns:
+        list: Paths to the buffered feature classes in `destination`, in the same order as layers.
+    """
+    logging.debug('Entered parallel_buffer_loop')
+    start = time.perf_counter()
+    workers = min(int(config_dict.get('buffer_workers', 4)), len(layers))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() returns results in the order of layers, so intersect_buffers sees the same list
+        results = list(pool.map(buffer_layer_worker, layers, repeat(distance), repeat(config_dict)))
+
+    backend = geometry_backend(config_dict)
+    buffer_outputs = []
+    for layer, scratch_path, seconds in results:
+        output_path = intermediates.output_path(config_dict, f'{layer}_buffer')
+        backend.copy(scratch_path, output_path)
+        buffer_outputs.append(output_path)
+        logging.info(f'Buffered {layer} in {seconds:.2f}s (worker)')
+
+    elapsed = time.perf_counter() - start
+    serial = sum(seconds for _, _, seconds in results)
+    logging.info(f'Parallel buffers took {elapsed:.2f}s for {serial:.2f}s of work '
+                 f'({serial / elapsed:.1f}x speedup with {workers} workers)')
+    return buffer_outputs
+
 #Intersect Analysis
-def intersect_buffers(buffer_outputs, config_dict):
+@instrument(inputs=['buffer_outputs'])
+def intersect_buffers(buffer_outputs, config_dict, output_name=None):
     """
       Intersects multiple buffered feature layers into a single feature class.
 
       Args:
           buffer_outputs (list): List of buffered feature class paths.
           config_dict (dict): Configuration dictionary with output destination.
+          output_name (str): Name of the output layer. The user is prompted if not given.
 
       Returns:
           str: Path to the output intersected feature class.
       """
 
-    output_name = input("Enter name for the intersect output layer: ")
-    output_path = os.path.join(config_dict['destination'], output_name)
+    if output_name is None:
+        output_name = input("Enter name for the intersect output layer: ")
+    output_path = intermediates.output_path(config_dict, output_name)
 
     logging.info("Running intersect on buffer layers...")
     try:
-        arcpy.Intersect_analysis(in_features=buffer_outputs, out_feature_class=output_path)
+        geometry_backend(config_dict).intersect(buffer_outputs, output_path)
 
         logging.info(f"Intersect complete: {output_path}")
         logging.debug(f"Exiting Intersect")
@@ -146,7 +251,110 @@ def intersect_buffers(buffer_outputs, config_dict):
         logging.error(f'Error in intersect_buffers: {e}')
         print('An error occurred in intersect_buffers.')
 
+#NumPy point-in-polygon join
+def numpy_spatial_join(target_layer, join_layer, output_path, config_dict):
+    """
+    Vectorized stand-in for a KEEP_COMMON / INTERSECT spatial join of points to polygons.
+
+    Reads the point coordinates and polygon rings into NumPy arrays, classifies every point
+    with a crossing-number test and copies only the matched points to the output with a
+    Join_Count field, the same as SpatialJoin would produce.
+
+    Args:
+        target_layer (str): Point layer to classify (e.g. Addresses).
+        join_layer (str): Polygon layer to test against.
+        output_path (str): Output feature class path.
+        config_dict (dict): Configuration dictionary, `xy_tolerance` sets the boundary tolerance.
+
+    Returns:
+        str: Path to the output feature class.
+    """
+    logging.debug(f'Entered numpy_spatial_join for {target_layer}')
+
+    desc = arcpy.Describe(target_layer)
+    polygons = read_polygons(join_layer, desc.spatialReference)
+    tolerance = float(config_dict.get('xy_tolerance', 0.001))
+
+    if config_dict.get('spatial_index', False):
+        # Only the points under each polygon's envelope are read from the index
+        tree = address_index(config_dict, target_layer)
+        counts = Counter()
+        for rings in polygons:
+            counts.update(tree.polygon_query(rings, tolerance).tolist())
+        matched = dict(sorted(counts.items()))
+        total = len(tree.oids)
+    else:
+        oids, x, y = read_points(target_layer)
+        counts = join_counts(x, y, polygons, tolerance)
+        matched = dict(zip(oids[counts > 0].tolist(), counts[counts > 0].tolist()))
+        total = len(oids)
+    logging.info(f'Point-in-polygon matched {len(matched)} of {total} points')
+
+    geometry_backend(config_dict).select(target_layer, list(matched), output_path, counts=list(matched.values()))
+
+    logging.debug(f'Exiting numpy_spatial_join')
+    return output_path
+
+# Spatial joins already run in this process, keyed on their inputs and options
+_join_memo = {}
+
+def memoized_spatial_join(target_layer, join_layer, output_path, config_dict,
+                          join_type="KEEP_COMMON", match_option="INTERSECT"):
+    """
+    Runs a spatial join once per distinct set of inputs and options and copies the result
+    for any later request.
+
+    main() joins Addresses against the same cleaned risk zone twice (Addresses_At_Risk and
+    Target_Addresses). The second request finds the first output in the memo and is served
+    with a feature class copy instead of another join. The key includes both row counts and
+    the join layer's extent, so rewritten inputs are joined again.
+
+    Args:
+        target_layer (str): Target features (e.g. Addresses).
+        join_layer (str): Join features (the risk zone).
+        output_path (str): Output feature class path.
+        config_dict (dict): Configuration dictionary.
+        join_type (str): SpatialJoin join type.
+        match_option (str): SpatialJoin match option.
+
+    Returns:
+        str: Path to the output feature class.
+    """
+    backend = geometry_backend(config_dict)
+    key = (
+        backend.name, str(target_layer), str(join_layer), join_type, match_option,
+        config_dict.get('join_engine', 'arcpy'), config_dict.get('xy_tolerance', 0.001),
+        backend.count(target_layer), backend.count(join_layer),
+        tuple(round(float(value), 6) for value in backend.extent(join_layer))
+    )
+
+    previous = _join_memo.get(key)
+    if previous and backend.exists(previous):
+        if os.path.normcase(previous) != os.path.normcase(output_path):
+            backend.copy(previous, output_path)
+        logging.info(f'Reused spatial join result {previous} for {output_path}')
+        return output_path
+
+    common_intersect = join_type == "KEEP_COMMON" and match_option == "INTERSECT"
+    if backend.name != 'arcpy':
+        if not common_intersect:
+            raise ValueError(f'The {backend.name} backend only supports KEEP_COMMON / INTERSECT joins')
+        backend.join(target_layer, join_layer, output_path)
+    elif config_dict.get('join_engine') == 'numpy' and common_intersect:
+        numpy_spatial_join(target_layer, join_layer, output_path, config_dict)
+    else:
+        arcpy.analysis.SpatialJoin(
+            target_features=target_layer,
+            join_features=join_layer,
+            out_feature_class=output_path,
+            join_type=join_type,
+            match_option=match_option
+        )
+    _join_memo[key] = output_path
+    return output_path
+
 #Spatial Join Intersect and Addresses
+@instrument(inputs=['intersect_layer'])
 def spatial_join(intersect_layer, config_dict):
     """
      Performs a spatial join between the address layer and a high-risk zone layer.
@@ -160,18 +368,11 @@ def spatial_join(intersect_layer, config_dict):
      """
     address_layer = 'Addresses'
     output_name = "Addresses_At_Risk"
-    output_path = os.path.join(config_dict['destination'], output_name)
+    output_path = intermediates.output_path(config_dict, output_name)
 
     logging.debug("Running spatial join between addresses and intersected risk zone...")
     try:
-
-        arcpy.analysis.SpatialJoin(
-            target_features=address_layer,
-            join_features=intersect_layer,
-            out_feature_class=output_path,
-            join_type="KEEP_COMMON",          # Keep all addresses
-            match_option="INTERSECT"
-        )
+        memoized_spatial_join(address_layer, intersect_layer, output_path, config_dict)
 
         logging.info(f"Spatial join complete: {output_path}")
         logging.debug(f'Exiting Spatial Join')
@@ -180,26 +381,49 @@ def spatial_join(intersect_layer, config_dict):
     except Exception as e:
         logging.error(f'Error in spatial_join: {e}')
         print('An error occurred in spatial_join.')
-def count_at_risk_addresses(joined_fc):
+def count_at_risk_addresses(joined_fc, zone_layer=None, config_dict=None):
     """
       Counts and logs the number of addresses that fall within the joined high-risk area.
 
+      With `spatial_index` in the config and a zone layer given, the count comes from the
+      Addresses R-tree instead of scanning the joined output.
+
       Args:
           joined_fc (str): Path to the spatially joined feature class.
+          zone_layer (str): Optional risk zone polygon layer for the indexed count.
+          config_dict (dict): Optional configuration dictionary.
+
+      Returns:
+          int: Number of addresses in the risk zone.
       """
     try:
-        count = 0
-        with arcpy.da.SearchCursor(joined_fc, ["Join_Count"]) as cursor:
-            for row in cursor:
-                if row[0] and row[0] >= 1:
-                    count += 1
+        if config_dict and geometry_backend(config_dict).name != 'arcpy':
+            # Joined outputs of the numpy backend only hold the matched addresses
+            count = geometry_backend(config_dict).count(joined_fc)
+            logging.info(f"Number of addresses within the risk zone: {count}")
+            return count
+
+        if zone_layer and config_dict and config_dict.get('spatial_index', False):
+            tree = address_index(config_dict)
+            polygons = read_polygons(zone_layer, arcpy.Describe('Addresses').spatialReference)
+            tolerance = float(config_dict.get('xy_tolerance', 0.001))
+            inside = set()
+            for rings in polygons:
+                inside.update(tree.polygon_query(rings, tolerance).tolist())
+            logging.info(f"Number of addresses within the risk zone: {len(inside)}")
+            return len(inside)
+
+        # Filter pushed down to the table read; only matching rows are counted
+        count = ColumnarReader(joined_fc, ["Join_Count"], where_clause="Join_Count >= 1").count()
         logging.info(f"Number of addresses within the risk zone: {count}")
+        return count
 
     except Exception as e:
         logging.error(f'Error in count_at_risk_addresses: {e}')
         print('An error occurred in count_at_risk_addresses.')
 
 #ETL Function
+@instrument(count_output=False)
 def etl(config_dict):
     """
         Runs the ETL (Extract, Transform, Load) process using the GSheetEtl class.
@@ -218,6 +442,7 @@ def etl(config_dict):
         print('An error occurred in etl.')
 
 #Erase Function
+@instrument(inputs=['intersect_fc'])
 def erase_avoid_zones(intersect_fc, config_dict):
     """
      Removes areas around sensitive locations (e.g. schools) from the risk zone layer.
@@ -229,15 +454,11 @@ def erase_avoid_zones(intersect_fc, config_dict):
         Returns:
             str: Path to the cleaned risk zone feature class after erasing avoid areas.
         """
-    avoid_buffer = os.path.join(config_dict['destination'],'Avoid_Points_buffer')
+    avoid_buffer = config_dict.get('avoid_buffer') or os.path.join(config_dict['destination'],'Avoid_Points_buffer')
     output_name = 'Risk_Zone_Cleaned'
-    output_path = os.path.join(config_dict['destination'], output_name)
+    output_path = intermediates.output_path(config_dict, output_name)
     try:
-        arcpy.analysis.Erase(
-            in_features=intersect_fc,
-            erase_features=avoid_buffer,
-            out_feature_class=output_path
-        )
+        geometry_backend(config_dict).erase(intersect_fc, avoid_buffer, output_path)
         logging.info(f"Erase complete")
         logging.debug('Analysis Complete!')
 
@@ -247,6 +468,7 @@ def erase_avoid_zones(intersect_fc, config_dict):
         logging.error(f'Error in erase_avoid_zones: {e}')
         print('An error occurred in erase_avoid_zones.')
 
+@instrument(inputs=['cleaned_layer'])
 def spatial_join_to_final(cleaned_layer, config_dict):
     """
     Performs a spatial join between addresses and the cleaned risk zone to get final targets.
@@ -259,41 +481,321 @@ def spatial_join_to_final(cleaned_layer, config_dict):
         str: Path to the output feature class with only target addresses.
     """
     output_name = "Target_Addresses"
-    output_path = os.path.join(config_dict['destination'], output_name)
+    output_path = intermediates.output_path(config_dict, output_name)
     try:
-
-        arcpy.analysis.SpatialJoin(
-            target_features="Addresses",
-            join_features=cleaned_layer,
-            out_feature_class=output_path,
-            join_type="KEEP_COMMON",
-            match_option="INTERSECT"
-        )
-
-        return output_path
+        # Same inputs and options as spatial_join, so this is normally a copy of its result
+        return memoized_spatial_join("Addresses", cleaned_layer, output_path, config_dict)
     except Exception as e:
         logging.error(f"Error in spatial_join_to_final: {e}")
         print("An error occurred in spatial_join_to_final.")
 
-def exportMap(config_dict):
+#Cached pipeline
+def build_pipeline(config_dict, distance, intersect_name):
+    """
+    Describes the analysis chain as stages for the stage cache.
+
+    Args:
+        config_dict (dict): Configuration dictionary.
+        distance (float): Buffer distance in feet.
+        intersect_name (str): Name of the intersect output layer.
+
+    Returns:
+        list: Stage objects from buffers to the final join.
+    """
+    avoid_buffer = os.path.join(config_dict['destination'], 'Avoid_Points_buffer')
+    join_params = {'engine': config_dict.get('join_engine', 'arcpy'),
+                   'tolerance': config_dict.get('xy_tolerance', 0.001)}
+
+    stages = [
+        Stage(f'buffer_{layer}', lambda layer, distance: buffer_layer(layer, distance, config_dict),
+              [layer], {'distance': distance})
+        for layer in BUFFER_LAYERS
+    ]
+    stages += [
+        Stage('intersect',
+              lambda *buffers, output_name: intersect_buffers(list(buffers), config_dict, output_name),
+              [f'buffer_{layer}' for layer in BUFFER_LAYERS], {'output_name': intersect_name}),
+        Stage('erase', lambda intersect_fc, avoid: erase_avoid_zones(intersect_fc, config_dict),
+              ['intersect', avoid_buffer]),
+        Stage('spatial_join', lambda zone, addresses, **params: spatial_join(zone, config_dict),
+              ['erase', 'Addresses'], join_params),
+        Stage('final_join', lambda zone, addresses, **params: spatial_join_to_final(zone, config_dict),
+              ['erase', 'Addresses'], join_params),
+    ]
+    return stages
+
+def run_cached_pipeline(config_dict, distance, intersect_name):
+    """
+    Runs buffer -> intersect -> erase -> joins through the stage cache, so only stages whose
+    inputs or parameters changed are recomputed. For example, a new avoid-point sheet only
+    reruns the erase and the joins.
+
+    Args:
+        config_dict (dict): Configuration dictionary.
+        distance (float): Buffer distance in feet.
+        intersect_name (str): Name of the intersect output layer.
+
+    Returns:
+        dict: Stage name mapped to output path.
+    """
+    backend = geometry_backend(config_dict)
+    if backend.name == 'arcpy':
+        cache = StageCache(os.path.join(config_dict['proj_dir'], 'stage_cache.json'))
+    else:
+        cache = StageCache(os.path.join(config_dict['proj_dir'], f'stage_cache_{backend.name}.json'),
+                           fingerprint_func=backend.fingerprint, exists_func=backend.exists)
+    outputs = cache.run(build_pipeline(config_dict, distance, intersect_name))
+    print(f'Stages reused: {", ".join(cache.hits) or "none"}')
+    print(f'Stages run: {", ".join(cache.misses) or "none"}')
+    return outputs
+
+#Tiled processing
+def tile_workspace(config_dict, tile):
+    """
+    Creates a tile's scratch workspace: a file geodatabase for arcpy, a folder for numpy.
+
+    Returns:
+        str: Workspace path.
+    """
+    scratch_dir = config_dict.get('scratch_dir') or os.path.join(config_dict['proj_dir'], 'scratch')
+    os.makedirs(scratch_dir, exist_ok=True)
+    if geometry_backend(config_dict).name != 'arcpy':
+        workspace = os.path.join(scratch_dir, tile.name)
+        os.makedirs(workspace, exist_ok=True)
+        return workspace
+    workspace = os.path.join(scratch_dir, f'{tile.name}.gdb')
+    if not arcpy.Exists(workspace):
+        arcpy.management.CreateFileGDB(scratch_dir, f'{tile.name}.gdb')
+    return workspace
+
+def tile_worker(tile, distance, config_dict):
+    """
+    Runs buffer, intersect and erase for one tile in a worker process.
+
+    Inputs are clipped to the tile's padded extent into the tile's own scratch workspace, the
+    chain runs there, and the cleaned zone is cut back to the tile's core. Addresses are
+    tested against it only if the tile owns them.
+
+    Args:
+        tile (Tile): Tile to process.
+        distance (float): Buffer distance in feet.
+        config_dict (dict): Configuration dictionary.
+
+    Returns:
+        tuple: (tile name, path to the core risk zone, matched address OIDs, seconds taken)
+    """
+    start = time.perf_counter()
+    source = config_dict['destination']
+    workspace = tile_workspace(config_dict, tile)
+    tile_config = dict(config_dict, destination=workspace, parallel_buffers=False, avoid_buffer=None)
+    backend = geometry_backend(tile_config)
+    spatial_ref = None
+    if backend.name == 'arcpy':
+        arcpy.env.overwriteOutput = True
+        spatial_ref = arcpy.Describe(os.path.join(source, 'Addresses')).spatialReference
+
+    for layer in BUFFER_LAYERS + ['avoid_points']:
+        backend.clip(os.path.join(source, layer), tile.padded, os.path.join(workspace, layer), spatial_ref)
+    if backend.name == 'arcpy':
+        arcpy.env.workspace = workspace
+
+    backend.buffer('avoid_points', os.path.join(workspace, 'Avoid_Points_buffer'), 1500)
+    buffer_outputs = buffer_loop(tile_config, distance)
+    intersect_result = intersect_buffers(buffer_outputs, tile_config, 'Intersect_tile')
+    cleaned_result = erase_avoid_zones(intersect_result, tile_config)
+    if cleaned_result is None:
+        raise RuntimeError(f'Analysis failed for {tile.name}')
+    zone = backend.clip(cleaned_result, tile.core, os.path.join(workspace, 'Risk_Zone_Tile'), spatial_ref)
+
+    oids, x, y = backend.points(os.path.join(source, 'Addresses'), spatial_ref)
+    owned = np.nonzero(tile.owns(x, y))[0]
+    tolerance = float(config_dict.get('xy_tolerance', 0.001))
+    inside = backend.contains(zone, x[owned], y[owned], spatial_ref, tolerance)
+    return tile.name, zone, oids[owned][inside], time.perf_counter() - start
+
+@instrument(count_output=False)
+def tiled_pipeline(config_dict, distance):
+    """
+    Splits the address extent into `tile_rows` x `tile_cols` tiles padded by the buffer
+    distance and runs each in a process pool, then merges the results: the per-tile zones are
+    merged and dissolved across the seams into Risk_Zone_Cleaned, and the matched addresses
+    are de-duplicated by OID into Addresses_At_Risk and Target_Addresses.
+
+    Args:
+        config_dict (dict): Configuration dictionary, `tile_workers` sets the pool size.
+        distance (float): Buffer distance in feet.
+
+    Returns:
+        tuple: (Risk_Zone_Cleaned, Addresses_At_Risk, Target_Addresses) paths.
+    """
+    logging.debug('Entered tiled_pipeline')
+    try:
+        start = time.perf_counter()
+        backend = geometry_backend(config_dict)
+        feet = 1.0
+        if backend.name == 'arcpy':
+            feet = 0.3048 / arcpy.Describe('Addresses').spatialReference.metersPerUnit
+        # Everything that can affect the zone inside a core lies within this distance of it
+        padding = max(float(distance), 1500.0) * feet
+        tiles = make_tiles(backend.extent('Addresses'), config_dict.get('tile_rows', 2),
+                           config_dict.get('tile_cols', 2), padding)
+        workers = min(int(config_dict.get('tile_workers', 4)), len(tiles))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(tile_worker, tiles, repeat(distance), repeat(config_dict)))
+
+        for name, zone, matched, seconds in results:
+            logging.info(f'{name}: {len(matched)} target addresses in {seconds:.2f}s (worker)')
+        oids = np.unique(np.concatenate([matched for _, _, matched, _ in results]))
+        instrumentation.annotate(output_count=len(oids), tiles=len(tiles))
+
+        destination = config_dict['destination']
+        merged = backend.merge([zone for _, zone, _, _ in results], os.path.join(destination, 'Risk_Zone_Tiles'))
+        cleaned_result = backend.dissolve(merged, os.path.join(destination, 'Risk_Zone_Cleaned'))
+        joined_result = backend.select('Addresses', oids, os.path.join(destination, 'Addresses_At_Risk'))
+        target_result = backend.copy(joined_result, os.path.join(destination, 'Target_Addresses'))
+
+        elapsed = time.perf_counter() - start
+        serial = sum(seconds for _, _, _, seconds in results)
+        logging.info(f'Tiled run took {elapsed:.2f}s for {serial:.2f}s of work '
+                     f'({serial / elapsed:.1f}x speedup with {workers} workers)')
+        logging.debug('Exiting tiled_pipeline')
+        return cleaned_result, joined_result, target_result
+
+    except Exception as e:
+        logging.error(f'Error in tiled_pipeline: {e}')
+        print('An error occurred in tiled_pipeline.')
+
+#Raster risk surface
+@instrument(count_output=False)
+def raster_pipeline(config_dict, distance):
+    """
+    Raster version of buffer_loop -> intersect_buffers -> erase_avoid_zones and the joins.
+
+    Burns the breeding-site layers and the avoid points into a grid of `raster_cell_size_ft`
+    cells over the address extent, buffers them with a distance transform, ANDs the buffers,
+    masks out the avoid zones and classifies the addresses by cell. With `raster_vectorize`
+    the final mask is also written out as the Risk_Zone_Cleaned polygon.
+
+    Args:
+        config_dict (dict): Configuration dictionary.
+        distance (float): Buffer distance in feet.
+
+    Returns:
+        tuple: (cleaned risk zone or None, Addresses_At_Risk, Target_Addresses) paths.
+    """
+    logging.debug('Entered raster_pipeline')
+    try:
+        backend = geometry_backend(config_dict)
+        spatial_ref = arcpy.Describe('Addresses').spatialReference if backend.name == 'arcpy' else None
+        feet = 0.3048 / spatial_ref.metersPerUnit if spatial_ref else 1.0
+
+        oids, x, y = backend.points('Addresses', spatial_ref)
+        avoid_distance = 1500 * feet
+        cell = float(config_dict.get('raster_cell_size_ft', 50)) * feet
+        grid = RasterGrid.covering((x.min(), y.min(), x.max(), y.max()), cell,
+                                   max(distance * feet, avoid_distance))
+        logging.info(f'Raster grid of {grid.rows} x {grid.cols} cells of {cell:.1f} units')
+
+        layers = [backend.features(layer, spatial_ref) for layer in BUFFER_LAYERS]
+        avoid_points, _ = backend.features('avoid_points', spatial_ref)
+        _, cleaned = risk_surface(grid, layers, distance * feet, avoid_points, avoid_distance)
+        inside = grid.lookup(cleaned, x, y)
+        instrumentation.annotate(input_count=len(oids), output_count=int(inside.sum()),
+                                 cells=grid.rows * grid.cols)
+
+        joined_result = backend.select('Addresses', oids[inside],
+                                       os.path.join(config_dict['destination'], 'Addresses_At_Risk'))
+        target_result = backend.copy(joined_result, os.path.join(config_dict['destination'], 'Target_Addresses'))
+
+        cleaned_result = None
+        if config_dict.get('raster_vectorize', False):
+            cleaned_result = backend.write_rings(vectorize(grid, cleaned),
+                                                 os.path.join(config_dict['destination'], 'Risk_Zone_Cleaned'),
+                                                 spatial_ref)
+        logging.debug('Exiting raster_pipeline')
+        return cleaned_result, joined_result, target_result
+
+    except Exception as e:
+        logging.error(f'Error in raster_pipeline: {e}')
+        print('An error occurred in raster_pipeline.')
+
+#What-if buffer distances
+def distance_sweep(config_dict, distances, refresh_avoid=False):
+    """
+    Counts target addresses over a range of buffer distances without rerunning any buffers.
+
+    Loads the per-address distance index, then writes the target-count-vs-distance curve to
+    target_curve.csv in the project directory. The index is built on first use and rebuilt
+    when Addresses or a breeding-site layer has changed since it was measured; if only
+    avoid_points changed, just the avoid distances are re-measured.
+
+    Args:
+        config_dict (dict): Configuration dictionary.
+        distances (list): Buffer distances in feet.
+        refresh_avoid (bool): Re-measure distances to avoid_points even if it looks unchanged.
+
+    Returns:
+        list: (distance, count) pairs.
+    """
+    logging.debug('Entered distance_sweep')
+    try:
+        backend = geometry_backend(config_dict)
+        if backend.name == 'arcpy':
+            arcpy.env.workspace = config_dict['destination']
+        index_path = distance_index_path(config_dict)
+        index = DistanceIndex.load(index_path) if os.path.exists(index_path) else None
+        if index is not None:
+            stale = index.stale_layers(source_fingerprints(BUFFER_LAYERS, fingerprint_func=fingerprint_func(backend)))
+            if set(stale) - {'avoid_points'} or index.layers != BUFFER_LAYERS:
+                logging.info(f'{", ".join(stale) or "The layer list"} changed since the distance index was built, '
+                             f'rebuilding')
+                index = None
+            elif refresh_avoid or stale:
+                refresh_avoid_distances(index, backend=backend)
+                index.save(index_path)
+        if index is None:
+            index = build_distance_index(config_dict, BUFFER_LAYERS, backend=backend)
+
+        curve = index.count_curve(distances)
+        curve_path = os.path.join(config_dict['proj_dir'], 'target_curve.csv')
+        index.write_curve_csv(curve_path, distances)
+        for distance, count in curve:
+            print(f'{distance:>10.0f} ft: {count} target addresses')
+        logging.info(f'Target curve written to {curve_path}')
+        return curve
+
+    except Exception as e:
+        logging.error(f'Error in distance_sweep: {e}')
+        print('An error occurred in distance_sweep.')
+
+@instrument(count_output=False)
+def exportMap(config_dict, subtitle=None, output_pdf=None, aprx_path=None):
     """
         Prompts for a map subtitle, updates the layout, and exports it as a PDF.
 
         Args:
             config_dict (dict): Configuration dictionary containing the project directory.
+            subtitle (str): Map subtitle. Taken from `map_subtitle` in the config, or prompted for.
+            output_pdf (str): PDF path. Defaults to WestNileOutbreakMap.pdf in the project directory.
+            aprx_path (str): Project to export. Defaults to Programming_Lab1.aprx in the project directory.
         """
     logging.debug("Entered exportMap function")
 
     try:
         # Get project
-        aprx_path = os.path.join(config_dict['proj_dir'], 'Programming_Lab1.aprx')
+        if aprx_path is None:
+            aprx_path = os.path.join(config_dict['proj_dir'], 'Programming_Lab1.aprx')
         aprx = arcpy.mp.ArcGISProject(aprx_path)
 
         # Get layout
         lyt = aprx.listLayouts('Layout3')[0]
 
         # Ask for user subtitle
-        subtitle = input("Enter a subtitle for your map layout: ")
+        if subtitle is None:
+            subtitle = config_dict.get('map_subtitle')
+        if subtitle is None:
+            subtitle = input("Enter a subtitle for your map layout: ")
 
         # Update the title element
         for elm in lyt.listElements("TEXT_ELEMENT"):
@@ -303,7 +805,8 @@ def exportMap(config_dict):
                 logging.info(f"Updated map title with subtitle: {subtitle}")
 
         # Export the layout to a PDF
-        output_pdf = os.path.join(config_dict['proj_dir'], 'WestNileOutbreakMap.pdf')
+        if output_pdf is None:
+            output_pdf = os.path.join(config_dict['proj_dir'], 'WestNileOutbreakMap.pdf')
         lyt.exportToPDF(output_pdf)
 
         logging.info(f"Exported map to PDF at: {output_pdf}")
@@ -331,30 +834,73 @@ def main(config_dict):
         logging.info("Starting West Nile Virus Simulation")
 
         # Set workspace
-        arcpy.env.workspace = config_dict['destination']
-        arcpy.env.overwriteOutput = True
+        backend = geometry_backend(config_dict)
+        if backend.name == 'arcpy':
+            arcpy.env.workspace = config_dict['destination']
+            arcpy.env.overwriteOutput = True
+
+        # Run geoprocessing
+        # Values in the config make the run headless; missing ones are prompted for
+        distance = config_dict.get('buffer_distance')
+        intersect_name = config_dict.get('intersect_name')
+        if config_dict.get('analysis_engine') == 'raster':
+            if distance is None:
+                distance = prompt_buffer_distance()
+            cleaned_result, joined_result, target_result = raster_pipeline(config_dict, distance)
+            intersect_result = cleaned_result
+            count_at_risk_addresses(joined_result, None, config_dict)
+        elif config_dict.get('tiling', False):
+            if distance is None:
+                distance = prompt_buffer_distance()
+            cleaned_result, joined_result, target_result = tiled_pipeline(config_dict, distance)
+            intersect_result = cleaned_result
+            count_at_risk_addresses(joined_result, None, config_dict)
+        elif config_dict.get('stage_cache', False):
+            if distance is None:
+                distance = prompt_buffer_distance()
+            if intersect_name is None:
+                intersect_name = input("Enter name for the intersect output layer: ")
+            outputs = run_cached_pipeline(config_dict, distance, intersect_name)
+            intersect_result = outputs['intersect']
+            cleaned_result = outputs['erase']
+            joined_result = outputs['spatial_join']
+            target_result = outputs['final_join']
+            count_at_risk_addresses(joined_result, cleaned_result, config_dict)
+        else:
+            buffer_outputs = buffer_loop(config_dict, distance)
+            intersect_result = intersect_buffers(buffer_outputs, config_dict, intersect_name)
+            intermediates.release(buffer_outputs)
+            cleaned_result = erase_avoid_zones(intersect_result, config_dict)
+            joined_result = spatial_join(cleaned_result, config_dict)
+            count_at_risk_addresses(joined_result, cleaned_result, config_dict)
+
+            target_result = spatial_join_to_final(cleaned_result, config_dict)
+
+        placements = intermediates.summary()
+        if placements and config_dict.get('intermediate_storage', 'destination') != 'destination':
+            for name, placement in placements.items():
+                logging.info(f"{name}: {placement['storage']} (resident memory {placement['rss_mb']} MB)")
+            instrumentation.add_section('intermediates', placements)
+
+        if backend.name != 'arcpy' or cleaned_result is None:
+            # Region outputs and unvectorized rasters cannot be drawn; the map is left to a vector run
+            print(f'Target addresses written to {target_result}')
+            return
 
         # Load map
         project_path = os.path.join(config_dict['proj_dir'], 'Programming_Lab1.aprx')
         project = arcpy.mp.ArcGISProject(project_path)
         map_obj = project.listMaps()[0]
 
-        # Run geoprocessing
-        buffer_outputs = buffer_loop(config_dict)
-        intersect_result = intersect_buffers(buffer_outputs, config_dict)
-        cleaned_result = erase_avoid_zones(intersect_result, config_dict)
-        joined_result = spatial_join(cleaned_result, config_dict)
-        count_at_risk_addresses(joined_result)
-
-        target_result = spatial_join_to_final(cleaned_result, config_dict)
         map_obj.addDataFromPath(target_result)
 
         target_layer = map_obj.listLayers("Target_Addresses")[0]
         target_layer.definitionQuery = "Join_Count = 1"
 
-        map_obj.addDataFromPath(intersect_result)
-        map_obj.addDataFromPath(joined_result)
-        map_obj.addDataFromPath(target_result)
+        # Layers kept in memory or scratch would be gone the next time the project opens
+        for result in (intersect_result, joined_result, target_result):
+            if intermediates.is_persistent(config_dict, result):
+                map_obj.addDataFromPath(result)
 
         final_layer = map_obj.listLayers("Risk_Zone_Cleaned")[0]
 
@@ -377,8 +923,14 @@ if __name__ == '__main__':
         config_dict = setup()
         logging.debug(f"Loaded config: {config_dict}")
         etl(config_dict)
+        if config_dict.get('distance_sweep'):
+            distance_sweep(config_dict, config_dict['distance_sweep'])
         main(config_dict)
-        exportMap(config_dict)
+        if geometry_backend(config_dict).name == 'arcpy':
+            exportMap(config_dict)
+        if instrumentation.RUN.enabled:
+            instrumentation.write_report(os.path.join(config_dict['proj_dir'], 'run_report.json'))
+            print(instrumentation.summary_table())
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         print("An error occurred. Check the log file for details.")
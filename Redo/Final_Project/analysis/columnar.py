@@ -0,0 +1,231 @@
+"""
+Columnar reads of table fields into NumPy arrays.
+
+Replaces Python loops over arcpy.da.SearchCursor that only count, sum or compare values.
+Rows are read in chunks of object IDs in a single pass over the table so memory stays bounded,
+and the where clause is passed down to the backend so filtered rows never reach Python.
+aggregate() computes several statistics from that one pass.
+
+Nulls are left out: a row with a null in any of the requested fields is skipped, so counts,
+sums, minimums and means only cover real values. Pass null_value to a backend to read nulls
+as that value instead.
+
+Two backends are provided: ArcpyBackend for feature classes, tables and layers, and
+MemoryBackend, a pure-Python backend over in-memory columns used for testing without arcpy.
+"""
+import operator
+import re
+
+import numpy as np
+
+OPERATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '<>': operator.ne,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class ArcpyBackend:
+    """
+    Reads chunks with arcpy.da.TableToNumPyArray, one object ID range per chunk.
+
+    The first and last object IDs come from two one-row ORDER BY reads, so the table itself
+    is only scanned once, by the chunk reads.
+
+    Attributes:
+        source (str): Feature class, table or layer. Layer selections are honoured.
+        null_value (int/float): Value to read nulls as, or None (the default) to skip rows
+            with nulls.
+    """
+    def __init__(self, source, null_value=None):
+        self.source = source
+        self.null_value = null_value
+
+    def _oid_range(self, oid_field, where_clause):
+        """(first, last) object ID matching the where clause, or None when no rows match."""
+        import arcpy
+
+        bounds = []
+        for order in ('ASC', 'DESC'):
+            with arcpy.da.SearchCursor(self.source, ['OID@'], where_clause=where_clause,
+                                       sql_clause=(None, f'ORDER BY {oid_field} {order}')) as cursor:
+                row = next(iter(cursor), None)
+            if row is None:
+                return None
+            bounds.append(row[0])
+        return tuple(bounds)
+
+    def read_chunks(self, fields, where_clause, chunk_size):
+        import arcpy
+
+        oid_field = arcpy.Describe(self.source).OIDFieldName
+        oid_range = self._oid_range(oid_field, where_clause)
+        if oid_range is None:
+            return
+        nulls = {'skip_nulls': True} if self.null_value is None else {'null_value': self.null_value}
+
+        for low in range(oid_range[0], oid_range[1] + 1, chunk_size):
+            chunk_where = f'{oid_field} >= {low} AND {oid_field} < {low + chunk_size}'
+            if where_clause:
+                chunk_where = f'({where_clause}) AND {chunk_where}'
+            arr = arcpy.da.TableToNumPyArray(self.source, fields, where_clause=chunk_where, **nulls)
+            if len(arr):
+                yield {field: arr[field] for field in fields}
+
+    def count(self, where_clause):
+        """Row count from the object IDs alone; GetCount when there is no where clause."""
+        import arcpy
+
+        if not where_clause:
+            return int(arcpy.management.GetCount(self.source)[0])
+        return len(arcpy.da.TableToNumPyArray(self.source, ['OID@'], where_clause=where_clause))
+
+
+class MemoryBackend:
+    """
+    Pure-Python backend over columns held in memory.
+
+    Supports where clauses of the form `FIELD OP VALUE [AND FIELD OP VALUE ...]` with numeric
+    or quoted string values, which covers the queries this project uses.
+
+    Attributes:
+        columns (dict): Field name mapped to a list of values, with None for null.
+        null_value (int/float): Value to read nulls as, or None (the default) to skip rows
+            with nulls.
+    """
+    def __init__(self, columns, null_value=None):
+        self.columns = columns
+        self.null_value = null_value
+
+    def _predicate(self, where_clause):
+        if not where_clause:
+            return lambda i: True
+        tests = []
+        for term in re.split(r'\s+AND\s+', where_clause.strip(), flags=re.IGNORECASE):
+            match = re.fullmatch(r"\s*(\w+)\s*(<=|>=|<>|!=|==|=|<|>)\s*('.*'|[-\d.]+)\s*", term)
+            if not match:
+                raise ValueError(f'Unsupported where clause term: {term}')
+            field, op, value = match.groups()
+            value = value[1:-1] if value.startswith("'") else float(value)
+            tests.append((self.columns[field], OPERATORS[op], value))
+
+        def predicate(i):
+            return all(column[i] is not None and op(column[i], value) for column, op, value in tests)
+        return predicate
+
+    def _rows(self, where_clause):
+        keep = self._predicate(where_clause)
+        n = len(next(iter(self.columns.values()))) if self.columns else 0
+        return [i for i in range(n) if keep(i)]
+
+    def count(self, where_clause):
+        return len(self._rows(where_clause))
+
+    def read_chunks(self, fields, where_clause, chunk_size):
+        rows = self._rows(where_clause)
+        if self.null_value is None:
+            rows = [i for i in rows if all(self.columns[field][i] is not None for field in fields)]
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            yield {field: np.array([self.null_value if self.columns[field][i] is None else self.columns[field][i]
+                                    for i in chunk])
+                   for field in fields}
+
+
+class ColumnarReader:
+    """
+    Reads the requested fields of a table in chunks and aggregates them with NumPy.
+
+    Attributes:
+        fields (list): Fields to read.
+        where_clause (str): Optional filter passed down to the backend.
+        chunk_size (int): Rows per chunk.
+        backend: ArcpyBackend or MemoryBackend.
+    """
+    def __init__(self, source, fields, where_clause=None, chunk_size=250_000, backend=None):
+        self.fields = [fields] if isinstance(fields, str) else list(fields)
+        self.where_clause = where_clause
+        self.chunk_size = chunk_size
+        self.backend = backend or ArcpyBackend(source)
+
+    def chunks(self):
+        """
+        Yields:
+            dict: Field name mapped to a NumPy array for one chunk of rows.
+        """
+        yield from self.backend.read_chunks(self.fields, self.where_clause, self.chunk_size)
+
+    def arrays(self):
+        """
+        Reads every chunk into one array per field.
+
+        Returns:
+            dict: Field name mapped to a NumPy array.
+        """
+        parts = {field: [] for field in self.fields}
+        for chunk in self.chunks():
+            for field in self.fields:
+                parts[field].append(chunk[field])
+        return {field: np.concatenate(values) if values else np.array([]) for field, values in parts.items()}
+
+    def count(self):
+        """Rows matching the where clause, counted by the backend without reading the fields."""
+        return self.backend.count(self.where_clause)
+
+    def aggregate(self, field, ops=('count', 'sum', 'min', 'max')):
+        """
+        Computes several statistics of a field in one pass over the table.
+
+        Args:
+            field (str): Field to aggregate.
+            ops (iterable): Any of 'count', 'sum', 'min', 'max' and 'mean'.
+
+        Returns:
+            dict: Operation mapped to its value. min, max and mean are None when no rows match.
+        """
+        count, total, low, high = 0, 0, None, None
+        for chunk in self.chunks():
+            values = chunk[field]
+            if len(values) == 0:
+                continue
+            count += len(values)
+            total += values.sum()
+            low = values.min() if low is None else min(low, values.min())
+            high = values.max() if high is None else max(high, values.max())
+
+        def plain(value):
+            return value.item() if isinstance(value, np.generic) else value
+
+        results = {'count': count, 'sum': plain(total), 'min': plain(low), 'max': plain(high),
+                   'mean': plain(total) / count if count else None}
+        return {op: results[op] for op in ops}
+
+    def count_where(self, field, op, value):
+        """
+        Counts rows where `field op value` holds, e.g. count_where('Join_Count', '>=', 1).
+        """
+        compare = OPERATORS[op]
+        return int(sum(np.count_nonzero(compare(chunk[field], value)) for chunk in self.chunks()))
+
+    def mask(self, field, op, value):
+        """
+        Returns:
+            numpy.ndarray: Boolean array over all rows where `field op value` holds.
+        """
+        compare = OPERATORS[op]
+        parts = [compare(chunk[field], value) for chunk in self.chunks()]
+        return np.concatenate(parts) if parts else np.array([], dtype=bool)
+
+    def sum(self, field):
+        return self.aggregate(field, ['sum'])['sum']
+
+    def min(self, field):
+        return self.aggregate(field, ['min'])['min']
+
+    def max(self, field):
+        return self.aggregate(field, ['max'])['max']
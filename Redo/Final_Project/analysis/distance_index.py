@@ -0,0 +1,285 @@
+"""
+Per-address distance index for what-if buffer distances.
+
+Stores, once, the distance from every address to the nearest feature of each breeding-site
+layer and to the nearest avoid point. An address is a spraying target at buffer distance D
+when it is within D of every breeding-site layer (the intersect of the buffers) and farther
+than the avoid buffer from every avoid point (the erase). With the distances stored, any D
+is a vectorized comparison instead of a geoprocessing rerun.
+
+The fingerprints of the layers it was measured from are saved with it (as the R-tree does),
+so a changed Addresses or breeding-site layer triggers a rebuild and a changed avoid layer
+re-measures only the avoid column.
+
+With the arcpy geometry backend distances come from GenerateNearTable. With the numpy
+backend they are measured in NumPy from the backend's GeoJSON layers (State Plane feet).
+"""
+import csv
+import json
+import logging
+import os
+
+import numpy as np
+
+from analysis.pipeline import dataset_fingerprint
+from analysis.point_in_polygon import MAX_PAIRS, _edges, points_in_rings
+
+FEET_PER_METER = 1 / 0.3048
+
+
+class DistanceIndex:
+    """
+    Nearest-feature distances for every address, in feet.
+
+    Attributes:
+        oids (numpy.ndarray): Address object IDs.
+        layers (list): Breeding-site layer names, one column of `distances` each.
+        distances (numpy.ndarray): (addresses, layers) distances in feet, inf where a layer is empty.
+        avoid_distances (numpy.ndarray): Distance in feet to the nearest avoid point.
+        sources (dict): Layer name mapped to the fingerprint (JSON) it had when measured.
+    """
+    def __init__(self, oids, layers, distances, avoid_distances, sources=None):
+        self.oids = np.asarray(oids, dtype=np.int64)
+        self.layers = list(layers)
+        self.distances = np.asarray(distances, dtype=float)
+        self.avoid_distances = np.asarray(avoid_distances, dtype=float)
+        self.sources = dict(sources or {})
+        # Distance at which each address enters every buffer at once
+        self._required = self.distances.max(axis=1) if len(self.layers) else np.zeros(len(self.oids))
+        self._sorted_required = {}
+
+    def targets(self, distance_ft, avoid_ft=1500.0):
+        """
+        Which addresses are targets at a buffer distance.
+
+        Args:
+            distance_ft (float): Buffer distance for the breeding-site layers.
+            avoid_ft (float): Buffer distance around avoid points.
+
+        Returns:
+            numpy.ndarray: Boolean mask over `oids`.
+        """
+        return (self._required <= distance_ft) & (self.avoid_distances > avoid_ft)
+
+    def target_oids(self, distance_ft, avoid_ft=1500.0):
+        return self.oids[self.targets(distance_ft, avoid_ft)]
+
+    def count_curve(self, distances_ft, avoid_ft=1500.0):
+        """
+        Number of target addresses at each buffer distance.
+
+        Args:
+            distances_ft (iterable): Buffer distances to evaluate.
+            avoid_ft (float): Buffer distance around avoid points.
+
+        Returns:
+            list: (distance, count) pairs.
+        """
+        if avoid_ft not in self._sorted_required:
+            eligible = self._required[self.avoid_distances > avoid_ft]
+            self._sorted_required[avoid_ft] = np.sort(eligible)
+        ordered = self._sorted_required[avoid_ft]
+        distances_ft = np.asarray(list(distances_ft), dtype=float)
+        counts = np.searchsorted(ordered, distances_ft, side='right')
+        return list(zip(distances_ft.tolist(), counts.tolist()))
+
+    def write_curve_csv(self, path, distances_ft, avoid_ft=1500.0):
+        """
+        Writes a target-count-vs-distance curve to CSV.
+
+        Args:
+            path (str): Output CSV path.
+            distances_ft (iterable): Buffer distances to evaluate.
+            avoid_ft (float): Buffer distance around avoid points.
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as curve_file:
+            writer = csv.writer(curve_file)
+            writer.writerow(['Distance_ft', 'Target_Addresses'])
+            writer.writerows(self.count_curve(distances_ft, avoid_ft))
+
+    def stale_layers(self, fingerprints):
+        """
+        Args:
+            fingerprints (dict): Current fingerprints from source_fingerprints.
+
+        Returns:
+            list: Names of the layers whose fingerprint differs from the one saved.
+        """
+        return [name for name, value in fingerprints.items() if self.sources.get(name) != value]
+
+    def save(self, path):
+        with open(path, 'wb') as index_file:
+            np.savez(index_file, oids=self.oids, layers=np.array(self.layers), distances=self.distances,
+                     avoid_distances=self.avoid_distances, sources=np.array(json.dumps(self.sources)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # Indexes saved before sources were recorded load with none, so they count as stale
+            sources = json.loads(data['sources'].item()) if 'sources' in data else {}
+            return cls(data['oids'], data['layers'].tolist(), data['distances'], data['avoid_distances'], sources)
+
+
+def source_fingerprints(layers, address_layer='Addresses', avoid_layer='avoid_points',
+                        fingerprint_func=dataset_fingerprint):
+    """
+    Fingerprints of every layer an index is measured from.
+
+    Returns:
+        dict: Layer name mapped to its fingerprint as a JSON string.
+    """
+    return {name: json.dumps(fingerprint_func(name), sort_keys=True, default=str)
+            for name in [address_layer, *layers, avoid_layer]}
+
+
+def fingerprint_func(backend=None):
+    """The function that fingerprints source layers for a geometry backend."""
+    if backend is None or backend.name == 'arcpy':
+        return dataset_fingerprint
+    return backend.fingerprint
+
+
+def _edge_distances(x, y, x1, y1, x2, y2):
+    """Distance from each point to the closest of the edges, as (points, edges) pairs."""
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = np.where(dx * dx + dy * dy > 0, dx * dx + dy * dy, 1.0)
+    t = np.clip(((x[:, None] - x1) * dx + (y[:, None] - y1) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(x[:, None] - x1 - t * dx, y[:, None] - y1 - t * dy).min(axis=1)
+
+
+def near_distances(x, y, points, polygons):
+    """
+    Distance from each point to the closest of a set of points and polygons (0 inside a
+    polygon), without arcpy.
+
+    Pairs are evaluated in chunks of at most MAX_PAIRS. A polygon is skipped for points
+    whose distance to its bounding box is already more than their best distance so far.
+
+    Args:
+        x (numpy.ndarray): Point x.
+        y (numpy.ndarray): Point y.
+        points (numpy.ndarray): (n, 2) point features.
+        polygons (list): Polygons as lists of rings.
+
+    Returns:
+        numpy.ndarray: Distances in the coordinate units; inf when there are no features.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    best = np.full(len(x), np.inf)
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points):
+        step = max(1, MAX_PAIRS // len(points))
+        for start in range(0, len(x), step):
+            chunk = slice(start, start + step)
+            best[chunk] = np.hypot(x[chunk, None] - points[:, 0], y[chunk, None] - points[:, 1]).min(axis=1)
+
+    for rings in polygons:
+        coords = np.concatenate([np.asarray(ring, dtype=float) for ring in rings])
+        xmin, ymin = coords.min(axis=0)
+        xmax, ymax = coords.max(axis=0)
+        box = np.hypot(np.maximum(0.0, np.maximum(xmin - x, x - xmax)), np.maximum(0.0, np.maximum(ymin - y, y - ymax)))
+        idx = np.nonzero(box < best)[0]
+        if len(idx) == 0:
+            continue
+        inside = points_in_rings(x[idx], y[idx], rings)
+        best[idx[inside]] = 0.0
+        idx = idx[~inside]
+
+        x1, y1, x2, y2 = _edges(rings)
+        step = max(1, MAX_PAIRS // max(1, len(x1)))
+        for start in range(0, len(idx), step):
+            chunk = idx[start:start + step]
+            best[chunk] = np.minimum(best[chunk], _edge_distances(x[chunk], y[chunk], x1, y1, x2, y2))
+    return best
+
+
+def _near_distances_ft(address_layer, near_layer, oids, backend=None):
+    """
+    Distance from each address to the closest feature of a layer, using GenerateNearTable,
+    or near_distances with the numpy backend.
+
+    Args:
+        address_layer (str): Address point layer.
+        near_layer (str): Layer to measure to.
+        oids (numpy.ndarray): Address object IDs, the order of the result.
+        backend: Geometry backend; None for arcpy.
+
+    Returns:
+        numpy.ndarray: Distances in feet; inf for addresses with no near feature.
+    """
+    if backend is not None and backend.name != 'arcpy':
+        address_oids, x, y = backend.points(address_layer)
+        position = dict(zip(address_oids.tolist(), range(len(address_oids))))
+        order = np.array([position[oid] for oid in oids.tolist()], dtype=np.int64)
+        points, polygons = backend.features(near_layer)
+        return near_distances(x[order], y[order], points, polygons)
+
+    import arcpy
+
+    near_table = r'memory\near_table'
+    arcpy.analysis.GenerateNearTable(address_layer, near_layer, near_table, closest='CLOSEST')
+    table = arcpy.da.TableToNumPyArray(near_table, ['IN_FID', 'NEAR_DIST'])
+    arcpy.management.Delete(near_table)
+
+    meters_per_unit = arcpy.Describe(address_layer).spatialReference.metersPerUnit
+    lookup = dict(zip(table['IN_FID'].tolist(), (table['NEAR_DIST'] * meters_per_unit * FEET_PER_METER).tolist()))
+    return np.array([lookup.get(oid, np.inf) for oid in oids.tolist()])
+
+
+def build_distance_index(config_dict, layers, address_layer='Addresses', avoid_layer='avoid_points', backend=None):
+    """
+    Measures every address against each layer and saves the index next to the geodatabase.
+
+    Args:
+        config_dict (dict): Configuration dictionary with the destination geodatabase.
+        layers (list): Breeding-site layer names.
+        address_layer (str): Address point layer.
+        avoid_layer (str): Avoid point layer.
+        backend: Geometry backend to read the layers through; None for arcpy.
+
+    Returns:
+        DistanceIndex: The new index.
+    """
+    sources = source_fingerprints(layers, address_layer, avoid_layer, fingerprint_func(backend))
+    if backend is not None and backend.name != 'arcpy':
+        oids = backend.points(address_layer)[0].astype(np.int64)
+    else:
+        import arcpy
+
+        oids = arcpy.da.FeatureClassToNumPyArray(address_layer, ['OID@'])['OID@'].astype(np.int64)
+    columns = []
+    for layer in layers:
+        logging.debug(f'Measuring address distances to {layer}')
+        columns.append(_near_distances_ft(address_layer, layer, oids, backend))
+    avoid = _near_distances_ft(address_layer, avoid_layer, oids, backend)
+
+    index = DistanceIndex(oids, layers, np.column_stack(columns), avoid, sources)
+    index.save(distance_index_path(config_dict))
+    logging.info(f'Built distance index for {len(oids)} addresses against {len(layers)} layers')
+    return index
+
+
+def refresh_avoid_distances(index, address_layer='Addresses', avoid_layer='avoid_points', backend=None):
+    """
+    Re-measures only the avoid-point column, for when the avoid sheet changed but the
+    breeding-site layers did not.
+
+    Args:
+        index (DistanceIndex): Index to update in place.
+        address_layer (str): Address point layer.
+        avoid_layer (str): Avoid point layer.
+        backend: Geometry backend to read the layers through; None for arcpy.
+
+    Returns:
+        DistanceIndex: The same index.
+    """
+    index.avoid_distances = _near_distances_ft(address_layer, avoid_layer, index.oids, backend)
+    index._sorted_required = {}
+    index.sources[avoid_layer] = json.dumps(fingerprint_func(backend)(avoid_layer), sort_keys=True, default=str)
+    return index
+
+
+def distance_index_path(config_dict):
+    return os.path.join(os.path.dirname(config_dict['destination']), 'Addresses.distances.npz')
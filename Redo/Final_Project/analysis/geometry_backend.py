@@ -0,0 +1,825 @@
+"""
+Geometry backends for the analysis pipeline.
+
+The pipeline only needs a handful of operations: buffer (dissolved), dissolve, intersect, erase,
+clip, merge, point-in-polygon join, XY table to points, count, copy and extent. Each backend
+implements them on its own kind of dataset:
+
+- ArcpyGeometry runs the arcpy tools on feature classes, as the project always has.
+- NumpyGeometry needs no arcpy. Source layers are GeoJSON files in a workspace folder. Point
+  outputs are written as GeoJSON. Area outputs (buffers, intersects, erases) are written as
+  region files (`<name>.region.json`): a small expression tree over the source features, e.g.
+  "within 2500 ft of any wetland AND within 2500 ft of any lake, minus within 1500 ft of any
+  avoid point". Membership of a point in a region is exact (a point is inside the buffer of a
+  polygon when it is inside it or within the distance of one of its edges), so joins give
+  the same addresses as the polygon tools without building the polygons. Regions cannot be
+  drawn on a map; use the arcpy backend for cartography.
+
+Dataset names are resolved against the backend's workspace, like arcpy.env.workspace.
+"""
+import csv
+import json
+import logging
+import math
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+
+from analysis.point_buffer import buffer_union, group_rings
+from analysis.point_in_polygon import join_counts, points_in_rings, read_polygons
+from analysis.rtree_index import PointRTree
+
+REGION_SUFFIX = '.region.json'
+GEOJSON_SUFFIX = '.geojson'
+MEMORY_WORKSPACE = 'memory'
+
+# NAD83 / Colorado North (ftUS), EPSG:2231, Lambert Conformal Conic with two standard parallels
+COLORADO_NORTH = {
+    'a': 6378137.0, 'f': 1 / 298.257222101,
+    'lat1': 40 + 47 / 60, 'lat2': 39 + 43 / 60, 'lat0': 39 + 20 / 60, 'lon0': -105.5,
+    'false_easting': 914401.8289, 'false_northing': 304800.6096, 'unit': 1200 / 3937,
+}
+
+
+def in_memory(path):
+    """True for a path in the arcpy memory workspace (memory\\name)."""
+    return isinstance(path, str) and path.lower().startswith(MEMORY_WORKSPACE + '\\')
+
+
+def lonlat_to_state_plane(lon, lat, params=COLORADO_NORTH):
+    """
+    Projects longitude/latitude (degrees) to Lambert Conformal Conic coordinates.
+
+    Args:
+        lon (array-like): Longitudes.
+        lat (array-like): Latitudes.
+        params (dict): Projection parameters; Colorado North in US survey feet by default.
+
+    Returns:
+        tuple: x, y NumPy arrays in the projection's unit.
+    """
+    a, f = params['a'], params['f']
+    e = math.sqrt(f * (2 - f))
+
+    def m(phi):
+        return np.cos(phi) / np.sqrt(1 - (e * np.sin(phi)) ** 2)
+
+    def t(phi):
+        return np.tan(np.pi / 4 - phi / 2) / ((1 - e * np.sin(phi)) / (1 + e * np.sin(phi))) ** (e / 2)
+
+    phi1, phi2, phi0 = (np.radians(params[key]) for key in ('lat1', 'lat2', 'lat0'))
+    n = (np.log(m(phi1)) - np.log(m(phi2))) / (np.log(t(phi1)) - np.log(t(phi2)))
+    big_f = m(phi1) / (n * t(phi1) ** n)
+    rho0 = a * big_f * t(phi0) ** n
+
+    phi = np.radians(np.asarray(lat, dtype=float))
+    theta = n * (np.radians(np.asarray(lon, dtype=float)) - np.radians(params['lon0']))
+    rho = a * big_f * t(phi) ** n
+    x = params['false_easting'] + rho * np.sin(theta)
+    y = params['false_northing'] + rho0 - rho * np.cos(theta)
+    return x / params['unit'], y / params['unit']
+
+
+class ArcpyPointWriter:
+    """
+    Appends points to a new point feature class through an insert cursor, with the X, Y and
+    Type fields XYTableToPoint gives geocoded_addresses.csv.
+    """
+    def __init__(self, out_path, wkid=104124):
+        import arcpy
+
+        spatial_ref = arcpy.SpatialReference(wkid)
+        if arcpy.Exists(out_path):
+            arcpy.management.Delete(out_path)
+        workspace, name = os.path.split(out_path)
+        arcpy.management.CreateFeatureclass(workspace or arcpy.env.workspace, name, 'POINT',
+                                            spatial_reference=spatial_ref)
+        arcpy.management.AddFields(out_path, [['X', 'DOUBLE'], ['Y', 'DOUBLE'], ['Type', 'TEXT', 'Type', 50]])
+        self.out_path = out_path
+        self.cursor = arcpy.da.InsertCursor(out_path, ['SHAPE@XY', 'X', 'Y', 'Type'])
+        self.count = 0
+
+    def insert(self, points, point_type='Residential'):
+        for x, y in points:
+            self.cursor.insertRow([(x, y), x, y, point_type])
+        self.count += len(points)
+
+    def close(self):
+        del self.cursor
+        return self.out_path
+
+
+class NumpyPointWriter:
+    """
+    Collects points and writes them as GeoJSON on close, projected like xy_to_points.
+    """
+    def __init__(self, backend, out_path):
+        self.backend = backend
+        self.out_path = out_path
+        self.xs, self.ys, self.types = [], [], []
+        self.count = 0
+
+    def insert(self, points, point_type='Residential'):
+        for x, y in points:
+            self.xs.append(float(x))
+            self.ys.append(float(y))
+            self.types.append(point_type)
+        self.count += len(points)
+
+    def close(self):
+        x, y = np.array(self.xs), np.array(self.ys)
+        if self.backend.project_lonlat and len(x):
+            x, y = lonlat_to_state_plane(x, y)
+        return self.backend._write_points(x, y, [{'Type': t} for t in self.types], self.out_path)
+
+
+class ArcpyGeometry:
+    """
+    Geometry operations with the arcpy tools. Datasets are feature class paths or layer names.
+
+    Attributes:
+        point_buffer (str): 'arcpy' buffers every layer with Buffer_analysis; 'union' builds
+            the dissolved buffer of point layers with analysis.point_buffer instead.
+        tolerance_ft (float): Largest deviation from the true circles allowed with 'union'.
+        buffer_wkid (int): Projected coordinate system the 'union' buffers are built and
+            stored in.
+    """
+    name = 'arcpy'
+
+    def __init__(self, point_buffer='arcpy', tolerance_ft=1.0, buffer_wkid=2231):
+        self.point_buffer = point_buffer
+        self.tolerance_ft = float(tolerance_ft)
+        self.buffer_wkid = buffer_wkid
+
+    def buffer(self, in_layer, out_path, distance_ft):
+        import arcpy
+
+        if self.point_buffer == 'union' and arcpy.Describe(in_layer).shapeType == 'Point':
+            return self._union_buffer(in_layer, out_path, distance_ft)
+        arcpy.Buffer_analysis(
+            in_features=in_layer,
+            out_feature_class=out_path,
+            buffer_distance_or_field=f"{distance_ft} Feet",
+            line_side="FULL",
+            line_end_type="ROUND",
+            dissolve_option="ALL"
+        )
+        return out_path
+
+    def _union_buffer(self, in_layer, out_path, distance_ft):
+        """
+        Dissolved point buffer written as a single multipart polygon, like Buffer_analysis
+        with dissolve_option="ALL".
+        """
+        import arcpy
+
+        spatial_ref = arcpy.SpatialReference(self.buffer_wkid)
+        feet = 0.3048 / spatial_ref.metersPerUnit
+        arr = arcpy.da.FeatureClassToNumPyArray(in_layer, ['SHAPE@X', 'SHAPE@Y'], skip_nulls=True,
+                                                spatial_reference=spatial_ref)
+        rings = buffer_union(arr['SHAPE@X'], arr['SHAPE@Y'], distance_ft * feet, self.tolerance_ft * feet)
+
+        self.write_rings(rings, out_path, spatial_ref)
+        logging.info(f'Union buffer of {len(arr)} points in {in_layer}: {len(rings)} rings')
+        return out_path
+
+    def dissolve(self, in_layer, out_path):
+        import arcpy
+
+        arcpy.management.Dissolve(in_layer, out_path)
+        return out_path
+
+    def intersect(self, in_layers, out_path):
+        import arcpy
+
+        arcpy.Intersect_analysis(in_features=in_layers, out_feature_class=out_path)
+        return out_path
+
+    def erase(self, in_layer, erase_layer, out_path):
+        import arcpy
+
+        arcpy.analysis.Erase(in_features=in_layer, erase_features=erase_layer, out_feature_class=out_path)
+        return out_path
+
+    def join(self, target_layer, join_layer, out_path):
+        import arcpy
+
+        arcpy.analysis.SpatialJoin(
+            target_features=target_layer,
+            join_features=join_layer,
+            out_feature_class=out_path,
+            join_type="KEEP_COMMON",
+            match_option="INTERSECT"
+        )
+        return out_path
+
+    def xy_to_points(self, table, out_path, x_field='X', y_field='Y', wkid=104124):
+        import arcpy
+
+        arcpy.management.XYTableToPoint(
+            in_table=table,
+            out_feature_class=out_path,
+            x_field=x_field,
+            y_field=y_field,
+            coordinate_system=arcpy.SpatialReference(wkid)
+        )
+        return out_path
+
+    def point_writer(self, out_path, wkid=104124):
+        return ArcpyPointWriter(out_path, wkid)
+
+    def load_points(self, points, out_path, wkid=104124, method='cursor'):
+        """
+        Builds a point feature class straight from (x, y) pairs in memory.
+
+        Args:
+            points (list): (x, y) coordinates.
+            out_path (str): Output feature class.
+            wkid (int): Spatial reference of the coordinates.
+            method (str): 'cursor' inserts into out_path through an insert cursor, 'memory'
+                does the inserts in the memory workspace and copies the result out in one
+                write, 'numpy_array' converts a NumPy array with NumPyArrayToFeatureClass
+                (falling back to 'cursor' where arcpy.da does not have it).
+
+        Returns:
+            str: out_path.
+        """
+        import arcpy
+
+        if method == 'numpy_array' and hasattr(arcpy.da, 'NumPyArrayToFeatureClass'):
+            array = np.array([(x, y, 'Residential') for x, y in points],
+                             dtype=[('X', '<f8'), ('Y', '<f8'), ('Type', '<U50')])
+            if arcpy.Exists(out_path):
+                arcpy.management.Delete(out_path)
+            arcpy.da.NumPyArrayToFeatureClass(array, out_path, ('X', 'Y'), arcpy.SpatialReference(wkid))
+            return out_path
+        if method == 'memory':
+            staged = r'memory\staged_points'
+            writer = self.point_writer(staged, wkid)
+            writer.insert(points)
+            writer.close()
+            arcpy.management.CopyFeatures(staged, out_path)
+            arcpy.management.Delete(staged)
+            return out_path
+        writer = self.point_writer(out_path, wkid)
+        writer.insert(points)
+        return writer.close()
+
+    def copy(self, in_path, out_path):
+        import arcpy
+
+        if in_memory(in_path) or in_memory(out_path):
+            # Copy neither reads from nor writes to the memory workspace
+            arcpy.management.CopyFeatures(in_path, out_path)
+        else:
+            arcpy.management.Copy(in_path, out_path)
+        return out_path
+
+    def count(self, dataset):
+        import arcpy
+
+        return int(arcpy.management.GetCount(dataset)[0])
+
+    def exists(self, dataset):
+        import arcpy
+
+        return arcpy.Exists(dataset)
+
+    def extent(self, dataset):
+        import arcpy
+
+        extent = arcpy.Describe(dataset).extent
+        return extent.XMin, extent.YMin, extent.XMax, extent.YMax
+
+    def clip(self, in_layer, extent, out_path, spatial_reference=None):
+        """Clips a layer to a rectangle (xmin, ymin, xmax, ymax) in spatial_reference."""
+        import arcpy
+
+        xmin, ymin, xmax, ymax = extent
+        corners = arcpy.Array([arcpy.Point(xmin, ymin), arcpy.Point(xmin, ymax),
+                               arcpy.Point(xmax, ymax), arcpy.Point(xmax, ymin)])
+        arcpy.analysis.Clip(in_layer, arcpy.Polygon(corners, spatial_reference), out_path)
+        return out_path
+
+    def merge(self, in_layers, out_path):
+        import arcpy
+
+        arcpy.management.Merge(in_layers, out_path)
+        return out_path
+
+    def contains(self, join_layer, x, y, spatial_reference=None, tolerance=0.0):
+        """Boolean mask of the points inside (or within tolerance of) a polygon layer."""
+        return join_counts(x, y, read_polygons(join_layer, spatial_reference), tolerance) > 0
+
+    def points(self, dataset, spatial_reference=None):
+        """
+        Returns:
+            tuple: (oids, x, y) arrays of a point layer.
+        """
+        import arcpy
+
+        arr = arcpy.da.FeatureClassToNumPyArray(dataset, ['OID@', 'SHAPE@X', 'SHAPE@Y'], skip_nulls=True,
+                                                spatial_reference=spatial_reference)
+        return arr['OID@'], arr['SHAPE@X'], arr['SHAPE@Y']
+
+    def features(self, dataset, spatial_reference=None):
+        """
+        Returns:
+            tuple: (points, polygons): an (n, 2) array of point coordinates and a list of
+            polygons as ring lists.
+        """
+        import arcpy
+
+        if arcpy.Describe(dataset).shapeType in ('Point', 'Multipoint'):
+            arr = arcpy.da.FeatureClassToNumPyArray(dataset, ['SHAPE@X', 'SHAPE@Y'], skip_nulls=True,
+                                                    spatial_reference=spatial_reference, explode_to_points=True)
+            return np.column_stack([arr['SHAPE@X'], arr['SHAPE@Y']]), []
+        return np.empty((0, 2)), read_polygons(dataset, spatial_reference)
+
+    def select(self, dataset, oids, out_path, counts=None):
+        """
+        Copies the given features of a layer to out_path with a Join_Count field, like a
+        KEEP_COMMON spatial join. Join_Count is 1, or the matching entry of counts.
+
+        The features are picked out in one pass of a search cursor and written with an insert
+        cursor, not through an OBJECTID IN (...) where clause, which file geodatabases reject
+        once it lists a few hundred thousand OIDs.
+        """
+        import arcpy
+
+        if counts is None:
+            counts = dict.fromkeys((int(oid) for oid in oids), 1)
+        else:
+            counts = dict(zip((int(oid) for oid in oids), (int(c) for c in counts)))
+        desc = arcpy.Describe(dataset)
+        if arcpy.Exists(out_path):
+            arcpy.management.Delete(out_path)
+        workspace, name = os.path.split(out_path)
+        arcpy.management.CreateFeatureclass(workspace or arcpy.env.workspace, name, desc.shapeType.upper(),
+                                            template=dataset, spatial_reference=desc.spatialReference)
+        arcpy.management.AddField(out_path, 'Join_Count', 'LONG')
+
+        fields = [field.name for field in arcpy.ListFields(dataset)
+                  if field.editable and field.type not in ('OID', 'Geometry', 'GlobalID') and field.name != 'Join_Count']
+        with arcpy.da.SearchCursor(dataset, ['OID@', 'SHAPE@'] + fields) as rows, \
+                arcpy.da.InsertCursor(out_path, ['SHAPE@'] + fields + ['Join_Count']) as cursor:
+            for row in rows:
+                count = counts.get(row[0])
+                if count:
+                    cursor.insertRow(list(row[1:]) + [count])
+        return out_path
+
+    def write_rings(self, rings, out_path, spatial_reference=None):
+        """
+        Writes rings (outer counterclockwise, holes clockwise) as one multipart polygon.
+        """
+        import arcpy
+
+        if arcpy.Exists(out_path):
+            arcpy.management.Delete(out_path)
+        workspace, name = os.path.split(out_path)
+        arcpy.management.CreateFeatureclass(workspace or arcpy.env.workspace, name, 'POLYGON',
+                                            spatial_reference=spatial_reference)
+        if rings:
+            # Esri rings run the other way round: outer rings clockwise, holes counterclockwise
+            parts = arcpy.Array([arcpy.Array([arcpy.Point(px, py) for px, py in ring[::-1]]) for ring in rings])
+            with arcpy.da.InsertCursor(out_path, ['SHAPE@']) as cursor:
+                cursor.insertRow([arcpy.Polygon(parts, spatial_reference)])
+        return out_path
+
+
+class NumpyGeometry:
+    """
+    Geometry operations with NumPy on GeoJSON point/polygon files and region files.
+
+    Attributes:
+        workspace (str): Folder that dataset names are resolved against.
+        project_lonlat (bool): Project XY tables from lon/lat to Colorado North feet on load,
+            so geocoded points line up with the source layers.
+    """
+    name = 'numpy'
+
+    def __init__(self, workspace, project_lonlat=True):
+        self.workspace = workspace
+        self.project_lonlat = project_lonlat
+
+    # Reading and writing
+
+    def _base(self, dataset):
+        path = dataset if os.path.isabs(dataset) else os.path.join(self.workspace, dataset)
+        for suffix in (REGION_SUFFIX, GEOJSON_SUFFIX, '.json'):
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return path
+
+    def _file(self, dataset):
+        """Path of the file holding a dataset, or None if it does not exist."""
+        base = self._base(dataset)
+        for suffix in (REGION_SUFFIX, GEOJSON_SUFFIX, '.json'):
+            if os.path.exists(base + suffix):
+                return base + suffix
+        return None
+
+    def load(self, dataset):
+        """
+        Reads a dataset.
+
+        Returns:
+            dict: For points {'type': 'points', 'x', 'y', 'properties'}; for polygon features
+            {'type': 'features', 'polygons'}; regions are returned as stored.
+        """
+        path = self._file(dataset)
+        if path is None:
+            raise FileNotFoundError(f'No GeoJSON or region file for {dataset} in {self.workspace}')
+        with open(path, 'r', encoding='utf-8') as data_file:
+            data = json.load(data_file)
+        if path.endswith(REGION_SUFFIX):
+            return data
+        return _from_geojson(data)
+
+    def _clear(self, out_path):
+        """Removes any earlier output of either kind, like overwriteOutput."""
+        base = self._base(out_path)
+        for suffix in (REGION_SUFFIX, GEOJSON_SUFFIX, '.json'):
+            if os.path.exists(base + suffix):
+                os.remove(base + suffix)
+        return base
+
+    def _write_region(self, region, out_path):
+        path = self._clear(out_path) + REGION_SUFFIX
+        with open(path, 'w', encoding='utf-8') as region_file:
+            json.dump(region, region_file)
+        return out_path
+
+    def _write_points(self, x, y, properties, out_path):
+        features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [float(px), float(py)]},
+                     'properties': props}
+                    for px, py, props in zip(x.tolist(), y.tolist(), properties)]
+        path = self._clear(out_path) + GEOJSON_SUFFIX
+        with open(path, 'w', encoding='utf-8') as points_file:
+            json.dump({'type': 'FeatureCollection', 'features': features}, points_file)
+        return out_path
+
+    def _write_features(self, points, polygons, out_path):
+        features = [{'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': rings}, 'properties': {}}
+                    for rings in polygons]
+        if points:
+            features.append({'type': 'Feature', 'geometry': {'type': 'MultiPoint', 'coordinates': points},
+                             'properties': {}})
+        path = self._clear(out_path) + GEOJSON_SUFFIX
+        with open(path, 'w', encoding='utf-8') as features_file:
+            json.dump({'type': 'FeatureCollection', 'features': features}, features_file)
+        return out_path
+
+    def region(self, dataset):
+        """Any dataset as a region: features become a zero-distance buffer of themselves."""
+        data = self.load(dataset)
+        if data['type'] == 'points':
+            return _buffer_node(0.0, np.column_stack([data['x'], data['y']]).tolist(), [])
+        if data['type'] == 'features':
+            return _buffer_node(0.0, data['points'], data['polygons'])
+        return data
+
+    # Operations
+
+    def buffer(self, in_layer, out_path, distance_ft):
+        data = self.load(in_layer)
+        distance_ft = float(distance_ft)
+        if data['type'] == 'points':
+            node = _buffer_node(distance_ft, np.column_stack([data['x'], data['y']]).tolist(), [])
+        elif data['type'] == 'features':
+            node = _buffer_node(distance_ft, data['points'], data['polygons'])
+        elif data['type'] == 'buffer':
+            # A buffer of a buffer is a buffer by the summed distance
+            node = dict(data, distance=data['distance'] + distance_ft)
+        else:
+            raise ValueError(f'Cannot buffer a {data["type"]} region with the numpy backend')
+        return self._write_region(node, out_path)
+
+    def dissolve(self, in_layer, out_path):
+        return self._write_region(self.region(in_layer), out_path)
+
+    def intersect(self, in_layers, out_path):
+        return self._write_region({'type': 'intersect', 'parts': [self.region(layer) for layer in in_layers]},
+                                  out_path)
+
+    def erase(self, in_layer, erase_layer, out_path):
+        return self._write_region({'type': 'erase', 'base': self.region(in_layer),
+                                   'remove': self.region(erase_layer)}, out_path)
+
+    def clip(self, in_layer, extent, out_path, spatial_reference=None):
+        """
+        Keeps the points inside a rectangle and the polygons whose bounding box meets it;
+        a region is intersected with the rectangle.
+        """
+        data = self.load(in_layer)
+        xmin, ymin, xmax, ymax = extent
+        if data['type'] == 'points':
+            keep = np.nonzero((data['x'] >= xmin) & (data['x'] <= xmax) &
+                              (data['y'] >= ymin) & (data['y'] <= ymax))[0]
+            return self._write_points(data['x'][keep], data['y'][keep],
+                                      [data['properties'][i] for i in keep.tolist()], out_path)
+        if data['type'] == 'features':
+            points = [p for p in data['points'] if xmin <= p[0] <= xmax and ymin <= p[1] <= ymax]
+            polygons = []
+            for rings in data['polygons']:
+                coords = np.concatenate([np.asarray(ring, dtype=float) for ring in rings])
+                low, high = coords.min(axis=0), coords.max(axis=0)
+                if low[0] <= xmax and high[0] >= xmin and low[1] <= ymax and high[1] >= ymin:
+                    polygons.append(rings)
+            return self._write_features(points, polygons, out_path)
+        box = {'type': 'box', 'extent': [float(value) for value in extent]}
+        return self._write_region({'type': 'intersect', 'parts': [data, box]}, out_path)
+
+    def merge(self, in_layers, out_path):
+        return self._write_region({'type': 'union', 'parts': [self.region(layer) for layer in in_layers]},
+                                  out_path)
+
+    def contains(self, join_layer, x, y, spatial_reference=None, tolerance=0.0):
+        """
+        Boolean mask of the points inside (or within tolerance of the boundary of) a dataset.
+        """
+        return region_contains(self.region(join_layer), np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                               float(tolerance))
+
+    def join(self, target_layer, join_layer, out_path):
+        """
+        KEEP_COMMON / INTERSECT join of a point layer against an area: writes the target points
+        that fall in the area, with Join_Count set to 1.
+        """
+        points = self.load(target_layer)
+        if points['type'] != 'points':
+            raise ValueError(f'{target_layer} is not a point layer')
+        inside = self.contains(join_layer, points['x'], points['y'])
+        keep = np.nonzero(inside)[0]
+        properties = [dict(points['properties'][i], Join_Count=1) for i in keep.tolist()]
+        logging.debug(f'numpy backend join: {len(keep)} of {len(inside)} points in {join_layer}')
+        return self._write_points(points['x'][keep], points['y'][keep], properties, out_path)
+
+    def xy_to_points(self, table, out_path, x_field='X', y_field='Y', wkid=None):
+        xs, ys, properties = [], [], []
+        with open(table, 'r', encoding='utf-8') as table_file:
+            for row in csv.DictReader(table_file):
+                xs.append(float(row[x_field]))
+                ys.append(float(row[y_field]))
+                properties.append({key: value for key, value in row.items() if key not in (x_field, y_field)})
+        x, y = np.array(xs), np.array(ys)
+        if self.project_lonlat and len(x):
+            x, y = lonlat_to_state_plane(x, y)
+        return self._write_points(x, y, properties, out_path)
+
+    def point_writer(self, out_path, wkid=None):
+        return NumpyPointWriter(self, out_path)
+
+    def load_points(self, points, out_path, wkid=None, method=None):
+        """Writes (x, y) lon/lat pairs from memory as a GeoJSON point dataset."""
+        writer = self.point_writer(out_path)
+        writer.insert(points)
+        return writer.close()
+
+    def update_points(self, dataset, added, removed, point_type='Residential'):
+        """
+        Applies an incremental load to an existing point dataset: appends the added (x, y)
+        lon/lat pairs and deletes one point for each removed pair.
+
+        Returns:
+            tuple: (points added, points removed)
+        """
+        data = self.load(dataset)
+        if data['type'] != 'points':
+            raise ValueError(f'{dataset} is not a point layer')
+        keep = np.ones(len(data['x']), dtype=bool)
+        if removed:
+            # Removed pairs are projected the same way as on load, so they match exactly
+            rx, ry = self._project(removed)
+            to_remove = Counter(zip(np.round(rx, 3).tolist(), np.round(ry, 3).tolist()))
+            for i, key in enumerate(zip(np.round(data['x'], 3).tolist(), np.round(data['y'], 3).tolist())):
+                if to_remove[key] > 0:
+                    to_remove[key] -= 1
+                    keep[i] = False
+        ax, ay = self._project(added)
+        properties = [p for p, kept in zip(data['properties'], keep.tolist()) if kept]
+        properties += [{'Type': point_type} for _ in range(len(ax))]
+        self._write_points(np.concatenate([data['x'][keep], ax]), np.concatenate([data['y'][keep], ay]),
+                           properties, dataset)
+        return len(ax), int((~keep).sum())
+
+    def _project(self, points):
+        """(x, y) arrays of lon/lat pairs, projected like xy_to_points."""
+        xy = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y = xy[:, 0], xy[:, 1]
+        if self.project_lonlat and len(x):
+            x, y = lonlat_to_state_plane(x, y)
+        return x, y
+
+    def copy(self, in_path, out_path):
+        source = self._file(in_path)
+        suffix = source[len(self._base(in_path)):]
+        shutil.copyfile(source, self._clear(out_path) + suffix)
+        return out_path
+
+    def count(self, dataset):
+        data = self.load(dataset)
+        if data['type'] == 'points':
+            return len(data['x'])
+        if data['type'] == 'features':
+            return len(data['polygons']) + len(data['points'])
+        # A region is one dissolved area
+        return 1
+
+    def exists(self, dataset):
+        return self._file(dataset) is not None
+
+    def feature_count(self, dataset):
+        """Like count, but sums lists and gives None for anything that is not a dataset."""
+        if isinstance(dataset, (list, tuple)):
+            counts = [self.feature_count(item) for item in dataset]
+            return None if None in counts else sum(counts)
+        if not isinstance(dataset, str) or not self.exists(dataset):
+            return None
+        return self.count(dataset)
+
+    def fingerprint(self, dataset):
+        """File size and modification time, for the stage cache."""
+        path = self._file(dataset)
+        return {'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+
+    def extent(self, dataset):
+        """Bounding box (xmin, ymin, xmax, ymax); empty (xmin > xmax) for a dataset with no features."""
+        data = self.load(dataset)
+        if data['type'] == 'points':
+            if len(data['x']) == 0:
+                return math.inf, math.inf, -math.inf, -math.inf
+            return data['x'].min(), data['y'].min(), data['x'].max(), data['y'].max()
+        return region_extent(self.region(dataset))
+
+    def points(self, dataset, spatial_reference=None):
+        """(oids, x, y) of a point dataset; oids are positions in the file."""
+        data = self.load(dataset)
+        if data['type'] != 'points':
+            raise ValueError(f'{dataset} is not a point layer')
+        return np.arange(len(data['x'])), data['x'], data['y']
+
+    def features(self, dataset, spatial_reference=None):
+        """(points, polygons) of a dataset, with points as an (n, 2) array."""
+        data = self.load(dataset)
+        if data['type'] == 'points':
+            return np.column_stack([data['x'], data['y']]), []
+        if data['type'] == 'features':
+            return np.asarray(data['points'], dtype=float).reshape(-1, 2), data['polygons']
+        raise ValueError(f'{dataset} is a region, not a feature layer')
+
+    def select(self, dataset, oids, out_path, counts=None):
+        """Writes the points at the given positions with Join_Count set to 1 (or from counts)."""
+        points = self.load(dataset)
+        keep = np.asarray(oids, dtype=np.int64)
+        counts = [1] * len(keep) if counts is None else [int(c) for c in counts]
+        properties = [dict(points['properties'][i], Join_Count=c) for i, c in zip(keep.tolist(), counts)]
+        return self._write_points(points['x'][keep], points['y'][keep], properties, out_path)
+
+    def write_rings(self, rings, out_path, spatial_reference=None):
+        """Writes rings as a GeoJSON MultiPolygon feature."""
+        polygons = [[ring.tolist() for ring in polygon] for polygon in group_rings(rings)]
+        feature = {'type': 'Feature', 'geometry': {'type': 'MultiPolygon', 'coordinates': polygons}, 'properties': {}}
+        path = self._clear(out_path) + GEOJSON_SUFFIX
+        with open(path, 'w', encoding='utf-8') as polygon_file:
+            json.dump({'type': 'FeatureCollection', 'features': [feature]}, polygon_file)
+        return out_path
+
+
+def _buffer_node(distance, points, polygons):
+    return {'type': 'buffer', 'distance': distance, 'points': [list(map(float, p)) for p in points],
+            'polygons': [[np.asarray(ring, dtype=float).tolist() for ring in rings] for rings in polygons]}
+
+
+def _from_geojson(data):
+    """Splits a GeoJSON FeatureCollection into point arrays or polygon features."""
+    xs, ys, properties, points, polygons = [], [], [], [], []
+    for feature in data.get('features', []):
+        geometry = feature.get('geometry') or {}
+        kind, coords = geometry.get('type'), geometry.get('coordinates')
+        if kind == 'Point':
+            xs.append(coords[0])
+            ys.append(coords[1])
+            properties.append(feature.get('properties') or {})
+            points.append(coords[:2])
+        elif kind == 'MultiPoint':
+            points.extend(point[:2] for point in coords)
+        elif kind == 'Polygon':
+            polygons.append(coords)
+        elif kind == 'MultiPolygon':
+            polygons.extend(coords)
+        elif kind is not None:
+            raise ValueError(f'Unsupported geometry type {kind} for the numpy backend')
+    if polygons or len(points) != len(xs):
+        return {'type': 'features', 'points': points, 'polygons': polygons}
+    return {'type': 'points', 'x': np.array(xs, dtype=float), 'y': np.array(ys, dtype=float),
+            'properties': properties}
+
+
+def _within_buffer(node, x, y, tolerance=0.0):
+    """Mask of points within node['distance'] (plus tolerance) of any point or polygon of a buffer node."""
+    distance = float(node['distance']) + tolerance
+    mask = np.zeros(len(x), dtype=bool)
+    if len(x) == 0:
+        return mask
+    tree = PointRTree.build(np.arange(len(x)), x, y)
+
+    for px, py in node['points']:
+        if distance <= 0:
+            break
+        idx = tree.envelope_query(px - distance, py - distance, px + distance, py + distance)
+        idx = idx[~mask[idx]]
+        mask[idx[np.hypot(x[idx] - px, y[idx] - py) <= distance]] = True
+
+    for rings in node['polygons']:
+        coords = np.concatenate([np.asarray(ring, dtype=float) for ring in rings])
+        xmin, ymin = coords.min(axis=0) - distance
+        xmax, ymax = coords.max(axis=0) + distance
+        idx = tree.envelope_query(xmin, ymin, xmax, ymax)
+        idx = idx[~mask[idx]]
+        if len(idx):
+            mask[idx[points_in_rings(x[idx], y[idx], rings, tolerance=distance)]] = True
+    return mask
+
+
+def region_contains(region, x, y, tolerance=0.0):
+    """
+    Evaluates a region at points. Each step only looks at the points still undecided.
+
+    Args:
+        region (dict): Region node ('buffer', 'box', 'intersect', 'union' or 'erase').
+        x (numpy.ndarray): Point x.
+        y (numpy.ndarray): Point y.
+        tolerance (float): Points this close outside the region count as inside. The area
+            taken away by an erase is tested without it, so the erase does not grow.
+
+    Returns:
+        numpy.ndarray: Boolean mask.
+    """
+    kind = region['type']
+    if kind == 'buffer':
+        return _within_buffer(region, x, y, tolerance)
+    if kind == 'intersect':
+        mask = np.ones(len(x), dtype=bool)
+        for part in region['parts']:
+            idx = np.nonzero(mask)[0]
+            mask[idx] = region_contains(part, x[idx], y[idx], tolerance)
+        return mask
+    if kind == 'union':
+        mask = np.zeros(len(x), dtype=bool)
+        for part in region['parts']:
+            idx = np.nonzero(~mask)[0]
+            mask[idx] = region_contains(part, x[idx], y[idx], tolerance)
+        return mask
+    if kind == 'box':
+        xmin, ymin, xmax, ymax = region['extent']
+        return ((x >= xmin - tolerance) & (x <= xmax + tolerance) &
+                (y >= ymin - tolerance) & (y <= ymax + tolerance))
+    if kind == 'erase':
+        mask = region_contains(region['base'], x, y, tolerance)
+        idx = np.nonzero(mask)[0]
+        mask[idx] = ~region_contains(region['remove'], x[idx], y[idx])
+        return mask
+    raise ValueError(f'Unknown region type {kind}')
+
+
+def region_extent(region):
+    """Bounding box (xmin, ymin, xmax, ymax) of a region; may be empty (xmin > xmax)."""
+    kind = region['type']
+    if kind == 'buffer':
+        coords = [np.asarray(region['points'], dtype=float).reshape(-1, 2)]
+        coords += [np.asarray(ring, dtype=float) for rings in region['polygons'] for ring in rings]
+        coords = np.concatenate(coords)
+        if len(coords) == 0:
+            return math.inf, math.inf, -math.inf, -math.inf
+        d = float(region['distance'])
+        return coords[:, 0].min() - d, coords[:, 1].min() - d, coords[:, 0].max() + d, coords[:, 1].max() + d
+    if kind == 'box':
+        return tuple(region['extent'])
+    if kind in ('intersect', 'union'):
+        boxes = np.array([region_extent(part) for part in region['parts']])
+        if kind == 'intersect':
+            return boxes[:, 0].max(), boxes[:, 1].max(), boxes[:, 2].min(), boxes[:, 3].min()
+        return boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max()
+    return region_extent(region['base'])
+
+
+def geometry_backend(config_dict):
+    """
+    The backend selected by `geometry_backend` in the config ('arcpy' by default).
+
+    Args:
+        config_dict (dict): Configuration dictionary; the numpy backend uses `destination`
+            as its workspace folder, the arcpy backend the `point_buffer_*` settings.
+
+    Returns:
+        ArcpyGeometry or NumpyGeometry.
+    """
+    if config_dict.get('geometry_backend', 'arcpy') == 'numpy':
+        return NumpyGeometry(config_dict['destination'], config_dict.get('project_lonlat', True))
+    return ArcpyGeometry(config_dict.get('point_buffer_engine', 'arcpy'),
+                         config_dict.get('point_buffer_tolerance_ft', 1.0),
+                         config_dict.get('point_buffer_wkid', 2231))
@@ -0,0 +1,303 @@
+"""
+Stage cache and DAG executor for the WNV analysis chain.
+
+Each stage's output is keyed on a hash of its parameters and of its inputs: source datasets
+are described by a fingerprint (row count, extent, and a modification time or geometry hash),
+and upstream stages contribute their own keys. A stage only re-runs when its key changes, so editing one input
+only re-runs the stages downstream of it.
+"""
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+
+# Geometry hashes of geodatabase feature classes, next to the geodatabase
+FINGERPRINT_MEMO = 'dataset_fingerprints.json'
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Attributes:
+        name (str): Unique stage name.
+        func (callable): Called as func(*input_paths, **params), returns the output path.
+        inputs (list): Names of upstream stages or paths/names of source datasets.
+        params (dict): Parameters that affect the output.
+    """
+    def __init__(self, name, func, inputs, params=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = params or {}
+
+
+def dataset_fingerprint(dataset):
+    """
+    Description of a source dataset: row count, extent, and either the file's modification
+    time or a hash of its geometry.
+
+    Feature classes inside a file geodatabase get the geometry hash. It is stored in
+    dataset_fingerprints.json next to the geodatabase with the cheap metadata it was computed
+    for (row count, extent, and the newest modification time of the feature class's own
+    a0000000N.* table files), and reused without reading the features while that metadata is
+    unchanged. Other outputs written to the same geodatabase do not touch those files.
+
+    Args:
+        dataset (str): Feature class path or layer name in the current workspace.
+
+    Returns:
+        dict: Fingerprint values.
+    """
+    import arcpy
+
+    desc = arcpy.Describe(dataset)
+    fingerprint = {'count': int(arcpy.management.GetCount(dataset)[0])}
+    extent = getattr(desc, 'extent', None)
+    if extent is not None:
+        fingerprint['extent'] = [round(extent.XMin, 6), round(extent.YMin, 6),
+                                 round(extent.XMax, 6), round(extent.YMax, 6)]
+
+    path = desc.catalogPath
+    if os.path.isfile(path):
+        fingerprint['mtime'] = os.path.getmtime(path)
+        return fingerprint
+
+    gdb = _geodatabase_of(path)
+    if gdb is None:
+        fingerprint['checksum'] = geometry_hash(dataset, getattr(desc, 'shapeType', None))
+        return fingerprint
+
+    table_files = _table_files(gdb, os.path.basename(path))
+    if not table_files:
+        logging.debug(f'No table files found for {path}, hashing its geometry')
+        fingerprint['checksum'] = geometry_hash(dataset, getattr(desc, 'shapeType', None))
+        return fingerprint
+
+    cheap = dict(fingerprint, table_mtime=max(os.path.getmtime(table_file) for table_file in table_files))
+    memo_path = os.path.join(os.path.dirname(gdb), FINGERPRINT_MEMO)
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path, 'r', encoding='utf-8') as memo_file:
+            memo = json.load(memo_file)
+    entry = memo.get(path)
+    if entry and entry['metadata'] == json.loads(json.dumps(cheap)):
+        fingerprint['checksum'] = entry['checksum']
+        return fingerprint
+
+    fingerprint['checksum'] = geometry_hash(dataset, getattr(desc, 'shapeType', None))
+    memo[path] = {'metadata': cheap, 'checksum': fingerprint['checksum']}
+    with open(memo_path, 'w', encoding='utf-8') as memo_file:
+        json.dump(memo, memo_file, indent=2)
+    return fingerprint
+
+
+def geometry_hash(dataset, shape_type=None):
+    """
+    SHA-1 of a dataset's object IDs and geometry.
+
+    Points are read as coordinate arrays in one call. Other shapes are hashed from their
+    WKB, so any vertex edit changes the hash, not just moves of the centroid.
+
+    Args:
+        dataset (str): Feature class path or layer name.
+        shape_type (str): Describe shapeType, e.g. 'Point' or 'Polygon'.
+
+    Returns:
+        str: Hex digest.
+    """
+    import arcpy
+
+    checksum = hashlib.sha1()
+    if shape_type == 'Point':
+        arr = arcpy.da.FeatureClassToNumPyArray(dataset, ['OID@', 'SHAPE@X', 'SHAPE@Y'], skip_nulls=True)
+        checksum.update(arr.tobytes())
+    else:
+        with arcpy.da.SearchCursor(dataset, ['OID@', 'SHAPE@WKB']) as cursor:
+            for oid, wkb in cursor:
+                checksum.update(str(oid).encode('utf-8'))
+                checksum.update(bytes(wkb or b''))
+    return checksum.hexdigest()
+
+
+def _catalog_id(gdb, name):
+    """
+    Row ID of a table in a file geodatabase's system catalog (a00000001.gdbtable), which is
+    also the N in the table's a0000000N.* file names. None if it cannot be found.
+
+    The catalog's .gdbtablx index holds the offset of every row in the .gdbtable file. Each
+    row stores the table name as a length-prefixed UTF-8 string, which is all this looks at.
+    """
+    try:
+        with open(os.path.join(gdb, 'a00000001.gdbtablx'), 'rb') as index_file:
+            index = index_file.read()
+        with open(os.path.join(gdb, 'a00000001.gdbtable'), 'rb') as table_file:
+            table = table_file.read()
+    except OSError:
+        return None
+    if len(index) < 16:
+        return None
+    blocks, rows, offset_size = struct.unpack_from('<iii', index, 4)
+    if offset_size not in (4, 5, 6) or rows > blocks * 1024 or len(index) < 16 + blocks * 1024 * offset_size:
+        # A sparse index (rows past the stored blocks) needs its block bitmap; not handled
+        return None
+
+    key = name.lower().encode('utf-8')
+    for row_id in range(1, rows + 1):
+        start = 16 + (row_id - 1) * offset_size
+        offset = int.from_bytes(index[start:start + offset_size], 'little')
+        if offset == 0 or offset + 4 > len(table):
+            # Deleted row
+            continue
+        size = struct.unpack_from('<i', table, offset)[0]
+        blob = table[offset + 4:offset + 4 + size]
+        lowered = blob.lower()
+        at = lowered.find(key)
+        while at > 0:
+            if blob[at - 1] == len(key):
+                return row_id
+            at = lowered.find(key, at + 1)
+    return None
+
+
+def _table_files(gdb, name):
+    """The a0000000N.* files holding one table of a file geodatabase."""
+    row_id = _catalog_id(gdb, name)
+    if row_id is None:
+        return []
+    prefix = f'a{row_id:08x}.'
+    return [entry.path for entry in os.scandir(gdb) if entry.name.lower().startswith(prefix)
+            and not entry.name.endswith('.lock')]
+
+
+def _geodatabase_of(path):
+    """The file geodatabase folder a feature class path is in, or None."""
+    while path and not path.lower().endswith('.gdb'):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path if path and os.path.isdir(path) else None
+
+
+class StageCache:
+    """
+    Runs stages in dependency order and skips those whose key has not changed.
+
+    The manifest (stage name -> key and output path) is stored as JSON.
+
+    Attributes:
+        manifest_path (str): Path to the JSON manifest.
+        fingerprint_func (callable): Function used to fingerprint source datasets.
+        exists_func (callable): Function that tells whether a stage output still exists.
+        hits (list): Names of stages served from the cache in the last run.
+        misses (list): Names of stages executed in the last run.
+    """
+    def __init__(self, manifest_path, fingerprint_func=dataset_fingerprint, exists_func=None):
+        self.manifest_path = manifest_path
+        self.fingerprint_func = fingerprint_func
+        self.exists_func = exists_func or _arcpy_exists
+        self.hits = []
+        self.misses = []
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+                self.manifest = json.load(manifest_file)
+
+    @staticmethod
+    def _order(stages):
+        """Topological order of the stages; raises ValueError on a cycle."""
+        by_name = {stage.name: stage for stage in stages}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f'Pipeline has a cycle at stage {name}')
+            visiting.add(name)
+            for dep in by_name[name].inputs:
+                if dep in by_name:
+                    visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(by_name[name])
+
+        for stage in stages:
+            visit(stage.name)
+        return ordered
+
+    def stage_key(self, stage, keys, fingerprints):
+        """
+        Hash of a stage's parameters and inputs.
+
+        Args:
+            stage (Stage): The stage.
+            keys (dict): Keys of the stages already resolved.
+            fingerprints (dict): Fingerprints of the source datasets seen so far.
+
+        Returns:
+            str: Hex digest.
+        """
+        inputs = []
+        for name in stage.inputs:
+            if name in keys:
+                inputs.append(['stage', name, keys[name]])
+            else:
+                if name not in fingerprints:
+                    fingerprints[name] = self.fingerprint_func(name)
+                inputs.append(['dataset', name, fingerprints[name]])
+        payload = json.dumps({'stage': stage.name, 'params': stage.params, 'inputs': inputs},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def run(self, stages):
+        """
+        Executes the pipeline.
+
+        Args:
+            stages (list): Stage objects; upstream stages are referenced by name in inputs.
+
+        Returns:
+            dict: Stage name mapped to its output path.
+        """
+        self.hits, self.misses = [], []
+        keys, outputs, fingerprints = {}, {}, {}
+
+        for stage in self._order(stages):
+            key = self.stage_key(stage, keys, fingerprints)
+            keys[stage.name] = key
+            cached = self.manifest.get(stage.name)
+
+            if cached and cached['key'] == key and self.exists_func(cached['output']):
+                outputs[stage.name] = cached['output']
+                self.hits.append(stage.name)
+                logging.info(f'Stage {stage.name}: cache hit')
+                continue
+
+            start = time.perf_counter()
+            args = [outputs.get(name, name) for name in stage.inputs]
+            output = stage.func(*args, **stage.params)
+            if output is None:
+                raise RuntimeError(f'Stage {stage.name} produced no output')
+            outputs[stage.name] = output
+            self.misses.append(stage.name)
+            logging.info(f'Stage {stage.name}: executed in {time.perf_counter() - start:.2f}s')
+
+            self.manifest[stage.name] = {'key': key, 'output': output}
+            self._save()
+
+        logging.info(f'Stage cache hits: {self.hits}; executed: {self.misses}')
+        return outputs
+
+    def _save(self):
+        with open(self.manifest_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+
+
+def _arcpy_exists(path):
+    import arcpy
+
+    return arcpy.Exists(path)
@@ -0,0 +1,220 @@
+"""
+Buffer-and-dissolve for point layers.
+
+Buffer_analysis with dissolve_option="ALL" on thousands of overlapping circles is the slowest
+step of the buffer loop. For equal-radius discs the outline of the union can be computed
+directly instead:
+
+1. Points are bucketed on a grid with cells one diameter wide, so each disc only has to be
+   compared with the discs in its own and the neighbouring cells.
+2. For each disc, every overlapping neighbour covers one arc of its circle. Sweeping the arc
+   end points around the circle gives the parts of the circle no other disc covers; those
+   are exactly the pieces of the union's outline. Each piece starts and ends where the
+   circle crosses a neighbour, which identifies the piece that continues it.
+3. The pieces are chained into closed rings and each arc is turned into vertices with a
+   spacing that keeps the chord within `tolerance` of the true circle.
+
+Outer rings come out counterclockwise and holes clockwise. Memory grows with the number of
+overlapping pairs, not with the area covered.
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from analysis.point_in_polygon import points_in_rings
+
+TWO_PI = 2 * math.pi
+# Offsets to the cell itself and half of its neighbours, so each pair of cells is visited once
+HALF_NEIGHBOURHOOD = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+
+def _overlapping_pairs(x, y, radius):
+    """
+    Pairs of discs that overlap, found through a grid with cells one diameter wide.
+
+    Returns:
+        tuple: i, j, distance arrays with i < j.
+    """
+    size = 2 * radius
+    cx = np.floor(x / size).astype(np.int64)
+    cy = np.floor(y / size).astype(np.int64)
+    cells = defaultdict(list)
+    for index, key in enumerate(zip(cx.tolist(), cy.tolist())):
+        cells[key].append(index)
+    cells = {key: np.array(members) for key, members in cells.items()}
+
+    pairs_i, pairs_j, pairs_d = [], [], []
+    for (kx, ky), members in cells.items():
+        for dx, dy in HALF_NEIGHBOURHOOD:
+            others = cells.get((kx + dx, ky + dy))
+            if others is None:
+                continue
+            d = np.hypot(x[members][:, None] - x[others][None, :], y[members][:, None] - y[others][None, :])
+            if (dx, dy) == (0, 0):
+                # Each pair once, and not a disc with itself
+                d[np.tril_indices(len(members))] = np.inf
+            a, b = np.nonzero(d < size)
+            if len(a):
+                i, j = members[a], others[b]
+                pairs_i.append(np.minimum(i, j))
+                pairs_j.append(np.maximum(i, j))
+                pairs_d.append(d[a, b])
+    if not pairs_i:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([])
+    return np.concatenate(pairs_i), np.concatenate(pairs_j), np.concatenate(pairs_d)
+
+
+def _boundary_arcs(x, y, radius):
+    """
+    Uncovered arcs of every circle.
+
+    Returns:
+        tuple: (arcs, full_circles). Each arc is (circle, start angle, end angle, start key,
+        end key); keys name the crossing point as (lower circle, higher circle, side), the
+        side being which side of the line from the lower to the higher circle it lies on.
+        full_circles lists the discs that overlap nothing.
+    """
+    i, j, d = _overlapping_pairs(x, y, radius)
+    n = len(x)
+    if len(i) == 0:
+        return [], list(range(n))
+
+    # Both directions: circle c is crossed by neighbour o
+    circle = np.concatenate([i, j])
+    other = np.concatenate([j, i])
+    dist = np.concatenate([d, d])
+    alpha = np.arctan2(y[other] - y[circle], x[other] - x[circle])
+    beta = np.arccos(np.clip(dist / (2 * radius), -1.0, 1.0))
+    entry = np.mod(alpha - beta, TWO_PI)
+    exit_ = np.mod(alpha + beta, TWO_PI)
+    lower = circle < other
+    # Entry point is right of circle->other; see module docstring for the side convention
+    entry_side = np.where(lower, 0, 1)
+    exit_side = np.where(lower, 1, 0)
+    wraps = entry + 2 * beta >= TWO_PI
+
+    order = np.argsort(circle, kind='stable')
+    bounds = np.searchsorted(circle[order], np.arange(n + 1))
+    arcs, full_circles = [], []
+    for c in range(n):
+        rows = order[bounds[c]:bounds[c + 1]]
+        if len(rows) == 0:
+            full_circles.append(c)
+            continue
+        angles = np.concatenate([entry[rows], exit_[rows]])
+        delta = np.concatenate([np.ones(len(rows), dtype=np.int64), -np.ones(len(rows), dtype=np.int64)])
+        sides = np.concatenate([entry_side[rows], exit_side[rows]])
+        others = np.concatenate([other[rows], other[rows]])
+        # Sort by angle, entries first on ties so touching arcs do not leave a zero-length gap
+        ev = np.lexsort((-delta, angles))
+        angles, delta, sides, others = angles[ev], delta[ev], sides[ev], others[ev]
+        coverage = int(wraps[rows].sum()) + np.cumsum(delta)
+
+        starts = np.nonzero((delta == -1) & (coverage == 0))[0]
+        for s in starts.tolist():
+            e = (s + 1) % len(angles)
+            start_key = (min(c, int(others[s])), max(c, int(others[s])), int(sides[s]))
+            end_key = (min(c, int(others[e])), max(c, int(others[e])), int(sides[e]))
+            end_angle = angles[e] if angles[e] > angles[s] else angles[e] + TWO_PI
+            arcs.append((c, float(angles[s]), float(end_angle), start_key, end_key))
+    return arcs, full_circles
+
+
+def _arc_points(cx, cy, radius, start, end, step):
+    """Vertices along an arc, start included and end excluded."""
+    count = max(1, math.ceil((end - start) / step))
+    angles = start + (end - start) * np.arange(count) / count
+    return np.column_stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)])
+
+
+def _chain(arcs):
+    """
+    Orders arcs into rings: each arc is followed by the arc that starts where it ends.
+
+    Returns:
+        list: Rings as lists of arc indices.
+    """
+    by_start = {arc[3]: index for index, arc in enumerate(arcs)}
+    used = [False] * len(arcs)
+    rings = []
+    for first in range(len(arcs)):
+        if used[first]:
+            continue
+        ring, current = [], first
+        while current is not None and not used[current]:
+            used[current] = True
+            ring.append(current)
+            current = by_start.get(arcs[current][4])
+        rings.append(ring)
+    return rings
+
+
+def signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def buffer_union(x, y, distance, tolerance=1.0):
+    """
+    Buffers points by a distance and dissolves the result into one multipolygon.
+
+    Args:
+        x (array-like): Point x, in a projected coordinate system.
+        y (array-like): Point y.
+        distance (float): Buffer distance in the same units.
+        tolerance (float): Largest gap allowed between the output and the true circles.
+            Points closer together than this are merged first.
+
+    Returns:
+        list: Closed (n, 2) rings; outer rings counterclockwise, holes clockwise.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) == 0 or distance <= 0:
+        return []
+    tolerance = max(float(tolerance), distance * 1e-9)
+
+    # Merge duplicates (and near duplicates) so no two circles coincide
+    keys = np.unique(np.column_stack([np.round(x / tolerance), np.round(y / tolerance)]), axis=0, return_index=True)[1]
+    x, y = x[np.sort(keys)], y[np.sort(keys)]
+
+    step = 2 * math.acos(max(-1.0, 1 - tolerance / distance)) if tolerance < distance else math.pi / 2
+    step = min(step, math.pi / 2)
+
+    arcs, full_circles = _boundary_arcs(x, y, distance)
+    rings = []
+    for c in full_circles:
+        ring = _arc_points(x[c], y[c], distance, 0.0, TWO_PI, step)
+        rings.append(np.vstack([ring, ring[:1]]))
+    for chain in _chain(arcs):
+        parts = [_arc_points(x[arcs[a][0]], y[arcs[a][0]], distance, arcs[a][1], arcs[a][2], step) for a in chain]
+        ring = np.concatenate(parts)
+        if len(ring) >= 3:
+            rings.append(np.vstack([ring, ring[:1]]))
+    return rings
+
+
+def group_rings(rings):
+    """
+    Groups rings into polygons, each hole with the smallest outer ring that contains it.
+
+    Args:
+        rings (list): Rings from buffer_union.
+
+    Returns:
+        list: Polygons as lists of rings, outer ring first.
+    """
+    outers = [ring for ring in rings if signed_area(ring) > 0]
+    holes = [ring for ring in rings if signed_area(ring) <= 0]
+    polygons = [[ring] for ring in outers]
+    areas = [signed_area(ring) for ring in outers]
+    boxes = np.array([[*ring.min(axis=0), *ring.max(axis=0)] for ring in outers]).reshape(-1, 4)
+    for hole in holes:
+        px, py = hole[0]
+        nearby = np.nonzero((boxes[:, 0] <= px) & (boxes[:, 2] >= px) & (boxes[:, 1] <= py) & (boxes[:, 3] >= py))[0]
+        owners = [k for k in nearby.tolist() if points_in_rings(hole[:1, 0], hole[:1, 1], [outers[k]])[0]]
+        if owners:
+            polygons[min(owners, key=lambda k: areas[k])].append(hole)
+    return polygons
@@ -0,0 +1,215 @@
+"""
+Vectorized point-in-polygon tests with NumPy.
+
+Used in place of arcpy.analysis.SpatialJoin when all we need is which address points fall
+inside the risk zone. Points on a polygon boundary (within the XY tolerance) count as inside,
+which matches SpatialJoin's INTERSECT match option.
+"""
+import numpy as np
+
+# Upper bound on (edge, point) pairs evaluated at once, keeps memory bounded on big inputs
+MAX_PAIRS = 4_000_000
+
+
+def _edges(rings):
+    """
+    Turns a list of rings into flat edge arrays.
+
+    Args:
+        rings (list): Rings as (n, 2) coordinate arrays. Closing the ring is optional.
+
+    Returns:
+        tuple: x1, y1, x2, y2 arrays with one entry per edge.
+    """
+    starts, ends = [], []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        if len(ring) < 3:
+            continue
+        if not np.array_equal(ring[0], ring[-1]):
+            ring = np.vstack([ring, ring[:1]])
+        starts.append(ring[:-1])
+        ends.append(ring[1:])
+    if not starts:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    return starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+
+
+def points_in_rings(x, y, rings, tolerance=0.0):
+    """
+    Tests which points fall inside a polygon given as a set of rings.
+
+    Outer rings and holes are treated alike with the even-odd rule, so holes and multipart
+    polygons work as long as their parts do not overlap. Points are first cut down to the
+    polygon's bounding box, then sorted by y so each edge only looks at the points in its
+    own y band. The crossing-number test runs on all (edge, point) pairs in one go, in
+    chunks of at most MAX_PAIRS.
+
+    Args:
+        x (array-like): Point x coordinates.
+        y (array-like): Point y coordinates.
+        rings (list): Polygon rings as (n, 2) coordinate arrays.
+        tolerance (float): Points this close to an edge count as inside.
+
+    Returns:
+        numpy.ndarray: Boolean mask, True where the point is inside or on the boundary.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mask = np.zeros(len(x), dtype=bool)
+
+    x1, y1, x2, y2 = _edges(rings)
+    if len(x1) == 0 or len(x) == 0:
+        return mask
+
+    # Bounding box prefilter
+    candidates = np.nonzero(
+        (x >= min(x1.min(), x2.min()) - tolerance) & (x <= max(x1.max(), x2.max()) + tolerance) &
+        (y >= min(y1.min(), y2.min()) - tolerance) & (y <= max(y1.max(), y2.max()) + tolerance)
+    )[0]
+    if len(candidates) == 0:
+        return mask
+
+    order = np.argsort(y[candidates], kind='stable')
+    px = x[candidates][order]
+    py = y[candidates][order]
+
+    # Slice of sorted points inside each edge's y band
+    lo = np.searchsorted(py, np.minimum(y1, y2) - tolerance, side='left')
+    hi = np.searchsorted(py, np.maximum(y1, y2) + tolerance, side='right')
+    counts = hi - lo
+
+    crossings = np.zeros(len(px), dtype=np.int64)
+    on_boundary = np.zeros(len(px), dtype=bool)
+    tol_sq = tolerance * tolerance
+
+    start = 0
+    cumulative = np.cumsum(counts)
+    while start < len(counts):
+        # Take as many edges as fit under MAX_PAIRS (always at least one)
+        base = cumulative[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(cumulative, base + MAX_PAIRS, side='right')))
+        edge_counts = counts[start:stop]
+        total = int(edge_counts.sum())
+        if total:
+            edge = np.repeat(np.arange(start, stop), edge_counts)
+            offsets = np.repeat(np.cumsum(edge_counts) - edge_counts, edge_counts)
+            point = np.repeat(lo[start:stop], edge_counts) + (np.arange(total) - offsets)
+
+            ex1, ey1, ex2, ey2 = x1[edge], y1[edge], x2[edge], y2[edge]
+            qx, qy = px[point], py[point]
+
+            # Crossing number: does a ray to the right of the point cross this edge?
+            straddles = (ey1 > qy) != (ey2 > qy)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = ex1 + (qy - ey1) * (ex2 - ex1) / (ey2 - ey1)
+            crossing = straddles & (qx < x_cross)
+            crossings += np.bincount(point, weights=crossing, minlength=len(px)).astype(np.int64)
+
+            # Boundary: distance from the point to the segment
+            dx, dy = ex2 - ex1, ey2 - ey1
+            length_sq = dx * dx + dy * dy
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = np.where(length_sq > 0, ((qx - ex1) * dx + (qy - ey1) * dy) / length_sq, 0.0)
+            t = np.clip(t, 0.0, 1.0)
+            dist_sq = (ex1 + t * dx - qx) ** 2 + (ey1 + t * dy - qy) ** 2
+            touching = point[dist_sq <= tol_sq]
+            on_boundary[touching] = True
+        start = stop
+
+    inside = (crossings % 2 == 1) | on_boundary
+    mask[candidates[order]] = inside
+    return mask
+
+
+def join_counts(x, y, polygons, tolerance=0.0):
+    """
+    Counts how many polygons each point intersects, like Join_Count from a spatial join.
+
+    Args:
+        x (array-like): Point x coordinates.
+        y (array-like): Point y coordinates.
+        polygons (list): One list of rings per polygon feature.
+        tolerance (float): Points this close to an edge count as intersecting.
+
+    Returns:
+        numpy.ndarray: Integer count per point.
+    """
+    counts = np.zeros(len(np.asarray(x)), dtype=np.int64)
+    for rings in polygons:
+        counts += points_in_rings(x, y, rings, tolerance)
+    return counts
+
+
+def points_in_polygons(x, y, polygons, tolerance=0.0):
+    """
+    Membership mask for points inside any of the polygons.
+
+    Args:
+        x (array-like): Point x coordinates.
+        y (array-like): Point y coordinates.
+        polygons (list): One list of rings per polygon feature.
+        tolerance (float): Points this close to an edge count as inside.
+
+    Returns:
+        numpy.ndarray: Boolean mask.
+    """
+    return join_counts(x, y, polygons, tolerance) > 0
+
+
+def read_points(feature_class, where_clause=None):
+    """
+    Reads object IDs and coordinates of a point feature class into arrays.
+
+    Args:
+        feature_class (str): Point feature class or layer.
+        where_clause (str): Optional SQL filter.
+
+    Returns:
+        tuple: (oids, x, y) NumPy arrays.
+    """
+    import arcpy
+
+    arr = arcpy.da.FeatureClassToNumPyArray(
+        feature_class, ['OID@', 'SHAPE@X', 'SHAPE@Y'], where_clause=where_clause, skip_nulls=True
+    )
+    return arr['OID@'], arr['SHAPE@X'], arr['SHAPE@Y']
+
+
+def read_polygons(feature_class, spatial_reference=None):
+    """
+    Reads every polygon of a feature class as a list of rings.
+
+    arcpy returns each part as a point array, with None separating the outer ring from
+    its holes.
+
+    Args:
+        feature_class (str): Polygon feature class or layer.
+        spatial_reference (arcpy.SpatialReference): Optional SR to project the rings into,
+            so they match the point coordinates.
+
+    Returns:
+        list: One list of (n, 2) ring arrays per feature.
+    """
+    import arcpy
+
+    polygons = []
+    with arcpy.da.SearchCursor(feature_class, ['SHAPE@'], spatial_reference=spatial_reference) as cursor:
+        for (shape,) in cursor:
+            if shape is None:
+                continue
+            rings = []
+            for part in shape:
+                ring = []
+                for pnt in part:
+                    if pnt is None:
+                        rings.append(np.array(ring))
+                        ring = []
+                    else:
+                        ring.append((pnt.X, pnt.Y))
+                if ring:
+                    rings.append(np.array(ring))
+            polygons.append(rings)
+    return polygons
@@ -0,0 +1,298 @@
+"""
+Static R-tree over point features, bulk loaded with Sort-Tile-Recursive (STR) packing.
+
+The Addresses layer does not change between runs, so the tree is built once, saved as a
+binary .npz file next to the geodatabase and reloaded on later runs. Queries walk the tree
+level by level with NumPy instead of scanning every point.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+from analysis.pipeline import dataset_fingerprint
+from analysis.point_in_polygon import points_in_rings, read_points
+
+NODE_CAPACITY = 16
+
+
+def _str_order(cx, cy, capacity):
+    """
+    Sort-Tile-Recursive order: sort by x into vertical slices, then by y within each slice.
+
+    Args:
+        cx (numpy.ndarray): Entry center x.
+        cy (numpy.ndarray): Entry center y.
+        capacity (int): Entries per node.
+
+    Returns:
+        numpy.ndarray: Permutation that puts neighbouring entries next to each other.
+    """
+    n = len(cx)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    node_count = math.ceil(n / capacity)
+    slice_size = capacity * math.ceil(math.sqrt(node_count))
+    by_x = np.argsort(cx, kind='stable')
+    order = []
+    for start in range(0, n, slice_size):
+        chunk = by_x[start:start + slice_size]
+        order.append(chunk[np.argsort(cy[chunk], kind='stable')])
+    return np.concatenate(order)
+
+
+class PointRTree:
+    """
+    STR-packed R-tree over points.
+
+    Points are stored in leaf order. Each level is a set of arrays with one entry per node:
+    bounding box and the contiguous range of children in the level below (for the lowest
+    level, the range of points).
+
+    Attributes:
+        oids (numpy.ndarray): Object IDs in leaf order.
+        x (numpy.ndarray): Point x in leaf order.
+        y (numpy.ndarray): Point y in leaf order.
+        levels (list): Dicts of node arrays, from the leaf level up to the root.
+        fingerprint (dict): Description of the source data, used to tell if the index is stale.
+    """
+    def __init__(self, oids, x, y, levels, fingerprint=None):
+        self.oids = oids
+        self.x = x
+        self.y = y
+        self.levels = levels
+        self.fingerprint = fingerprint or {}
+
+    @classmethod
+    def build(cls, oids, x, y, capacity=NODE_CAPACITY, fingerprint=None):
+        """
+        Bulk loads a tree from point arrays.
+
+        Args:
+            oids (array-like): Object IDs.
+            x (array-like): Point x coordinates.
+            y (array-like): Point y coordinates.
+            capacity (int): Maximum children per node.
+            fingerprint (dict): Optional description of the source data.
+
+        Returns:
+            PointRTree: The packed tree.
+        """
+        oids = np.asarray(oids, dtype=np.int64)
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            # No points: a tree with no levels, whose queries find nothing
+            return cls(oids, x, y, [], fingerprint)
+
+        order = _str_order(x, y, capacity)
+        oids, x, y = oids[order], x[order], y[order]
+
+        # Entries of the level being packed: bounding boxes plus their child ranges
+        minx, miny, maxx, maxy = x, y, x, y
+        levels = []
+
+        while True:
+            n = len(minx)
+            starts = np.arange(0, n, capacity)
+            counts = np.minimum(capacity, n - starts)
+            level = {
+                'minx': np.minimum.reduceat(minx, starts) if n else minx,
+                'miny': np.minimum.reduceat(miny, starts) if n else miny,
+                'maxx': np.maximum.reduceat(maxx, starts) if n else maxx,
+                'maxy': np.maximum.reduceat(maxy, starts) if n else maxy,
+                'start': starts,
+                'count': counts,
+            }
+            if len(starts) <= 1:
+                levels.append(level)
+                break
+
+            # Reorder this level's nodes in STR order; their children move with them
+            cx = (level['minx'] + level['maxx']) / 2
+            cy = (level['miny'] + level['maxy']) / 2
+            node_order = _str_order(cx, cy, capacity)
+            level = {key: value[node_order] for key, value in level.items()}
+            levels.append(level)
+
+            minx, miny, maxx, maxy = level['minx'], level['miny'], level['maxx'], level['maxy']
+
+        return cls(oids, x, y, levels, fingerprint)
+
+    @staticmethod
+    def _expand(starts, counts):
+        """Turns child ranges into one flat array of child indices."""
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + (np.arange(total) - offsets)
+
+    def _point_candidates(self, xmin, ymin, xmax, ymax):
+        """Indices (in leaf order) of points whose leaf boxes overlap the envelope."""
+        if not self.levels:
+            return np.empty(0, dtype=np.int64)
+        nodes = np.arange(len(self.levels[-1]['minx']))
+        for depth in range(len(self.levels) - 1, -1, -1):
+            level = self.levels[depth]
+            hit = nodes[
+                (level['minx'][nodes] <= xmax) & (level['maxx'][nodes] >= xmin) &
+                (level['miny'][nodes] <= ymax) & (level['maxy'][nodes] >= ymin)
+            ]
+            nodes = self._expand(level['start'][hit], level['count'][hit])
+        return nodes
+
+    def envelope_query(self, xmin, ymin, xmax, ymax):
+        """
+        Finds points inside a rectangle (edges included).
+
+        Returns:
+            numpy.ndarray: Object IDs of the points.
+        """
+        idx = self._point_candidates(xmin, ymin, xmax, ymax)
+        keep = (self.x[idx] >= xmin) & (self.x[idx] <= xmax) & (self.y[idx] >= ymin) & (self.y[idx] <= ymax)
+        return self.oids[idx[keep]]
+
+    def polygon_query(self, rings, tolerance=0.0, exact=True):
+        """
+        Finds points inside a polygon.
+
+        Args:
+            rings (list): Polygon rings as (n, 2) arrays.
+            tolerance (float): Boundary tolerance for the exact test.
+            exact (bool): If False, return every candidate in the polygon's envelope.
+
+        Returns:
+            numpy.ndarray: Object IDs of the points.
+        """
+        coords = np.concatenate([np.asarray(ring, dtype=float) for ring in rings])
+        xmin, ymin = coords.min(axis=0) - tolerance
+        xmax, ymax = coords.max(axis=0) + tolerance
+        idx = self._point_candidates(xmin, ymin, xmax, ymax)
+        if not exact:
+            return self.oids[idx]
+        inside = points_in_rings(self.x[idx], self.y[idx], rings, tolerance)
+        return self.oids[idx[inside]]
+
+    def nearest(self, x, y, k=1):
+        """
+        k-nearest-neighbour search, best first by minimum distance to each node's box.
+
+        Args:
+            x (float): Query x.
+            y (float): Query y.
+            k (int): Number of neighbours.
+
+        Returns:
+            list: (distance, oid) pairs, nearest first.
+        """
+        def box_dist(level, i):
+            dx = max(level['minx'][i] - x, 0.0, x - level['maxx'][i])
+            dy = max(level['miny'][i] - y, 0.0, y - level['maxy'][i])
+            return math.hypot(dx, dy)
+
+        if not self.levels:
+            return []
+        top = len(self.levels) - 1
+        heap = [(box_dist(self.levels[top], i), top, i) for i in range(len(self.levels[top]['minx']))]
+        heapq.heapify(heap)
+        result = []
+        while heap and len(result) < k:
+            dist, depth, i = heapq.heappop(heap)
+            if depth == -1:
+                result.append((dist, int(self.oids[i])))
+                continue
+            level = self.levels[depth]
+            start, count = level['start'][i], level['count'][i]
+            if depth == 0:
+                for j in range(start, start + count):
+                    heapq.heappush(heap, (math.hypot(self.x[j] - x, self.y[j] - y), -1, j))
+            else:
+                below = self.levels[depth - 1]
+                for j in range(start, start + count):
+                    heapq.heappush(heap, (box_dist(below, j), depth - 1, j))
+        return result
+
+    def save(self, path):
+        """
+        Writes the tree to an uncompressed .npz file.
+
+        Args:
+            path (str): Output file path.
+        """
+        arrays = {'oids': self.oids, 'x': self.x, 'y': self.y}
+        for depth, level in enumerate(self.levels):
+            for key, value in level.items():
+                arrays[f'level{depth}_{key}'] = value
+        arrays['fingerprint'] = np.array([f'{k}={v}' for k, v in sorted(self.fingerprint.items())])
+        with open(path, 'wb') as index_file:
+            np.savez(index_file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a tree written by `save`.
+
+        Args:
+            path (str): Index file path.
+
+        Returns:
+            PointRTree: The loaded tree.
+        """
+        with np.load(path) as data:
+            levels = []
+            depth = 0
+            while f'level{depth}_minx' in data:
+                levels.append({key: data[f'level{depth}_{key}']
+                               for key in ('minx', 'miny', 'maxx', 'maxy', 'start', 'count')})
+                depth += 1
+            fingerprint = dict(item.split('=', 1) for item in data['fingerprint'].tolist())
+            return cls(data['oids'], data['x'], data['y'], levels, fingerprint)
+
+
+def layer_fingerprint(layer):
+    """
+    Describes a layer the same way the stage cache does (see
+    analysis.pipeline.dataset_fingerprint): row count, extent, and a hash of the object IDs
+    and coordinates, so a point moved inside the extent or swapped for another also
+    invalidates the saved tree. The hash is memoized, so an unchanged layer is not re-read.
+
+    Args:
+        layer (str): Feature class or layer.
+
+    Returns:
+        dict: Values as JSON strings so they round-trip through the index file.
+    """
+    return {key: json.dumps(value, sort_keys=True, default=str) for key, value in dataset_fingerprint(layer).items()}
+
+
+def address_index(config_dict, layer='Addresses'):
+    """
+    Loads the R-tree for a point layer from next to the geodatabase, rebuilding it if the
+    layer has changed since it was saved.
+
+    Args:
+        config_dict (dict): Configuration dictionary with the destination geodatabase.
+        layer (str): Point layer to index.
+
+    Returns:
+        PointRTree: Index over the layer.
+    """
+    index_path = os.path.join(os.path.dirname(config_dict['destination']), f'{layer}.rtree.npz')
+    fingerprint = layer_fingerprint(layer)
+
+    if os.path.exists(index_path):
+        tree = PointRTree.load(index_path)
+        if tree.fingerprint == fingerprint:
+            logging.debug(f'Loaded spatial index {index_path}')
+            return tree
+        logging.info(f'{layer} changed since the spatial index was built, rebuilding')
+
+    oids, x, y = read_points(layer)
+    tree = PointRTree.build(oids, x, y, fingerprint=fingerprint)
+    tree.save(index_path)
+    logging.info(f'Built spatial index for {len(oids)} {layer} points at {index_path}')
+    return tree
@@ -0,0 +1,275 @@
+"""
+Local stand-in for the Census geocoder, for load testing the ETL without the real service.
+
+Implements the two endpoints the project uses:
+- GET  /geocoder/locations/onelineaddress?address=...  JSON with result.addressMatches
+- POST /geocoder/locations/addressbatch                multipart addressFile, CSV response
+
+plus GET /stats with the request counts so far. Latency, match rate, HTTP error rate and rate
+limiting are configurable. Whether an address matches, and where, is derived from a hash of
+the address, so repeated requests get the same answer and caches behave as they would
+against the real service.
+
+Usage:
+    python benchmarks/fake_geocoder.py --port 8077 --latency lognormal --latency-ms 150 --error-rate 0.02
+
+then point geocoder_prefix_url / geocoder_batch_url in the config (or CENSUS_GEOCODER_HOST for
+the assignment scripts) at http://127.0.0.1:8077.
+"""
+import argparse
+import csv
+import email
+import email.policy
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ONELINE_PATH = '/geocoder/locations/onelineaddress'
+BATCH_PATH = '/geocoder/locations/addressbatch'
+# Matches are placed inside this lon/lat box, roughly the City of Boulder
+BOUNDS = (-105.30, 39.96, -105.18, 40.07)
+
+
+class GeocoderSettings:
+    """
+    Behaviour of the fake service.
+
+    Attributes:
+        latency (str): 'fixed', 'uniform' (0 to 2x latency_ms) or 'lognormal' (median latency_ms).
+        latency_ms (float): Typical response time of a one-line request, in milliseconds.
+        sigma (float): Spread of the lognormal distribution.
+        batch_row_ms (float): Extra time per row of a batch upload, in milliseconds.
+        match_rate (float): Fraction of addresses that match.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+        rate_limit (float): Requests per second allowed before answering 429; 0 for no limit.
+        seed (int): Seed for the random latency and error draws.
+    """
+    def __init__(self, latency='fixed', latency_ms=100.0, sigma=0.5, batch_row_ms=2.0, match_rate=0.95,
+                 error_rate=0.0, rate_limit=0.0, seed=None):
+        self.latency = latency
+        self.latency_ms = float(latency_ms)
+        self.sigma = float(sigma)
+        self.batch_row_ms = float(batch_row_ms)
+        self.match_rate = float(match_rate)
+        self.error_rate = float(error_rate)
+        self.rate_limit = float(rate_limit)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = max(self.rate_limit, 1.0)
+        self.last_refill = time.monotonic()
+        self.counts = {'oneline': 0, 'batch': 0, 'batch_rows': 0, 'matches': 0, 'no_matches': 0,
+                       'errors': 0, 'rate_limited': 0}
+
+    def delay(self, rows=0):
+        """Seconds to wait before answering a request."""
+        with self.lock:
+            if self.latency == 'uniform':
+                ms = self.random.uniform(0, 2 * self.latency_ms)
+            elif self.latency == 'lognormal':
+                ms = self.latency_ms * self.random.lognormvariate(0, self.sigma)
+            else:
+                ms = self.latency_ms
+        return (ms + rows * self.batch_row_ms) / 1000
+
+    def admit(self):
+        """
+        Returns:
+            int: HTTP status to fail the request with (429 or 500), or None to serve it.
+        """
+        with self.lock:
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                self.tokens = min(self.rate_limit, self.tokens + (now - self.last_refill) * self.rate_limit)
+                self.last_refill = now
+                if self.tokens < 1:
+                    self.counts['rate_limited'] += 1
+                    return 429
+                self.tokens -= 1
+            if self.random.random() < self.error_rate:
+                self.counts['errors'] += 1
+                return 500
+        return None
+
+    def locate(self, address):
+        """
+        Deterministic answer for an address.
+
+        Returns:
+            tuple: (x, y) lon/lat, or None when the address does not match.
+        """
+        key = ' '.join(address.replace(',', ' ').upper().split())
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        draw = int.from_bytes(digest[:4], 'big') / 2 ** 32
+        with self.lock:
+            self.counts['matches' if draw < self.match_rate else 'no_matches'] += 1
+        if draw >= self.match_rate:
+            return None
+        fx = int.from_bytes(digest[4:8], 'big') / 2 ** 32
+        fy = int.from_bytes(digest[8:12], 'big') / 2 ** 32
+        return (round(BOUNDS[0] + fx * (BOUNDS[2] - BOUNDS[0]), 6),
+                round(BOUNDS[1] + fy * (BOUNDS[3] - BOUNDS[1]), 6))
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+
+def oneline_response(address, coords):
+    """Body of a onelineaddress JSON response, trimmed to the fields clients read."""
+    matches = []
+    if coords is not None:
+        matches.append({'matchedAddress': address.upper(), 'coordinates': {'x': coords[0], 'y': coords[1]},
+                        'tigerLine': {'tigerLineId': '0', 'side': 'L'}})
+    return {'result': {'input': {'address': {'address': address}},
+                       'addressMatches': matches}}
+
+
+def batch_response(rows, settings):
+    """
+    CSV body of an addressbatch response for input rows of (id, street, city, state, zip).
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    for row in rows:
+        if not row:
+            continue
+        row = (row + [''] * 5)[:5]
+        unique_id = row[0]
+        address = ', '.join(row[1:5])
+        coords = settings.locate(', '.join(part for part in row[1:4] if part))
+        if coords is None:
+            writer.writerow([unique_id, address, 'No_Match'])
+        else:
+            writer.writerow([unique_id, address, 'Match', 'Exact', address.upper(),
+                             f'{coords[0]},{coords[1]}', '0', 'L'])
+    return out.getvalue()
+
+
+def _address_file(content_type, body):
+    """Pulls the addressFile part out of a multipart/form-data body."""
+    message = email.message_from_bytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body,
+                                       policy=email.policy.HTTP)
+    for part in message.iter_parts():
+        if part.get_param('name', header='content-disposition') == 'addressFile':
+            return part.get_payload(decode=True).decode('utf-8-sig')
+    return None
+
+
+class GeocoderHandler(BaseHTTPRequestHandler):
+    settings = None
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this Nagle adds ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reject(self):
+        status = self.settings.admit()
+        if status is not None:
+            self._send(status, json.dumps({'errors': ['simulated failure']}))
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            with self.settings.lock:
+                self._send(200, json.dumps(self.settings.counts))
+            return
+        if url.path != ONELINE_PATH:
+            self._send(404, json.dumps({'errors': ['not found']}))
+            return
+
+        self.settings.count('oneline')
+        if self._reject():
+            return
+        # The project's suffix starts with '?', which leaves a stray '?' on the address value
+        address = parse_qs(url.query).get('address', [''])[0].rstrip('?').strip()
+        time.sleep(self.settings.delay())
+        self._send(200, json.dumps(oneline_response(address, self.settings.locate(address))))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path != BATCH_PATH:
+            self._send(404, json.dumps({'errors': ['not found']}))
+            return
+
+        self.settings.count('batch')
+        if self._reject():
+            return
+        address_file = _address_file(self.headers.get('Content-Type', ''), body)
+        if address_file is None:
+            self._send(400, 'addressFile is required', 'text/plain')
+            return
+        rows = list(csv.reader(address_file.splitlines()))
+        self.settings.count('batch_rows', len(rows))
+        time.sleep(self.settings.delay(len(rows)))
+        self._send(200, batch_response(rows, self.settings), 'text/csv')
+
+
+def start_server(settings=None, host='127.0.0.1', port=0):
+    """
+    Starts the fake geocoder on a background thread.
+
+    Args:
+        settings (GeocoderSettings): Service behaviour; defaults to GeocoderSettings().
+        host (str): Interface to bind.
+        port (int): Port, 0 for any free port.
+
+    Returns:
+        tuple: (server, base URL). Call server.shutdown() to stop it.
+    """
+    handler = type('Handler', (GeocoderHandler,), {'settings': settings or GeocoderSettings()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def add_settings_arguments(parser):
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='fixed')
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--sigma', type=float, default=0.5, help='spread of the lognormal latency')
+    parser.add_argument('--batch-row-ms', type=float, default=2.0)
+    parser.add_argument('--match-rate', type=float, default=0.95)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requests per second before 429s, 0 for none')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def settings_from_args(args):
+    return GeocoderSettings(latency=args.latency, latency_ms=args.latency_ms, sigma=args.sigma,
+                            batch_row_ms=args.batch_row_ms, match_rate=args.match_rate, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit, seed=args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Census geocoder.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8077)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(settings_from_args(args), args.host, args.port)
+    print(f'Fake geocoder listening on {url} (Ctrl+C to stop)')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
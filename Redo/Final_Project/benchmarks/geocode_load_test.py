@@ -0,0 +1,202 @@
+"""
+Load test for geocoding throughput against the fake Census geocoder (or any compatible URL).
+
+Sends the same set of synthetic addresses at each concurrency level through GeocoderClient,
+the client the ETL uses, and reports geocodes per second, per-address latency percentiles
+(retries included) and error, 429 and retry counts. Use it to pick geocode_workers,
+http_max_concurrency and http_max_rate before a production run.
+
+Usage (from the Final_Project folder):
+    python benchmarks/geocode_load_test.py --addresses 1000 --concurrency 1,4,8,16 --latency lognormal
+    python benchmarks/geocode_load_test.py --mode batch --batch-size 250 --concurrency 1,2,4
+    python benchmarks/geocode_load_test.py --url http://127.0.0.1:8077 --output load.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.fake_geocoder import BATCH_PATH, ONELINE_PATH, add_settings_arguments, settings_from_args, \
+    start_server
+from etl.geocoder_client import GeocoderClient
+
+STREETS = ['Arapahoe Ave', 'Baseline Rd', 'Broadway', 'Canyon Blvd', 'Folsom St', 'Iris Ave', 'Jay Rd',
+           'Mapleton Ave', 'Pearl St', 'Table Mesa Dr', 'Valmont Rd', 'Walnut St', '28th St', '30th St']
+
+
+def synthetic_addresses(n, seed=7):
+    rng = random.Random(seed)
+    return [f'{rng.randint(100, 4999)} {rng.choice(STREETS)}' for _ in range(n)]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def geocode_oneline(client, base_url, address, timeout):
+    """
+    One address the way GSheetEtl.geocode sends it.
+
+    Returns:
+        str: 'match', 'no_match' or 'error'.
+    """
+    url = base_url + ONELINE_PATH + f'?address={address} Boulder CO' + '?&benchmark=2020&format=json'
+    try:
+        r = client.get(url, timeout=timeout)
+        matches = r.json()['result']['addressMatches']
+    except Exception:
+        return 'error'
+    return 'match' if matches else 'no_match'
+
+
+def geocode_batch(client, base_url, batch, timeout):
+    """
+    One batch upload the way GSheetEtl.geocode_batch_file sends it.
+
+    Returns:
+        list: 'match', 'no_match' or 'error' per address in the batch.
+    """
+    upload = io.StringIO()
+    writer = csv.writer(upload)
+    for i, street in enumerate(batch):
+        writer.writerow([i, street, 'Boulder', 'CO', ''])
+    try:
+        r = client.post(base_url + BATCH_PATH, data={'benchmark': '2020'},
+                        files={'addressFile': ('batch.csv', upload.getvalue().encode('utf-8'), 'text/csv')},
+                        timeout=timeout)
+        r.raise_for_status()
+    except Exception:
+        return ['error'] * len(batch)
+    matched = {row[0] for row in csv.reader(r.text.splitlines()) if len(row) >= 3 and row[2] == 'Match'}
+    return ['match' if str(i) in matched else 'no_match' for i in range(len(batch))]
+
+
+def server_counts(base_url):
+    try:
+        return requests.get(base_url + '/stats', timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def run_level(base_url, addresses, concurrency, args):
+    """
+    Geocodes every address at one concurrency level with a fresh client.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and outcome counts.
+    """
+    client = GeocoderClient(max_rate=args.max_rate, max_concurrency=concurrency, retries=args.retries,
+                            backoff=args.backoff, target_latency=args.target_latency)
+    latencies = []
+    outcomes = {'match': 0, 'no_match': 0, 'error': 0}
+    counts_before = server_counts(base_url)
+
+    def timed(func, *func_args):
+        start = time.perf_counter()
+        result = func(*func_args)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if args.mode == 'batch':
+            batches = [addresses[i:i + args.batch_size] for i in range(0, len(addresses), args.batch_size)]
+            futures = [pool.submit(timed, geocode_batch, client, base_url, batch, args.timeout) for batch in batches]
+            for future in futures:
+                seconds, results = future.result()
+                latencies.append(seconds)
+                for outcome in results:
+                    outcomes[outcome] += 1
+        else:
+            futures = [pool.submit(timed, geocode_oneline, client, base_url, address, args.timeout)
+                       for address in addresses]
+            for future in futures:
+                seconds, outcome = future.result()
+                latencies.append(seconds)
+                outcomes[outcome] += 1
+    elapsed = time.perf_counter() - start
+
+    stats = client.stats()
+    client.close()
+    counts_after = server_counts(base_url)
+    return {
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'geocodes_per_s': round(len(addresses) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'max_ms': round(max(latencies) * 1000, 1),
+        'matches': outcomes['match'],
+        'no_matches': outcomes['no_match'],
+        'errors': outcomes['error'],
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'server_errors': counts_after.get('errors', 0) - counts_before.get('errors', 0),
+        'rate_limited': counts_after.get('rate_limited', 0) - counts_before.get('rate_limited', 0),
+        'final_concurrency_limit': stats['concurrency_limit'],
+    }
+
+
+def print_table(results, mode):
+    unit = 'batch' if mode == 'batch' else 'address'
+    print(f"{'Workers':>8}{'Geocodes/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Errors':>8}"
+          f"{'Requests':>10}{'Retries':>9}{'429s':>7}   (latency per {unit})")
+    for row in results:
+        print(f"{row['concurrency']:>8}{row['geocodes_per_s']:>12}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['errors']:>8}{row['requests']:>10}{row['retries']:>9}{row['rate_limited']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Geocoding load test against a local fake Census geocoder.')
+    parser.add_argument('--url', help='base URL of a running geocoder; by default one is started in-process')
+    parser.add_argument('--addresses', type=int, default=500)
+    parser.add_argument('--concurrency', default='1,4,8,16', help='comma separated worker counts')
+    parser.add_argument('--mode', choices=['oneline', 'batch'], default='oneline')
+    parser.add_argument('--batch-size', type=int, default=250)
+    parser.add_argument('--max-rate', type=float, default=None,
+                        help='client requests per second cap (default: no cap)')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.2)
+    parser.add_argument('--target-latency', type=float, default=2.0)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    add_settings_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server, base_url = start_server(settings_from_args(args))
+        print(f'Started fake geocoder at {base_url}')
+
+    addresses = synthetic_addresses(args.addresses)
+    results = []
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            results.append(run_level(base_url, addresses, concurrency, args))
+            print(f"  {concurrency} workers: {results[-1]['geocodes_per_s']} geocodes/s")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_table(results, args.mode)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'mode': args.mode, 'addresses': args.addresses, 'results': results}, output_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
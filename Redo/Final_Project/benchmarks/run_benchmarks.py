@@ -0,0 +1,158 @@
+"""
+Benchmark suite for the WNV analysis stages on synthetic data.
+
+Runs every stage in benchmarks/stages.py at each size tier, several times, and saves the
+timings as a JSON baseline. With --compare, the new timings are checked against a saved
+baseline and any stage that got slower by more than the threshold is reported as a
+regression (exit status 1).
+
+Usage (from the Final_Project folder):
+    python benchmarks/run_benchmarks.py --tiers 1k,10k,100k --output benchmarks/baselines/main.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baselines/main.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.stages import STAGES, prepare
+from benchmarks.synthetic import generate
+
+DEFAULT_TIERS = '1k,10k,100k'
+# Stages faster than this are too noisy to call a regression
+NOISE_FLOOR_S = 0.005
+
+
+def parse_tier(tier):
+    """Turns '1k', '250k' or '1m' into an address count."""
+    tier = tier.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(tier[-1], 1)
+    return int(float(tier.rstrip('km')) * scale)
+
+
+def run_tier(addresses, seed, repeat, distance):
+    """
+    Times every stage for one size tier.
+
+    Args:
+        addresses (int): Number of synthetic addresses.
+        seed (int): Random seed for the generator.
+        repeat (int): Timed runs per stage.
+        distance (float): Buffer distance in feet.
+
+    Returns:
+        dict: Stage name mapped to median and min seconds and the output count.
+    """
+    data = generate(addresses, seed)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='wnv_benchmark_') as workspace:
+        state = prepare(data, workspace, distance)
+        for name, stage in STAGES:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output_count = stage(data, state)
+                times.append(time.perf_counter() - start)
+            results[name] = {'median_s': round(statistics.median(times), 6), 'min_s': round(min(times), 6),
+                             'output_count': output_count}
+            print(f'  {name:<24}{statistics.median(times):>10.4f}s  ({output_count} out)')
+    return results
+
+
+def run_suite(tiers, seed=42, repeat=3, distance=2500.0):
+    """
+    Runs every tier.
+
+    Returns:
+        dict: Baseline document with run metadata and results per tier.
+    """
+    results = {}
+    for tier in tiers:
+        print(f'Tier {tier} ({parse_tier(tier)} addresses)')
+        results[tier] = run_tier(parse_tier(tier), seed, repeat, distance)
+    return {
+        'meta': {'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'numpy': np.__version__, 'machine': platform.platform(), 'seed': seed, 'repeat': repeat,
+                 'distance': distance},
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compares median timings against a baseline.
+
+    Args:
+        current (dict): Results of this run.
+        baseline (dict): Results loaded from a baseline file.
+        threshold (float): Allowed slowdown as a fraction, e.g. 0.2 for 20%.
+
+    Returns:
+        list: (tier, stage, baseline_s, current_s, ratio) for every regression.
+    """
+    regressions = []
+    print(f"{'Tier':<8}{'Stage':<24}{'Baseline s':>12}{'Current s':>12}{'Ratio':>8}")
+    for tier, stages in current['results'].items():
+        for name, result in stages.items():
+            old = baseline['results'].get(tier, {}).get(name)
+            if old is None:
+                continue
+            ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+            regressed = ratio > 1 + threshold and result['median_s'] - old['median_s'] > NOISE_FLOOR_S
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{tier:<8}{name:<24}{old['median_s']:>12.4f}{result['median_s']:>12.4f}{ratio:>8.2f}{flag}")
+            if old['output_count'] != result['output_count']:
+                print(f"        {name} output changed: {old['output_count']} -> {result['output_count']}")
+            if regressed:
+                regressions.append((tier, name, old['median_s'], result['median_s'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the WNV analysis stages on synthetic data.')
+    parser.add_argument('--tiers', default=None, help=f'comma separated address counts (default {DEFAULT_TIERS})')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage')
+    parser.add_argument('--distance', type=float, default=2500.0, help='buffer distance in feet')
+    parser.add_argument('--output', help='write the results to this JSON baseline file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    # Compare like with like: same tiers, seed and distance as the baseline unless overridden
+    tiers = args.tiers or (','.join(baseline['results']) if baseline else DEFAULT_TIERS)
+    seed = baseline['meta']['seed'] if baseline and args.seed == 42 else args.seed
+    distance = baseline['meta']['distance'] if baseline and args.distance == 2500.0 else args.distance
+
+    current = run_suite(tiers.split(','), seed, args.repeat, distance)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(current, output_file, indent=2)
+        print(f'Wrote {args.output}')
+
+    if baseline is not None:
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) above {args.threshold:.0%}')
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
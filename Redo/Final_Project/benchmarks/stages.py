@@ -0,0 +1,152 @@
+"""
+The analysis stages of Final_Project.py, run with the numpy geometry backend on synthetic data.
+
+prepare() writes the synthetic layers as GeoJSON into a workspace folder and points a numpy
+backend config at it. The pipeline stages then call the real buffer_layer, buffer_loop,
+intersect_buffers, erase_avoid_zones, spatial_join, count_at_risk_addresses and
+spatial_join_to_final, so arcpy is not needed and a change to any of them shows up in the
+timings. A few kernels (the dissolved point buffer, the R-tree and the columnar count) are
+timed on their own after the pipeline.
+
+Each stage is called as stage(data, state) and returns its output feature count. `state`
+carries the config and results from earlier stages, so any stage can be timed on its own once
+prepare() and the stages before it have run.
+"""
+import json
+import os
+
+import Final_Project
+from analysis.columnar import ColumnarReader, MemoryBackend
+from analysis.geometry_backend import geometry_backend
+from analysis.point_buffer import buffer_union
+from analysis.rtree_index import PointRTree
+
+POINT_LAYERS = ['Mosquito_Larval_Sites', 'Addresses', 'avoid_points']
+POLYGON_LAYERS = ['Wetlands', 'Lakes_and_Reservoirs___Boulder_County', 'OSMP_Properties']
+AVOID_DISTANCE = 1500.0
+
+
+def _write_geojson(features, path):
+    with open(path, 'w', encoding='utf-8') as geojson_file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, geojson_file)
+
+
+def prepare(data, workspace, distance):
+    """
+    Writes a synthetic data set as GeoJSON layers and builds the config the stages run with.
+
+    Args:
+        data (dict): Output of benchmarks.synthetic.generate.
+        workspace (str): Folder for the layers and every stage output.
+        distance (float): Buffer distance in feet.
+
+    Returns:
+        dict: Initial stage state holding `config` and `distance`.
+    """
+    os.makedirs(workspace, exist_ok=True)
+    for layer in POINT_LAYERS:
+        x, y = data[layer]
+        _write_geojson([{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [px, py]},
+                         'properties': {'id': i}}
+                        for i, (px, py) in enumerate(zip(x.tolist(), y.tolist()), 1)],
+                       os.path.join(workspace, f'{layer}.geojson'))
+    for layer in POLYGON_LAYERS:
+        _write_geojson([{'type': 'Feature', 'geometry': {'type': 'Polygon',
+                                                         'coordinates': [ring.tolist() for ring in rings]},
+                         'properties': {}}
+                        for rings in data[layer]],
+                       os.path.join(workspace, f'{layer}.geojson'))
+    config = {'destination': workspace, 'proj_dir': workspace, 'geometry_backend': 'numpy'}
+    return {'config': config, 'distance': float(distance)}
+
+
+def _checked(name, result):
+    """The stage functions log and swallow their errors; a benchmark must not time a failure."""
+    if result is None:
+        raise RuntimeError(f'{name} failed, see the log')
+    return result
+
+
+def _count(state, dataset):
+    return geometry_backend(state['config']).count(dataset)
+
+
+def avoid_buffer(data, state):
+    path = _checked('buffer_layer', Final_Project.buffer_layer('avoid_points', AVOID_DISTANCE, state['config']))
+    state['config']['avoid_buffer'] = path
+    return _count(state, path)
+
+
+def buffer_loop(data, state):
+    state['buffers'] = _checked('buffer_loop', Final_Project.buffer_loop(state['config'], state['distance']))
+    return sum(_count(state, path) for path in state['buffers'])
+
+
+def intersect(data, state):
+    state['intersect'] = _checked('intersect_buffers', Final_Project.intersect_buffers(
+        state['buffers'], state['config'], 'Intersect_Benchmark'))
+    return _count(state, state['intersect'])
+
+
+def erase(data, state):
+    state['cleaned'] = _checked('erase_avoid_zones', Final_Project.erase_avoid_zones(
+        state['intersect'], state['config']))
+    return _count(state, state['cleaned'])
+
+
+def spatial_join(data, state):
+    # Every timed run joins; only spatial_join_to_final below is served from the memo
+    Final_Project._join_memo.clear()
+    state['joined'] = _checked('spatial_join', Final_Project.spatial_join(state['cleaned'], state['config']))
+    return _count(state, state['joined'])
+
+
+def count_at_risk(data, state):
+    return _checked('count_at_risk_addresses', Final_Project.count_at_risk_addresses(
+        state['joined'], state['cleaned'], state['config']))
+
+
+def spatial_join_to_final(data, state):
+    state['targets'] = _checked('spatial_join_to_final', Final_Project.spatial_join_to_final(
+        state['cleaned'], state['config']))
+    return _count(state, state['targets'])
+
+
+def point_dissolve(data, state):
+    """Dissolved buffers of the point layers, the 'union' point_buffer_engine."""
+    rings = buffer_union(*data['Mosquito_Larval_Sites'], state['distance'])
+    rings += buffer_union(*data['avoid_points'], AVOID_DISTANCE)
+    return len(rings)
+
+
+def rtree_build(data, state):
+    state['tree'] = PointRTree.build(data['oids'], *data['Addresses'])
+    return len(state['tree'].oids)
+
+
+def rtree_polygon_query(data, state):
+    """Addresses inside each park, like the R-tree path of the numpy spatial join."""
+    return int(sum(len(state['tree'].polygon_query(rings)) for rings in data['OSMP_Properties']))
+
+
+def columnar_count(data, state):
+    """Join_Count >= 1 over the target addresses, the columnar count of the arcpy path."""
+    properties = geometry_backend(state['config']).load(state['targets'])['properties']
+    reader = ColumnarReader(None, ['Join_Count'], where_clause='Join_Count >= 1',
+                            backend=MemoryBackend({'Join_Count': [row['Join_Count'] for row in properties]}))
+    return reader.count()
+
+
+STAGES = [
+    ('avoid_buffer', avoid_buffer),
+    ('buffer_loop', buffer_loop),
+    ('intersect', intersect),
+    ('erase', erase),
+    ('spatial_join', spatial_join),
+    ('count_at_risk', count_at_risk),
+    ('spatial_join_to_final', spatial_join_to_final),
+    ('point_dissolve', point_dissolve),
+    ('rtree_build', rtree_build),
+    ('rtree_polygon_query', rtree_polygon_query),
+    ('columnar_count', columnar_count),
+]
@@ -0,0 +1,105 @@
+"""
+Seeded generator for synthetic Boulder-like test data.
+
+Coordinates are in feet over a 50,000 ft square, roughly the City of Boulder in State Plane.
+Feature counts scale with the number of addresses, so one call builds a consistent data set
+for a size tier:
+
+- larval sites: points clustered around a few drainages
+- wetlands and lakes: irregular polygons, wetlands small and many, lakes fewer and larger
+- parks: irregular polygons spread over the town
+- addresses: points clustered around neighbourhood centers, plus some uniform scatter
+- avoid points: a random subset of address locations (residents who opted out of spraying)
+"""
+import numpy as np
+
+XMIN, YMIN = 3_040_000.0, 1_220_000.0
+SIZE = 50_000.0
+
+
+def _clamp(n, low, high):
+    return int(min(max(n, low), high))
+
+
+def clustered_points(rng, n, clusters, spread):
+    """
+    Points drawn around random cluster centers.
+
+    Args:
+        rng (numpy.random.Generator): Random generator.
+        n (int): Number of points.
+        clusters (int): Number of cluster centers.
+        spread (float): Standard deviation of the offsets, in feet.
+
+    Returns:
+        tuple: x, y arrays clipped to the study area.
+    """
+    cx = rng.uniform(XMIN, XMIN + SIZE, clusters)
+    cy = rng.uniform(YMIN, YMIN + SIZE, clusters)
+    pick = rng.integers(0, clusters, n)
+    x = np.clip(cx[pick] + rng.normal(0, spread, n), XMIN, XMIN + SIZE)
+    y = np.clip(cy[pick] + rng.normal(0, spread, n), YMIN, YMIN + SIZE)
+    return x, y
+
+
+def blob_polygons(rng, n, min_radius, max_radius, vertices=24):
+    """
+    Irregular star-shaped polygons, one ring each.
+
+    Args:
+        rng (numpy.random.Generator): Random generator.
+        n (int): Number of polygons.
+        min_radius (float): Smallest mean radius, in feet.
+        max_radius (float): Largest mean radius, in feet.
+        vertices (int): Vertices per ring.
+
+    Returns:
+        list: One list holding a closed (vertices + 1, 2) ring per polygon.
+    """
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    polygons = []
+    for _ in range(n):
+        cx = rng.uniform(XMIN, XMIN + SIZE)
+        cy = rng.uniform(YMIN, YMIN + SIZE)
+        radius = rng.uniform(min_radius, max_radius)
+        # Two low harmonics keep the outline irregular but never self-intersecting
+        wobble = 1 + 0.25 * np.sin(2 * angles + rng.uniform(0, 2 * np.pi)) \
+            + 0.1 * np.sin(5 * angles + rng.uniform(0, 2 * np.pi))
+        ring = np.column_stack([cx + radius * wobble * np.cos(angles), cy + radius * wobble * np.sin(angles)])
+        polygons.append([np.vstack([ring, ring[:1]])])
+    return polygons
+
+
+def generate(addresses, seed=42):
+    """
+    Builds one synthetic data set.
+
+    Args:
+        addresses (int): Number of address points.
+        seed (int): Random seed; the same seed and size always give the same data.
+
+    Returns:
+        dict: Point layers as (x, y) tuples and polygon layers as lists of ring lists, keyed
+        by the project's layer names, plus `oids` for the addresses.
+    """
+    rng = np.random.default_rng(seed)
+    address_x, address_y = clustered_points(rng, addresses, clusters=_clamp(addresses // 2000, 8, 200),
+                                            spread=1500.0)
+    scatter = rng.random(addresses) < 0.1
+    address_x[scatter] = rng.uniform(XMIN, XMIN + SIZE, scatter.sum())
+    address_y[scatter] = rng.uniform(YMIN, YMIN + SIZE, scatter.sum())
+
+    avoid = rng.choice(addresses, _clamp(addresses // 200, 10, 5000), replace=False)
+
+    return {
+        'oids': np.arange(1, addresses + 1, dtype=np.int64),
+        'Addresses': (address_x, address_y),
+        'Mosquito_Larval_Sites': clustered_points(rng, _clamp(addresses // 50, 100, 5000),
+                                                  clusters=12, spread=800.0),
+        'Wetlands': blob_polygons(rng, _clamp(addresses // 500, 50, 500), 150.0, 900.0),
+        'Lakes_and_Reservoirs___Boulder_County': blob_polygons(rng, _clamp(addresses // 5000, 20, 100),
+                                                               400.0, 2500.0),
+        'OSMP_Properties': blob_polygons(rng, _clamp(addresses // 2000, 30, 300), 500.0, 3000.0),
+        'avoid_points': (address_x[avoid] + rng.normal(0, 20, len(avoid)),
+                         address_y[avoid] + rng.normal(0, 20, len(avoid))),
+    }
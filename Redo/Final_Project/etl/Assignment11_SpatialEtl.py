@@ -1,7 +1,24 @@
 import csv
+import io
+import logging
 import os
-import arcpy.management
-import requests
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    import arcpy.management
+except ImportError:
+    # Without ArcGIS the ETL loads through the numpy geometry backend
+    arcpy = None
+from analysis.geometry_backend import geometry_backend
+from etl.address_normalizer import AddressDeduper
+from etl.extract_state import ExtractState, row_fingerprint
+from etl.geocode_cache import GeocodeCache
+from etl.geocoder_client import GeocoderClient
+from etl.stage_pipeline import PipelineQueue, StageStats, format_report, run_stage
+from instrumentation import annotate, instrument
+
+NO_MATCH_ERROR = 'no address match'
 
 
 class SpatialEtl:
@@ -16,6 +33,14 @@ class SpatialEtl:
         destination (str): Path to output geodatabase.
         geocoder_prefix_url (str): URL prefix for the geocoding service.
         geocoder_suffix_url (str): URL suffix for the geocoding service.
+        geocode_workers (int): Number of geocoding requests allowed in flight at once.
+        geocode_timeout (float): Seconds to wait on a single geocoding request.
+        geocode_mode (str): 'oneline' for one request per address or 'batch' for batch uploads.
+        geocoder_batch_url (str): URL of the batch geocoding endpoint.
+        geocoder_benchmark (str): Census benchmark used for batch uploads.
+        geocode_batch_size (int): Addresses per batch upload (the Census limit is 10,000).
+        geocode_batch_timeout (float): Seconds to wait on a single batch upload.
+        client (GeocoderClient): Shared HTTP client used for every request.
     """
     def __init__(self, config_dict):
         self.config_dict = config_dict
@@ -25,6 +50,15 @@ class SpatialEtl:
         self.destination = config_dict['destination']
         self.geocoder_prefix_url = config_dict['geocoder_prefix_url']
         self.geocoder_suffix_url = config_dict['geocoder_suffix_url']
+        self.geocode_workers = int(config_dict.get('geocode_workers', 1))
+        self.geocode_timeout = float(config_dict.get('geocode_timeout', 30))
+        self.geocode_mode = config_dict.get('geocode_mode', 'oneline')
+        self.geocoder_batch_url = config_dict.get(
+            'geocoder_batch_url', 'https://geocoding.geo.census.gov/geocoder/locations/addressbatch')
+        self.geocoder_benchmark = str(config_dict.get('geocoder_benchmark', '2020'))
+        self.geocode_batch_size = min(int(config_dict.get('geocode_batch_size', 10000)), 10000)
+        self.geocode_batch_timeout = float(config_dict.get('geocode_batch_timeout', 600))
+        self.client = GeocoderClient.from_config(config_dict)
     def extract(self):
         print(f"Extracting data from {self.remote} to {self.local_dir}")
     def transform(self):
@@ -40,13 +74,47 @@ class GSheetEtl(SpatialEtl):
     """
     def __init__(self, config_dict):
         super().__init__(config_dict)
+        self.cache = None
+        self.cache_stats = None
+        if config_dict.get('geocode_cache', False):
+            self.cache = GeocodeCache(
+                os.path.join(self.local_dir, 'geocode_cache.sqlite'),
+                ttl_days=config_dict.get('geocode_cache_ttl_days'),
+                max_entries=config_dict.get('geocode_cache_max_entries')
+            )
+
+        self.streaming = config_dict.get('stream_extract', False)
+        self.pipelined = config_dict.get('pipelined_etl', False)
+        self.pipeline_queue_size = int(config_dict.get('pipeline_queue_size', 1000))
+        self.load_batch_size = int(config_dict.get('load_batch_size', 500))
+        self.pipeline_report = None
+        self.keep_addresses_csv = config_dict.get('keep_addresses_csv', True)
+        self.write_geocoded_csv = config_dict.get('write_geocoded_csv', False)
+        self.point_load = config_dict.get('point_load', 'cursor')
+        self.normalize_addresses = config_dict.get('normalize_addresses', False)
+        self.dedupe_stats = None
+        self.points = []
+        self.incremental = (config_dict.get('incremental_extract', False) and not self.streaming
+                            and not self.pipelined)
+        self.changed = True
+        self.geocode_results = []
+        self.geocode_failures = []
+        self._new_snapshot = None
+        if self.incremental:
+            self.extract_state = ExtractState(os.path.join(self.local_dir, 'extract_state.json'))
 
+    @instrument('GSheetEtl.extract', count_output=False)
     def extract(self):
         """
         Downloads CSV data from the remote Google Sheets URL and saves it locally.
+
+        With `incremental_extract` in the config, see `_extract_incremental`.
         """
+        if self.incremental:
+            return self._extract_incremental()
+
         print(f"Extracting addresses from google sheets")
-        r = requests.get(
+        r = self.client.get(
             self.remote
         )
         r.encoding = 'utf-8'
@@ -58,66 +126,707 @@ class GSheetEtl(SpatialEtl):
 
         self.local_path = output_file_path
 
+    def _extract_incremental(self):
+        """
+        Downloads the sheet only if it changed and works out which rows are new or gone.
+
+        The request carries the ETag / Last-Modified of the previous download, so an unchanged
+        sheet comes back as 304 with no body. Otherwise every row is fingerprinted and compared
+        with the stored snapshot. Only the added rows are written to addresses_added.csv for
+        `transform`, and the stored points of removed rows are kept for `load` to delete.
+        Sets `self.changed` to False when there is nothing to do.
+        """
+        print(f"Extracting addresses from google sheets (incremental)")
+        state = self.extract_state
+        output_file_path = os.path.join(self.local_dir, 'addresses.csv')
+        self.local_path = output_file_path
+
+        if state.has_snapshot and not geometry_backend(self.config_dict).exists(
+                os.path.join(self.destination, 'avoid_points')):
+            # The layer the snapshot describes is gone, so rebuild everything
+            state.fingerprints = []
+        headers = state.conditional_headers() if state.has_snapshot else {}
+        r = self.client.get(self.remote, headers=headers)
+        if r.status_code == 304:
+            print('Sheet has not changed since the last run')
+            logging.info('Conditional GET returned 304, skipping extract')
+            self.changed = False
+            return
+        r.raise_for_status()
+        r.encoding = 'utf-8'
+        data = r.text
+
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(data)
+
+        rows = list(csv.DictReader(io.StringIO(data)))
+        fingerprints = [row_fingerprint(row) for row in rows]
+        added, removed = state.diff(fingerprints)
+        self._new_snapshot = (r.headers.get('ETag'), r.headers.get('Last-Modified'), fingerprints)
+
+        if not state.has_snapshot:
+            # First run: everything is new, transform the full file
+            self.added_fingerprints = fingerprints
+            self.removed_points = []
+            self.changed = True
+            return
+
+        self.added_fingerprints = []
+        added_rows = []
+        for row, fingerprint in zip(rows, fingerprints):
+            if added[fingerprint] > 0:
+                added[fingerprint] -= 1
+                added_rows.append(row)
+                self.added_fingerprints.append(fingerprint)
+        self.removed_points = [state.points[fp] for fp in removed.elements() if fp in state.points]
+        self.changed = bool(added_rows or self.removed_points)
+
+        added_path = os.path.join(self.local_dir, 'addresses_added.csv')
+        with open(added_path, 'w', encoding='utf-8', newline='') as added_file:
+            writer = csv.DictWriter(added_file, fieldnames=list(rows[0].keys()) if rows else ['Address'])
+            writer.writeheader()
+            writer.writerows(added_rows)
+        self.local_path = added_path
+
+        logging.info(f'Incremental extract: {len(added_rows)} rows added, '
+                     f'{sum(removed.values())} rows removed out of {len(rows)}')
+
+    def geocode(self, address):
+        """
+        Sends a single address to the geocoding service.
+
+        Args:
+            address (str): Full address string to geocode.
+
+        Returns:
+            tuple: (x, y) coordinates of the first match.
+
+        Raises:
+            LookupError: If the service returns no match for the address.
+            requests.HTTPError: If the service still answers with an error status after the
+                client's retries, so the failure is not mistaken for a no-match.
+        """
+        geocode_url = self.geocoder_prefix_url + f"?address={address}" + self.geocoder_suffix_url
+
+        r = self.client.get(geocode_url, timeout=self.geocode_timeout)
+        r.raise_for_status()
+        try:
+            resp = r.json()
+            match = resp['result']['addressMatches'][0]
+            return match['coordinates']['x'], match['coordinates']['y']
+        except (IndexError, KeyError, ValueError):
+            raise LookupError(NO_MATCH_ERROR)
+
+    def _geocode_row(self, address):
+        """
+        Geocodes one address and turns any failure into a result instead of an exception,
+        so one bad address never takes the whole pool down.
+
+        Args:
+            address (str): Full address string to geocode.
+
+        Returns:
+            tuple: (address, coordinates or None, error message or None)
+        """
+        print(f'Geocoding: {address}')
+        try:
+            return address, self.geocode(address), None
+        except Exception as e:
+            return address, None, str(e)
+
+    def _write_batch_files(self, streets):
+        """
+        Splits the street addresses into Census batch upload files.
+
+        Each file has no header and the columns Unique ID, Street address, City, State, ZIP.
+        The Unique ID is the row index in addresses.csv so results can be put back in order.
+
+        Args:
+            streets (list): Street addresses in input order.
+
+        Returns:
+            list: Paths to the batch files that were written.
+        """
+        batch_dir = os.path.join(self.local_dir, 'geocode_batches')
+        os.makedirs(batch_dir, exist_ok=True)
+
+        batch_paths = []
+        for start in range(0, len(streets), self.geocode_batch_size):
+            batch_path = os.path.join(batch_dir, f'batch_{len(batch_paths):04d}.csv')
+            with open(batch_path, 'w', encoding='utf-8', newline='') as batch_file:
+                writer = csv.writer(batch_file)
+                for i, street in enumerate(streets[start:start + self.geocode_batch_size], start):
+                    writer.writerow([i, street, 'Boulder', 'CO', ''])
+            batch_paths.append(batch_path)
+
+        return batch_paths
+
+    def geocode_batch_file(self, batch_path):
+        """
+        Uploads one batch file to the Census addressbatch endpoint and parses the response.
+
+        Response rows look like:
+        "0","123 Main St, Boulder, CO, ","Match","Exact","123 MAIN ST, BOULDER, CO, 80302","-105.27,40.01","123","L"
+
+        Args:
+            batch_path (str): Path to a batch file written by `_write_batch_files`.
+
+        Returns:
+            dict: Unique ID (int) mapped to (x, y) for matches, or None for no match.
+        """
+        print(f'Geocoding batch: {batch_path}')
+        with open(batch_path, 'rb') as batch_file:
+            r = self.client.post(
+                self.geocoder_batch_url,
+                data={'benchmark': self.geocoder_benchmark},
+                files={'addressFile': (os.path.basename(batch_path), batch_file, 'text/csv')},
+                timeout=self.geocode_batch_timeout
+            )
+        r.raise_for_status()
+        r.encoding = 'utf-8'
+
+        matches = {}
+        for row in csv.reader(r.text.splitlines()):
+            if not row or not row[0].isdigit():
+                continue
+            if len(row) >= 6 and row[2] == 'Match':
+                x, y = row[5].split(',')
+                matches[int(row[0])] = (float(x), float(y))
+            else:
+                matches[int(row[0])] = None
+        return matches
+
+    def _geocode_batches(self, streets):
+        """
+        Geocodes all street addresses through the batch endpoint, sending batches in parallel.
+
+        Args:
+            streets (list): Street addresses in input order.
+
+        Returns:
+            list: (address, coordinates or None, error message or None) in input order.
+        """
+        batch_paths = self._write_batch_files(streets)
+        matches = {}
+        errors = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.geocode_workers, len(batch_paths)))) as pool:
+            futures = {pool.submit(self.geocode_batch_file, path): path for path in batch_paths}
+            for future in as_completed(futures):
+                try:
+                    matches.update(future.result())
+                except Exception as e:
+                    logging.error(f'Batch geocode failed for {futures[future]}: {e}')
+                    errors[futures[future]] = str(e)
+
+        # Map each row back to the batch it was sent in so a failed upload is reported per address
+        results = []
+        for i, street in enumerate(streets):
+            address = street + ' Boulder CO'
+            batch_path = batch_paths[i // self.geocode_batch_size]
+            if batch_path in errors:
+                results.append((address, None, errors[batch_path]))
+            elif matches.get(i) is None:
+                results.append((address, None, NO_MATCH_ERROR))
+            else:
+                results.append((address, matches[i], None))
+        return results
+
+    def geocode_streets(self, streets):
+        """
+        Geocodes street addresses with the configured mode.
+
+        Args:
+            streets (list): Street addresses without city or state.
+
+        Returns:
+            list: (address, coordinates or None, error message or None) in input order.
+        """
+        if self.geocode_mode == 'batch':
+            return self._geocode_batches(streets)
+
+        addresses = [street + ' Boulder CO' for street in streets]
+        if self.geocode_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.geocode_workers) as pool:
+                # map() yields results in input order no matter which request finishes first
+                return list(pool.map(self._geocode_row, addresses))
+        return [self._geocode_row(address) for address in addresses]
+
+    def _geocode_with_cache(self, streets):
+        """
+        Answers what it can from the geocode cache and only sends the misses to the geocoder.
+        Matches and definite no-matches are stored back; network errors are not cached.
+
+        Args:
+            streets (list): Street addresses without city or state.
+
+        Returns:
+            list: (address, coordinates or None, error message or None) in input order.
+        """
+        results = [None] * len(streets)
+        pending = []
+        for i, street in enumerate(streets):
+            address = street + ' Boulder CO'
+            cached = self.cache.get(street)
+            if cached is None:
+                pending.append(i)
+            elif cached[1] is None:
+                results[i] = (address, None, NO_MATCH_ERROR)
+            else:
+                results[i] = (address, cached[1], None)
+
+        if pending:
+            fresh = self.geocode_streets([streets[i] for i in pending])
+            for i, result in zip(pending, fresh):
+                results[i] = result
+            self.cache.put_many((streets[i], coords) for i, (_, coords, error) in zip(pending, fresh)
+                                if coords is not None or error == NO_MATCH_ERROR)
+
+        self.cache.evict()
+        self.cache_stats = self.cache.report()
+        return results
+
+    @instrument('GSheetEtl.transform', count_output=False)
     def transform(self):
         """
         Extracts address from the CSV and then geocodes the addresses.
+
+        Addresses already in the geocode cache are not sent to the geocoder again.
+        With `geocode_mode: batch` in the config the rest are uploaded to the Census batch
+        endpoint; otherwise, with `geocode_workers` greater than 1, up to that many requests
+        are in flight at once. Rows are still written in the same order as the input CSV.
+        Addresses that fail are kept in `self.geocode_failures` and written to
+        geocode_failures.csv. Matched coordinates are kept in `self.points` for `load`;
+        geocoded_addresses.csv is only written with `write_geocoded_csv`.
+        With `normalize_addresses`, rows are collapsed onto their canonical addresses first
+        (see etl/address_normalizer.py) and each canonical address is geocoded once, under the
+        first spelling of it in the sheet.
         """
         print(f"Transform addresses via geocoding")
         input_csv = self.local_path
         output_csv = os.path.join(self.local_dir, 'geocoded_addresses.csv')
+        failures_csv = os.path.join(self.local_dir, 'geocode_failures.csv')
         self.transformed_path = output_csv
+        self.geocode_failures = []
 
-        with open(input_csv, 'r', encoding='utf-8') as infile, \
-            open(output_csv, 'w', encoding='utf-8') as outfile:
-
+        with open(input_csv, 'r', encoding='utf-8') as infile:
             reader = csv.DictReader(infile)
-            writer = csv.writer(outfile)
-            writer.writerow(['X', 'Y', 'Type'])
+            streets = [row['Address'] for row in reader]
 
-            for row in reader:
-                address = row['Address'] + ' Boulder CO'
-                print (f'Geocoding: {address}')
+        queries = streets
+        if self.normalize_addresses:
+            deduper = AddressDeduper()
+            rows = [deduper.add(street)[0] for street in streets]
+            queries = deduper.originals
 
-                geocode_url = self.geocoder_prefix_url + f"?address={address}" + self.geocoder_suffix_url
+        if self.cache is not None:
+            results = self._geocode_with_cache(queries)
+        else:
+            results = self.geocode_streets(queries)
 
-                r = requests.get(geocode_url)
-                try:
-                    resp = r.json()
-                    match = resp['result']['addressMatches'][0]
-                    x = match['coordinates']['x']
-                    y = match['coordinates']['y']
-                    writer.writerow([x, y, "Residential"])
-                except (IndexError, KeyError):
+        if self.normalize_addresses:
+            # Fan each canonical result back out to its rows, under the address as submitted
+            results = [(street + ' Boulder CO',) + results[k][1:] for street, k in zip(streets, rows)]
+            self._report_dedupe(deduper)
+
+        self.points = []
+        for address, coords, error in results:
+            if coords is None:
+                print("No match for:", address)
+                logging.warning(f'Geocode failed for {address}: {error}')
+                self.geocode_failures.append((address, error))
+                continue
+            self.points.append(coords)
+        self._write_geocoded_csv(output_csv)
+
+        with open(failures_csv, 'w', encoding='utf-8') as failfile:
+            writer = csv.writer(failfile)
+            writer.writerow(['Address', 'Error'])
+            writer.writerows(self.geocode_failures)
+
+        self.geocode_results = results
+        annotate(input_count=len(results), output_count=len(results) - len(self.geocode_failures))
+        logging.info(f'Geocoded {len(results) - len(self.geocode_failures)} of {len(results)} addresses')
+        self.client.log_stats()
+
+    def _stream_lines(self):
+        """
+        Reads the published sheet line by line as it downloads.
+
+        If `keep_addresses_csv` is set in the config, each line is also written to
+        addresses.csv as it passes through.
+
+        Yields:
+            str: One line of CSV text.
+        """
+        with self.client.get(self.remote, stream=True, timeout=self.geocode_timeout) as r:
+            r.raise_for_status()
+            r.encoding = 'utf-8'
+            if not self.keep_addresses_csv:
+                yield from r.iter_lines(chunk_size=8192, decode_unicode=True)
+                return
+
+            self.local_path = os.path.join(self.local_dir, 'addresses.csv')
+            with open(self.local_path, 'w', encoding='utf-8') as output_file:
+                for line in r.iter_lines(chunk_size=8192, decode_unicode=True):
+                    output_file.write(line + '\n')
+                    yield line
+
+    def _stream_geocode(self, streets, deduper=None):
+        """
+        Geocodes a stream of street addresses with at most `geocode_workers` requests in flight.
+        Cached addresses are answered without a request. Only the in-flight window is held
+        in memory, and results come out in input order.
+
+        With a deduper, a street whose canonical address was seen earlier in the stream reuses
+        that request or result instead of sending another. The first spelling is what is sent.
+        The results of unique addresses are then kept for the rest of the stream.
+
+        Args:
+            streets (iterable): Street addresses without city or state.
+            deduper (AddressDeduper): Collapses variants of the same address, or None.
+
+        Yields:
+            tuple: (address, coordinates or None, error message or None)
+        """
+        window = deque()
+        seen = []
+        stored = set()
+
+        def drain():
+            address, key, future_or_result = window.popleft()
+            if not isinstance(future_or_result, tuple):
+                query, coords, error = future_or_result.result()
+                if (self.cache is not None and key not in stored
+                        and (coords is not None or error == NO_MATCH_ERROR)):
+                    self.cache.put(key, coords)
+                    stored.add(key)
+                future_or_result = (query, coords, error)
+            return (address,) + future_or_result[1:]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.geocode_workers)) as pool:
+            for street in streets:
+                address = street + ' Boulder CO'
+                if deduper is not None:
+                    index, new = deduper.add(street)
+                    key = deduper.unique[index]
+                    if not new:
+                        window.append((address, key, seen[index]))
+                        continue
+                else:
+                    key = street
+
+                cached = self.cache.get(key) if self.cache is not None else None
+                if cached is None:
+                    item = pool.submit(self._geocode_row, address)
+                elif cached[1] is None:
+                    item = (address, None, NO_MATCH_ERROR)
+                else:
+                    item = (address, cached[1], None)
+                window.append((address, key, item))
+                if deduper is not None:
+                    seen.append(item)
+
+                while len(window) > self.geocode_workers:
+                    yield drain()
+            while window:
+                yield drain()
+
+    def _report_dedupe(self, deduper):
+        """
+        Logs and prints how many geocode requests normalization saved, and keeps the figures in
+        `self.dedupe_stats` and the run report.
+        """
+        self.dedupe_stats = deduper.report()
+        annotate(dedupe=self.dedupe_stats)
+        message = (f"Address normalization: {self.dedupe_stats['rows']} rows, "
+                   f"{self.dedupe_stats['unique']} unique addresses "
+                   f"({self.dedupe_stats['reduction']:.1%} fewer geocodes)")
+        logging.info(message)
+        print(message)
+
+    @instrument('GSheetEtl.stream_transform', count_output=False)
+    def stream_transform(self):
+        """
+        Streaming alternative to `extract` + `transform`.
+
+        The download is read line by line and fed through parse -> normalize -> geocode -> write
+        generators, so the first geocode request goes out before the download is finished and
+        memory use does not grow with the size of the sheet. Always uses one-line geocoding.
+        """
+        print(f"Streaming addresses from google sheets through the geocoder")
+        output_csv = os.path.join(self.local_dir, 'geocoded_addresses.csv')
+        failures_csv = os.path.join(self.local_dir, 'geocode_failures.csv')
+        self.transformed_path = output_csv
+        self.geocode_failures = []
+
+        rows = csv.DictReader(self._stream_lines())
+        streets = (row['Address'] for row in rows if row.get('Address'))
+        deduper = AddressDeduper() if self.normalize_addresses else None
+
+        total = 0
+        self.points = []
+        with open(failures_csv, 'w', encoding='utf-8') as failfile:
+            fail_writer = csv.writer(failfile)
+            fail_writer.writerow(['Address', 'Error'])
+
+            for address, coords, error in self._stream_geocode(streets, deduper):
+                total += 1
+                if coords is None:
                     print("No match for:", address)
+                    logging.warning(f'Geocode failed for {address}: {error}')
+                    self.geocode_failures.append((address, error))
+                    fail_writer.writerow([address, error])
+                    continue
+                self.points.append(coords)
+        self._write_geocoded_csv(output_csv)
+        if deduper is not None:
+            self._report_dedupe(deduper)
+
+        if self.cache is not None:
+            self.cache.evict()
+            self.cache_stats = self.cache.report()
+        annotate(input_count=total, output_count=total - len(self.geocode_failures))
+        logging.info(f'Geocoded {total - len(self.geocode_failures)} of {total} addresses (streaming)')
+        self.client.log_stats()
+
+    @instrument('GSheetEtl.pipelined_process', count_output=False)
+    def pipelined_process(self):
+        """
+        Runs download, geocoding and loading at the same time instead of one after another.
+
+        extract -> [address queue] -> geocode -> [batch queue] -> load
 
+        The extract stage streams the sheet (as in stream_transform) into a bounded address
+        queue. The geocode stage keeps `geocode_workers` requests in flight and groups the
+        results into micro-batches of `load_batch_size`. The load stage, on this thread,
+        inserts each batch into avoid_points as it arrives. Avoid_Points_buffer is built once
+        the stream closes. Queue depths and the share of time each stage was busy are logged
+        and kept in `self.pipeline_report`. If any stage fails, the queues are stopped so the
+        other stages return instead of blocking, and the first error is raised.
+        """
+        print(f"Loading addresses from google sheets through a pipelined geocode and load")
+        output_csv = os.path.join(self.local_dir, 'geocoded_addresses.csv')
+        failures_csv = os.path.join(self.local_dir, 'geocode_failures.csv')
+        self.transformed_path = output_csv
+        self.geocode_failures = []
+
+        stop = threading.Event()
+        addresses = PipelineQueue('addresses', self.pipeline_queue_size, stop)
+        batches = PipelineQueue('batches', max(1, self.pipeline_queue_size // max(1, self.load_batch_size)), stop)
+        extract_stats, geocode_stats, load_stats = StageStats('extract'), StageStats('geocode'), StageStats('load')
+
+        def extract():
+            for row in csv.DictReader(self._stream_lines()):
+                if row.get('Address'):
+                    addresses.put(row['Address'], extract_stats)
+
+        deduper = AddressDeduper() if self.normalize_addresses else None
+
+        def geocode():
+            batch = []
+            for result in self._stream_geocode(addresses.drain(geocode_stats), deduper):
+                batch.append(result)
+                if len(batch) >= self.load_batch_size:
+                    batches.put(batch, geocode_stats)
+                    batch = []
+            if batch:
+                batches.put(batch, geocode_stats)
+
+        backend = geometry_backend(self.config_dict)
+        if backend.name == 'arcpy':
+            arcpy.env.workspace = self.destination
+            arcpy.env.overwriteOutput = True
+        writer = backend.point_writer('avoid_points')
+
+        extract_thread, extract_errors = run_stage(extract_stats, extract, addresses)
+        geocode_thread, geocode_errors = run_stage(geocode_stats, geocode, batches)
+
+        load_stats.start()
+        total = 0
+        self.points = []
+        try:
+            with open(failures_csv, 'w', encoding='utf-8') as failfile:
+                fail_writer = csv.writer(failfile)
+                fail_writer.writerow(['Address', 'Error'])
+
+                for batch in batches.drain(load_stats):
+                    points = []
+                    for address, coords, error in batch:
+                        total += 1
+                        if coords is None:
+                            print("No match for:", address)
+                            logging.warning(f'Geocode failed for {address}: {error}')
+                            self.geocode_failures.append((address, error))
+                            fail_writer.writerow([address, error])
+                            continue
+                        points.append(coords)
+                    writer.insert(points)
+                    self.points.extend(points)
+                    load_stats.items += 1
+        except BaseException:
+            # Stop the producers rather than leave them blocked on full queues
+            addresses.cancel()
+            batches.cancel()
+            extract_thread.join()
+            geocode_thread.join()
+            raise
+        writer.close()
+        self._write_geocoded_csv(output_csv)
+
+        extract_thread.join()
+        geocode_thread.join()
+        for errors in (extract_errors, geocode_errors):
+            if errors:
+                raise errors[0]
+
+        backend.buffer('avoid_points', os.path.join(self.destination, 'Avoid_Points_buffer'), 1500)
+        load_stats.finish()
+        if deduper is not None:
+            self._report_dedupe(deduper)
+
+        if self.cache is not None:
+            self.cache.evict()
+            self.cache_stats = self.cache.report()
+        stages = [extract_stats, geocode_stats, load_stats]
+        queues = [addresses, batches]
+        self.pipeline_report = {'stages': {stats.name: stats.report() for stats in stages},
+                                'queues': {q.name: q.report() for q in queues}}
+        annotate(input_count=total, output_count=writer.count, pipeline=self.pipeline_report)
+        logging.info(f'Pipelined ETL loaded {writer.count} of {total} addresses\n'
+                     f'{format_report(stages, queues)}')
+        print(format_report(stages, queues))
+        self.client.log_stats()
+
+    def _write_geocoded_csv(self, output_csv):
+        """
+        Writes the matched coordinates to geocoded_addresses.csv when `write_geocoded_csv` is
+        set. The file is an audit copy only; `load` reads `self.points`.
+        """
+        if not self.write_geocoded_csv:
+            return
+        with open(output_csv, 'w', encoding='utf-8') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(['X', 'Y', 'Type'])
+            for x, y in self.points:
+                writer.writerow([x, y, "Residential"])
+
+    @instrument('GSheetEtl.load', count_output=False)
     def load(self):
         """
         Creates a point layer inside ArcPro from the geocoded addresses.
+
+        The points are written straight from `self.points` with the method in `point_load`
+        (see ArcpyGeometry.load_points), without going through geocoded_addresses.csv.
+        In incremental mode with an existing avoid_points layer, only the added points are
+        appended and the removed ones deleted before the buffer is rebuilt.
         """
         print(f'Loading geocoded addresses')
 
+        backend = geometry_backend(self.config_dict)
+        if backend.name != 'arcpy':
+            if self.incremental and self.extract_state.has_snapshot:
+                added, removed = backend.update_points('avoid_points', self.points, self.removed_points)
+                logging.info(f'Incremental load: {added} points added, {removed} points removed')
+            else:
+                backend.load_points(self.points, 'avoid_points')
+            annotate(output_count=backend.count('avoid_points'))
+            backend.buffer('avoid_points', os.path.join(self.destination, 'Avoid_Points_buffer'), 1500)
+            return
+
         arcpy.env.workspace =self.destination
         arcpy.env.overwriteOutput = True
 
-        in_table = self.transformed_path
         out_feature_class = 'avoid_points'
-        x_field = 'X'
-        y_field = 'Y'
-        spatial_ref = arcpy.SpatialReference(104124)
-
-        arcpy.management.XYTableToPoint(
-            in_table=in_table,
-            out_feature_class=out_feature_class,
-            x_field=x_field,
-            y_field=y_field,
-            coordinate_system=spatial_ref
-        )
+
+        if self.incremental and self.extract_state.has_snapshot:
+            self._load_changes(out_feature_class)
+        else:
+            backend.load_points(self.points, os.path.join(self.destination, out_feature_class),
+                                method=self.point_load)
         print(arcpy.GetCount_management(out_feature_class))
+        annotate(output_count=int(arcpy.management.GetCount(out_feature_class)[0]))
 
         avoid_buffer = os.path.join(self.destination, 'Avoid_Points_buffer')
-        arcpy.Buffer_analysis('avoid_points', avoid_buffer, '1500 Feet', 'FULL', 'ROUND', 'ALL')
+        backend.buffer('avoid_points', avoid_buffer, 1500)
+
+    def _load_changes(self, out_feature_class):
+        """
+        Applies the rows added and removed since the last run to the existing point layer.
+
+        Args:
+            out_feature_class (str): Name of the avoid points feature class.
+        """
+        if self.points:
+            with arcpy.da.InsertCursor(out_feature_class, ['SHAPE@XY', 'X', 'Y', 'Type']) as cursor:
+                for x, y in self.points:
+                    cursor.insertRow([(x, y), x, y, 'Residential'])
+
+        to_remove = Counter((round(x, 6), round(y, 6)) for x, y in self.removed_points)
+        if to_remove:
+            with arcpy.da.UpdateCursor(out_feature_class, ['X', 'Y']) as cursor:
+                for x, y in cursor:
+                    key = (round(x, 6), round(y, 6))
+                    if to_remove[key] > 0:
+                        to_remove[key] -= 1
+                        cursor.deleteRow()
+
+        logging.info(f'Incremental load: {len(self.geocode_results) - len(self.geocode_failures)} points added, '
+                     f'{len(self.removed_points)} points removed')
+
+    def _save_extract_state(self):
+        """
+        Records the snapshot that was just loaded, so the next run diffs against it.
+        Only called after load succeeds; a failed run is redone in full next time.
+
+        Rows that got a match or a definite no-match are recorded. Rows that failed on a
+        timeout, an HTTP error or an open circuit are left out, so the next run sees them as
+        added and geocodes them again; the ETag is then not kept either, so that run downloads
+        the sheet instead of getting a 304.
+        """
+        state = self.extract_state
+        etag, last_modified, fingerprints = self._new_snapshot
+        retry = Counter()
+        for fingerprint, (_, coords, error) in zip(self.added_fingerprints, self.geocode_results):
+            if coords is not None:
+                state.points[fingerprint] = list(coords)
+            elif error != NO_MATCH_ERROR:
+                retry[fingerprint] += 1
+
+        if retry:
+            logging.info(f'{sum(retry.values())} rows failed to geocode and will be retried next run')
+            kept = []
+            for fingerprint in fingerprints:
+                if retry[fingerprint] > 0:
+                    retry[fingerprint] -= 1
+                    continue
+                kept.append(fingerprint)
+            fingerprints = kept
+            etag, last_modified = None, None
+
+        current = set(fingerprints)
+        state.points = {fp: xy for fp, xy in state.points.items() if fp in current}
+        state.etag = etag
+        state.last_modified = last_modified
+        state.fingerprints = fingerprints
+        state.save()
 
     def process(self):
+        if self.pipelined:
+            self.pipelined_process()
+            return
+        if self.streaming:
+            self.stream_transform()
+            self.load()
+            return
         self.extract()
+        if self.incremental and not self.changed:
+            print('No new or removed addresses, skipping transform and load')
+            if self._new_snapshot is not None:
+                self.geocode_results = []
+                self._save_extract_state()
+            return
         self.transform()
-        self.load()
\ No newline at end of file
+        self.load()
+        if self.incremental:
+            self._save_extract_state()
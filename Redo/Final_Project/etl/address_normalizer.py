@@ -0,0 +1,177 @@
+"""
+Canonical street addresses for de-duplicating sheet rows before geocoding.
+
+Form submissions repeat the same address in many spellings ("123 north main street apt 4",
+"123 N. Main St."). canonical_address() reduces each to one USPS-style form:
+
+- upper case, punctuation dropped and whitespace collapsed
+- unit designators (APT, UNIT, STE, #, ...) and everything after them removed, since the
+  geocoder places the building, not the unit
+- directionals (NORTH -> N, ...) abbreviated before and after the street name
+- the street suffix (STREET -> ST, AVENUE -> AVE, ...) abbreviated per USPS Publication 28
+
+A word that is the whole street name is kept as written, whether it is a directional
+("123 North St", "123 West") or a suffix ("45 Court"). The form is stable: a canonical address
+reduces to itself. AddressDeduper maps every row to its canonical address so each address is
+geocoded once and the result fanned back out to the rows, and the geocode cache uses the same
+form as its key. The canonical form is only a key: the geocoder is sent an address as typed
+(the first spelling seen of each), so a wrong guess here never changes what gets looked up.
+"""
+import re
+
+DIRECTIONALS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+    'N': 'N', 'S': 'S', 'E': 'E', 'W': 'W', 'NE': 'NE', 'NW': 'NW', 'SE': 'SE', 'SW': 'SW',
+}
+
+# Common street suffixes and their variants, USPS Publication 28 Appendix C1
+SUFFIXES = {
+    'ALLEY': 'ALY', 'ALLEE': 'ALY', 'ALLY': 'ALY', 'ALY': 'ALY',
+    'AVENUE': 'AVE', 'AV': 'AVE', 'AVE': 'AVE', 'AVEN': 'AVE', 'AVENU': 'AVE', 'AVN': 'AVE', 'AVNUE': 'AVE',
+    'BEND': 'BND', 'BND': 'BND',
+    'BOULEVARD': 'BLVD', 'BLVD': 'BLVD', 'BOUL': 'BLVD', 'BOULV': 'BLVD',
+    'BRANCH': 'BR', 'BRNCH': 'BR', 'BR': 'BR',
+    'BRIDGE': 'BRG', 'BRDGE': 'BRG', 'BRG': 'BRG',
+    'CANYON': 'CYN', 'CANYN': 'CYN', 'CNYN': 'CYN', 'CYN': 'CYN',
+    'CENTER': 'CTR', 'CENTRE': 'CTR', 'CENTR': 'CTR', 'CNTR': 'CTR', 'CTR': 'CTR',
+    'CIRCLE': 'CIR', 'CIRC': 'CIR', 'CIRCL': 'CIR', 'CRCL': 'CIR', 'CRCLE': 'CIR', 'CIR': 'CIR',
+    'COURT': 'CT', 'CRT': 'CT', 'CT': 'CT',
+    'COVE': 'CV', 'CV': 'CV',
+    'CREEK': 'CRK', 'CRK': 'CRK',
+    'CRESCENT': 'CRES', 'CRSENT': 'CRES', 'CRSNT': 'CRES', 'CRES': 'CRES',
+    'CROSSING': 'XING', 'CRSSNG': 'XING', 'XING': 'XING',
+    'DRIVE': 'DR', 'DRIV': 'DR', 'DRV': 'DR', 'DR': 'DR',
+    'ESTATES': 'ESTS', 'ESTS': 'ESTS',
+    'EXPRESSWAY': 'EXPY', 'EXPRESS': 'EXPY', 'EXPW': 'EXPY', 'EXPY': 'EXPY',
+    'FIELD': 'FLD', 'FLD': 'FLD',
+    'GARDENS': 'GDNS', 'GDNS': 'GDNS',
+    'GLEN': 'GLN', 'GLN': 'GLN',
+    'GREEN': 'GRN', 'GRN': 'GRN',
+    'GROVE': 'GRV', 'GROV': 'GRV', 'GRV': 'GRV',
+    'HEIGHTS': 'HTS', 'HT': 'HTS', 'HTS': 'HTS',
+    'HIGHWAY': 'HWY', 'HIGHWY': 'HWY', 'HIWAY': 'HWY', 'HIWY': 'HWY', 'HWAY': 'HWY', 'HWY': 'HWY',
+    'HILL': 'HL', 'HL': 'HL',
+    'HOLLOW': 'HOLW', 'HLLW': 'HOLW', 'HOLLOWS': 'HOLW', 'HOLWS': 'HOLW', 'HOLW': 'HOLW',
+    'JUNCTION': 'JCT', 'JCTION': 'JCT', 'JUNCTN': 'JCT', 'JCT': 'JCT',
+    'KNOLL': 'KNL', 'KNOL': 'KNL', 'KNL': 'KNL',
+    'LAKE': 'LK', 'LK': 'LK',
+    'LANDING': 'LNDG', 'LNDNG': 'LNDG', 'LNDG': 'LNDG',
+    'LANE': 'LN', 'LN': 'LN',
+    'LOOP': 'LOOP', 'LOOPS': 'LOOP',
+    'MEADOWS': 'MDWS', 'MDW': 'MDWS', 'MEDOWS': 'MDWS', 'MDWS': 'MDWS',
+    'MOUNTAIN': 'MTN', 'MNTAIN': 'MTN', 'MNTN': 'MTN', 'MOUNTIN': 'MTN', 'MTIN': 'MTN', 'MTN': 'MTN',
+    'ORCHARD': 'ORCH', 'ORCHRD': 'ORCH', 'ORCH': 'ORCH',
+    'PARKWAY': 'PKWY', 'PARKWY': 'PKWY', 'PKWAY': 'PKWY', 'PKY': 'PKWY', 'PARKWAYS': 'PKWY', 'PKWYS': 'PKWY',
+    'PKWY': 'PKWY',
+    'PLACE': 'PL', 'PL': 'PL',
+    'PLAZA': 'PLZ', 'PLZA': 'PLZ', 'PLZ': 'PLZ',
+    'POINT': 'PT', 'PT': 'PT',
+    'RANCH': 'RNCH', 'RANCHES': 'RNCH', 'RNCHS': 'RNCH', 'RNCH': 'RNCH',
+    'RIDGE': 'RDG', 'RDGE': 'RDG', 'RDG': 'RDG',
+    'ROAD': 'RD', 'RD': 'RD',
+    'SQUARE': 'SQ', 'SQR': 'SQ', 'SQRE': 'SQ', 'SQU': 'SQ', 'SQ': 'SQ',
+    'SPRINGS': 'SPGS', 'SPNGS': 'SPGS', 'SPRNGS': 'SPGS', 'SPGS': 'SPGS',
+    'STREET': 'ST', 'STRT': 'ST', 'STR': 'ST', 'ST': 'ST',
+    'TERRACE': 'TER', 'TERR': 'TER', 'TER': 'TER',
+    'TRAIL': 'TRL', 'TRAILS': 'TRL', 'TRLS': 'TRL', 'TRL': 'TRL',
+    'VALLEY': 'VLY', 'VALLY': 'VLY', 'VLLY': 'VLY', 'VLY': 'VLY',
+    'VIEW': 'VW', 'VW': 'VW',
+    'VILLAGE': 'VLG', 'VILLAG': 'VLG', 'VILLG': 'VLG', 'VILLIAGE': 'VLG', 'VLG': 'VLG',
+    'VISTA': 'VIS', 'VIST': 'VIS', 'VST': 'VIS', 'VSTA': 'VIS', 'VIS': 'VIS',
+    'WAY': 'WAY', 'WY': 'WAY',
+}
+
+# Secondary unit designators, USPS Publication 28 Appendix C2
+UNIT_DESIGNATORS = {
+    'APARTMENT', 'APT', 'BASEMENT', 'BSMT', 'BUILDING', 'BLDG', 'DEPARTMENT', 'DEPT', 'FLOOR', 'FL',
+    'FRONT', 'FRNT', 'HANGAR', 'HNGR', 'LOBBY', 'LBBY', 'LOT', 'LOWER', 'LOWR', 'OFFICE', 'OFC',
+    'PENTHOUSE', 'PH', 'REAR', 'ROOM', 'RM', 'SIDE', 'SPACE', 'SPC',
+    'SUITE', 'STE', 'TRAILER', 'TRLR', 'UNIT', 'UPPER', 'UPPR',
+}
+
+
+def canonical_address(street):
+    """
+    Reduces a street address to its canonical USPS-style form.
+
+    Args:
+        street (str): Street address without city or state, as typed into the form.
+
+    Returns:
+        str: Canonical address, e.g. '123 N MAIN ST' for '123 north Main Street, Apt. 4'.
+    """
+    # Keep '#' (a unit marker), '/' (1/2 house numbers) and '-' (hyphenated house numbers)
+    text = re.sub(r'[^\w\s#/-]', ' ', street.upper())
+    text = re.sub(r'#', ' # ', text)
+    tokens = text.replace('_', ' ').split()
+
+    # Drop the unit: the first designator after the street name and everything after it. A
+    # designator right after the house number is a street name ("123 Front St")
+    for i, token in enumerate(tokens[1:], 1):
+        if token == '#' or (i >= 2 and token in UNIT_DESIGNATORS):
+            tokens = tokens[:i]
+            break
+    tokens = [token.strip('-') for token in tokens]
+    tokens = [token for token in tokens if token]
+    if len(tokens) < 2:
+        return ' '.join(tokens)
+
+    number, words = tokens[0], tokens[1:]
+    post = ''
+    if len(words) > 1 and words[-1] in DIRECTIONALS:
+        post = DIRECTIONALS[words[-1]]
+        words = words[:-1]
+    has_suffix = len(words) > 1 and words[-1] in SUFFIXES
+    name_words = len(words) - 1 if has_suffix else len(words)
+    if name_words > 1 and words[0] in DIRECTIONALS:
+        words[0] = DIRECTIONALS[words[0]]
+    if has_suffix:
+        words[-1] = SUFFIXES[words[-1]]
+    return ' '.join(token for token in [number, *words, post] if token)
+
+
+class AddressDeduper:
+    """
+    Collapses rows onto their unique canonical addresses.
+
+    Attributes:
+        unique (list): Canonical addresses in order of first appearance.
+        originals (list): The first spelling seen of each canonical address, as typed; this is
+            what gets sent to the geocoder.
+        rows (int): Rows added so far.
+    """
+    def __init__(self):
+        self.unique = []
+        self.originals = []
+        self.rows = 0
+        self._index = {}
+
+    def add(self, street):
+        """
+        Records one row.
+
+        Args:
+            street (str): Street address as typed into the form.
+
+        Returns:
+            tuple: (index into `unique`, True if this canonical address is new)
+        """
+        self.rows += 1
+        key = canonical_address(street)
+        index = self._index.get(key)
+        if index is not None:
+            return index, False
+        index = self._index[key] = len(self.unique)
+        self.unique.append(key)
+        self.originals.append(street.strip())
+        return index, True
+
+    def report(self):
+        """
+        Returns:
+            dict: Row and unique address counts and the share of geocode requests saved.
+        """
+        unique = len(self.unique)
+        return {'rows': self.rows, 'unique': unique,
+                'reduction': round(1 - unique / self.rows, 3) if self.rows else 0.0}
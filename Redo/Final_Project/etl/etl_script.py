@@ -1,6 +1,11 @@
 import arcpy
-import requests
 import csv
+import os
+import sys
+
+# Same import path as assignment9 and assignment10: the Final_Project folder, then etl.*
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from etl.geocoder_client import GeocoderClient
 
 arcpy.env.overwriteOutput = True
 
@@ -8,13 +13,15 @@ ADDRESSES_CSV = r"C:\Users\benlj\OneDrive\Documents\School\SpringSemester2025\Pr
 NEW_ADDRESSES_CSV = r"C:\Users\benlj\OneDrive\Documents\School\SpringSemester2025\ProgrammingForGIS\new_addresses.csv"
 GDB = r"C:\Users\benlj\OneDrive\Documents\School\SpringSemester2025\ProgrammingForGIS\ProgrammingLabs\ProgrammingLabs.gdb"
 
+client = GeocoderClient()
+
 
 def extract():
     url = (
         "https://docs.google.com/spreadsheets/d/e/"
         "2PACX-1vTDjitOlmILea7koCORJkq6QrUcwBJM7K3vy4guXB0mU_nWR6wsPn136bpH6ykoUxyYMW7wTwkzE37l/pub?output=csv"
     )
-    r = requests.get(url)
+    r = client.get(url)
     r.encoding = "utf-8"
     data = r.text
 
@@ -40,7 +47,7 @@ def transform():
                     "benchmark": "2020",
                     "format": "json",
                 }
-                r = requests.get(base_url, params=params)
+                r = client.get(base_url, params=params)
 
                 if r.status_code != 200:
                     print(f"Request failed for: {address} (status {r.status_code})")
@@ -77,3 +84,4 @@ if __name__ == "__main__":
     extract()
     transform()
     load()
+    print(client.stats())
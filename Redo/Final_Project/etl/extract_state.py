@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from collections import Counter
+
+
+def row_fingerprint(row):
+    """
+    Hashes one sheet row so unchanged rows can be recognised between runs.
+
+    Args:
+        row (dict): Row from csv.DictReader.
+
+    Returns:
+        str: SHA-1 hex digest of the row's values in column order.
+    """
+    text = '\x1f'.join((value or '').strip() for value in row.values())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class ExtractState:
+    """
+    What the previous extract saw, stored as JSON in the project directory.
+
+    Attributes:
+        path (str): Path to the JSON state file.
+        etag (str): ETag header of the last download.
+        last_modified (str): Last-Modified header of the last download.
+        fingerprints (list): Row fingerprints of the last snapshot, in sheet order.
+        points (dict): Row fingerprint mapped to the [x, y] it was geocoded to.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.etag = None
+        self.last_modified = None
+        self.fingerprints = []
+        self.points = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            self.etag = state.get('etag')
+            self.last_modified = state.get('last_modified')
+            self.fingerprints = state.get('fingerprints', [])
+            self.points = state.get('points', {})
+
+    @property
+    def has_snapshot(self):
+        return bool(self.fingerprints)
+
+    def conditional_headers(self):
+        """
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers for the next download.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def diff(self, fingerprints):
+        """
+        Compares a new snapshot with the stored one. Duplicate rows are counted, so a
+        repeated submission shows up as one added row.
+
+        Args:
+            fingerprints (list): Row fingerprints of the new snapshot.
+
+        Returns:
+            tuple: (added, removed) Counters of fingerprints.
+        """
+        new, old = Counter(fingerprints), Counter(self.fingerprints)
+        return new - old, old - new
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as state_file:
+            json.dump({
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'fingerprints': self.fingerprints,
+                'points': self.points
+            }, state_file)
@@ -0,0 +1,151 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from etl.address_normalizer import canonical_address
+
+
+class GeocodeCache:
+    """
+    Persistent geocode results stored in a local SQLite file.
+
+    Each entry holds the coordinates, match status and the time it was stored. Entries older
+    than the TTL are treated as misses, and the oldest entries are evicted once the cache grows
+    past max_entries. The connection is shared between geocoding threads behind a lock.
+    Writes are committed in groups of commit_every and by evict(), flush() and close(), so a
+    large run does not pay for one transaction per address.
+
+    Entries are keyed by the canonical form of the street address (see
+    etl/address_normalizer.py), the same key the address deduplication uses, so spelling
+    variants share one entry. Streets are stored without city or state: one cache file
+    serves one city.
+
+    Attributes:
+        path (str): Path to the SQLite file.
+        ttl_seconds (float): Age after which an entry is ignored, or None to keep entries forever.
+        max_entries (int): Number of entries kept after eviction, or None for no limit.
+        commit_every (int): Uncommitted writes allowed before put() commits.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to go to the network.
+    """
+    MATCH = 'match'
+    NO_MATCH = 'no_match'
+
+    def __init__(self, path, ttl_days=None, max_entries=None, commit_every=500):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.commit_every = max(1, int(commit_every))
+        self._pending = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS geocodes ('
+            'address_key TEXT PRIMARY KEY, x REAL, y REAL, status TEXT NOT NULL, stored_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS geocodes_stored_at ON geocodes (stored_at)')
+        self._conn.commit()
+
+    def get(self, street):
+        """
+        Looks up a street address.
+
+        Args:
+            street (str): Street address without city or state.
+
+        Returns:
+            tuple: (status, coordinates) where coordinates is (x, y) or None, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT x, y, status, stored_at FROM geocodes WHERE address_key = ?',
+                (canonical_address(street),)
+            ).fetchone()
+
+            if row is None or (self.ttl_seconds and time.time() - row[3] > self.ttl_seconds):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            coords = (row[0], row[1]) if row[2] == self.MATCH else None
+            return row[2], coords
+
+    def put(self, street, coords):
+        """
+        Stores a geocode result. A coords value of None records the address as not matched.
+
+        Args:
+            street (str): Street address without city or state.
+            coords (tuple): (x, y) of the match, or None.
+        """
+        self.put_many([(street, coords)])
+
+    def put_many(self, results):
+        """
+        Stores several geocode results with one statement.
+
+        Args:
+            results (iterable): (street, coords) pairs as for put().
+        """
+        now = time.time()
+        rows = []
+        for street, coords in results:
+            x, y = coords if coords else (None, None)
+            rows.append((canonical_address(street), x, y, self.MATCH if coords else self.NO_MATCH, now))
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)', rows)
+            self._pending += len(rows)
+            if self._pending >= self.commit_every:
+                self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def flush(self):
+        """Commits any writes still pending."""
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def evict(self):
+        """
+        Removes expired entries, then the oldest entries beyond max_entries.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds:
+                removed += self._conn.execute(
+                    'DELETE FROM geocodes WHERE stored_at < ?', (time.time() - self.ttl_seconds,)
+                ).rowcount
+            if self.max_entries:
+                removed += self._conn.execute(
+                    'DELETE FROM geocodes WHERE address_key IN ('
+                    'SELECT address_key FROM geocodes ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                ).rowcount
+            self._commit()
+        return removed
+
+    def report(self):
+        """
+        Logs and returns the hit and miss counts for this run.
+
+        Returns:
+            dict: hits, misses and hit_rate.
+        """
+        total = self.hits + self.misses
+        stats = {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+        logging.info(f"Geocode cache: {self.hits} hits, {self.misses} misses ({stats['hit_rate']:.0%} hit rate)")
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
@@ -0,0 +1,310 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Statuses that mean the service is overloaded, as opposed to failing on this one request
+CONGESTION_STATUS = (429, 503, 504)
+# Latencies kept for the percentiles in stats(); older ones are dropped
+LATENCY_WINDOW = 10000
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and requests are being refused."""
+
+
+class GeocoderClient:
+    """
+    Shared HTTP client for the sheet download and the Census geocoder.
+
+    One client is meant to be reused for every request in a run. It provides:
+    - keep-alive connection pooling through a requests.Session
+    - an optional token bucket that limits requests per second
+    - a limit on requests in flight, adjusted by AIMD: it grows slowly while responses are
+      fast and is halved, at most once per target_latency window, on timeouts, rate limiting,
+      overload statuses or slow responses (the token rate follows it)
+    - retries with jittered exponential backoff on connection errors, 429 and 5xx
+    - a circuit breaker that refuses requests for a while after repeated failures, then lets
+      a single trial request through and closes or re-opens on its outcome
+    - latency statistics over the last LATENCY_WINDOW requests
+
+    Attributes:
+        max_rate (float): Upper bound on requests per second, or None for no rate limit (only
+            the in-flight limit applies).
+        max_concurrency (int): Upper bound on requests in flight.
+        retries (int): Extra attempts after the first one.
+        backoff (float): Base backoff in seconds, doubled on each retry.
+        target_latency (float): Responses slower than this count as congestion.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_seconds (float): How long the circuit stays open before a trial request.
+        requests_sent (int): Class-wide count of HTTP requests sent by every client, retries included.
+    """
+    requests_sent = 0
+    _sent_lock = threading.Lock()
+
+    def __init__(self, max_rate=None, max_concurrency=8, retries=3, backoff=0.5, target_latency=2.0,
+                 failure_threshold=10, reset_seconds=30.0):
+        self.max_rate = float(max_rate) if max_rate else None
+        self.max_concurrency = int(max_concurrency)
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.target_latency = float(target_latency)
+        self.failure_threshold = int(failure_threshold)
+        self.reset_seconds = float(reset_seconds)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Condition()
+        # AIMD state: start at half the ceiling and let it grow
+        self.concurrency_limit = max(1.0, self.max_concurrency / 2)
+        self.rate = max(1.0, self.max_rate / 2) if self.max_rate else None
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probing = False
+
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.request_count = 0
+        self.error_count = 0
+        self.retry_count = 0
+
+    @classmethod
+    def from_config(cls, config_dict):
+        """
+        Builds a client from the optional http_* keys in the YAML config.
+
+        Args:
+            config_dict (dict): Configuration dictionary.
+
+        Returns:
+            GeocoderClient: New client.
+        """
+        return cls(
+            max_rate=config_dict.get('http_max_rate'),
+            max_concurrency=config_dict.get('http_max_concurrency') or config_dict.get('geocode_workers') or 8,
+            retries=config_dict.get('http_retries', 3),
+            backoff=config_dict.get('http_backoff', 0.5),
+            target_latency=config_dict.get('http_target_latency', 2.0),
+            failure_threshold=config_dict.get('circuit_failure_threshold', 10),
+            reset_seconds=config_dict.get('circuit_reset_seconds', 30)
+        )
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request through the rate limiter, retry loop and circuit breaker.
+
+        Streaming responses (stream=True) are returned as soon as the headers arrive and
+        their latency covers only that part.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            **kwargs: Passed on to requests.Session.request.
+
+        Returns:
+            requests.Response: The last response received. Retryable statuses that are still
+            failing after the last attempt are returned rather than raised.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            requests.RequestException: If the last attempt failed without a response.
+        """
+        for attempt in range(self.retries + 1):
+            probe = self._check_circuit()
+            self._acquire()
+            start = time.monotonic()
+            with GeocoderClient._sent_lock:
+                GeocoderClient.requests_sent += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._release(time.monotonic() - start, ok=False, probe=probe)
+                if attempt == self.retries:
+                    raise
+                logging.debug(f'{method} {url} failed ({e}), retrying')
+                self._sleep_backoff(attempt)
+                continue
+            except Exception:
+                # Free the slot (and the probe) before passing on errors that are not retried
+                self._release(time.monotonic() - start, ok=False, probe=probe)
+                raise
+
+            ok = response.status_code not in RETRY_STATUS
+            self._release(time.monotonic() - start, ok=ok, congested=response.status_code in CONGESTION_STATUS,
+                          rate_limited=response.status_code == 429, probe=probe)
+            if ok or attempt == self.retries:
+                return response
+
+            logging.debug(f'{method} {url} returned {response.status_code}, retrying')
+            response.close()
+            self._sleep_backoff(attempt, response.headers.get('Retry-After'))
+
+    def _check_circuit(self):
+        """
+        Refuses the request while the circuit is open.
+
+        Returns:
+            bool: True if this request is the single trial request of the half-open state.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError('geocoder circuit is open after repeated failures')
+            # Half-open: one trial request, everything else is refused until it finishes
+            self._probing = True
+            return True
+
+    def _circuit_state(self):
+        """'closed', 'open' or 'half-open'; call with the lock held."""
+        if self._opened_at is None:
+            return 'closed'
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    @property
+    def circuit_state(self):
+        with self._lock:
+            return self._circuit_state()
+
+    def _acquire(self):
+        """Waits for a free in-flight slot and a rate-limit token."""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                if self.rate is None:
+                    self._tokens = 1.0
+                else:
+                    self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._in_flight < int(self.concurrency_limit) and self._tokens >= 1:
+                    if self.rate is not None:
+                        self._tokens -= 1
+                    self._in_flight += 1
+                    return
+                wait = 0.05 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+                self._lock.wait(wait)
+
+    def _release(self, latency, ok, congested=None, rate_limited=False, probe=False):
+        """
+        Records a finished attempt and applies the AIMD adjustment.
+
+        Only congestion (timeouts, overload statuses, slow responses) shrinks the limits, and
+        only once per round trip (capped at target_latency), so the requests already in flight
+        when the service got overloaded count once. Plain server errors are retried without
+        slowing everything else down, and 429s do not count towards opening the circuit.
+        The half-open trial request closes the circuit if it succeeds, leaves it half-open if
+        it is rate limited, and re-opens it if it fails.
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self.request_count += 1
+            self.latencies.append(latency)
+
+            if congested is None:
+                congested = not ok
+            now = time.monotonic()
+            if congested or latency > self.target_latency:
+                if now - self._last_decrease >= min(latency, self.target_latency):
+                    self._last_decrease = now
+                    self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                    if self.rate is not None:
+                        self.rate = max(1.0, self.rate / 2)
+            elif ok:
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+                if self.rate is not None:
+                    self.rate = min(self.max_rate, self.rate + 1 / max(1.0, self.rate))
+
+            if probe:
+                self._probing = False
+                if ok:
+                    self._opened_at = None
+                    self._consecutive_failures = 0
+                elif rate_limited:
+                    # Still throttling: stay half-open, so after the backoff the next request is
+                    # another single trial instead of the full concurrency limit at once
+                    logging.info('Geocoder trial request was rate limited, circuit stays half-open')
+                else:
+                    logging.warning('Geocoder circuit re-opened after a failed trial request')
+                    self._opened_at = time.monotonic()
+                if not ok:
+                    self.error_count += 1
+            elif ok:
+                self._consecutive_failures = 0
+            elif rate_limited:
+                self.error_count += 1
+            else:
+                self.error_count += 1
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold and self._opened_at is None:
+                    logging.warning('Geocoder circuit opened after repeated failures')
+                    self._opened_at = time.monotonic()
+            self._lock.notify_all()
+
+    def _sleep_backoff(self, attempt, retry_after=None):
+        with self._lock:
+            self.retry_count += 1
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            # Full jitter: anywhere between 0 and the exponential ceiling
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+        time.sleep(delay)
+
+    def stats(self):
+        """
+        Summarises the requests made so far.
+
+        Returns:
+            dict: Request, error and retry counts, latency percentiles in seconds over the
+            last LATENCY_WINDOW requests, the current concurrency limit and rate (None
+            without a rate limit), and the circuit breaker state.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'requests': self.request_count,
+                'errors': self.error_count,
+                'retries': self.retry_count,
+                'concurrency_limit': round(self.concurrency_limit, 2),
+                'rate': round(self.rate, 2) if self.rate is not None else None,
+                'circuit': self._circuit_state()
+            }
+        if latencies:
+            def pct(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+            stats.update({
+                'latency_mean': sum(latencies) / len(latencies),
+                'latency_p50': pct(0.50),
+                'latency_p95': pct(0.95),
+                'latency_p99': pct(0.99),
+                'latency_max': latencies[-1]
+            })
+        return stats
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(f'Geocoder client stats: {stats}')
+        return stats
+
+    def close(self):
+        self.session.close()
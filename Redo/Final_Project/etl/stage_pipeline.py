@@ -0,0 +1,179 @@
+"""
+Bounded queues and utilization counters for running ETL stages side by side.
+
+Each stage runs in its own thread and hands items to the next through a PipelineQueue. A full
+queue blocks the stage upstream, so memory stays bounded by the queue sizes. Time a stage
+spends blocked on its input or output queue is counted as idle; the rest of its lifetime is
+busy. A stage that is busy nearly all the time while the others wait is the bottleneck.
+
+The queues of one pipeline share a stop event. When a stage fails, the event is set and every
+other stage gives up instead of waiting on a queue that will never move again.
+"""
+import queue
+import threading
+import time
+
+CLOSED = object()
+# How often a stage blocked on a queue checks the stop event
+POLL_SECONDS = 0.1
+
+
+class PipelineCancelled(Exception):
+    """Raised in a stage that tries to queue an item after the pipeline was stopped."""
+
+
+class StageStats:
+    """
+    Lifetime, blocked time and item count of one stage.
+
+    Attributes:
+        name (str): Stage name.
+        items (int): Items the stage produced.
+        blocked (float): Seconds spent waiting on a queue.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.blocked = 0.0
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        lifetime = end - self.started if self.started is not None else 0.0
+        busy = max(0.0, lifetime - self.blocked)
+        return {'items': self.items, 'seconds': round(lifetime, 3), 'busy_s': round(busy, 3),
+                'utilization': round(busy / lifetime, 3) if lifetime else 0.0}
+
+
+class PipelineQueue:
+    """
+    A bounded queue between two stages that records how full it gets.
+
+    Iterating over the queue yields items until the producer calls close() or the pipeline is
+    stopped.
+
+    Attributes:
+        stop (threading.Event): Stop event shared by the queues of one pipeline.
+    """
+    def __init__(self, name, maxsize, stop=None):
+        self.name = name
+        self.stop = stop if stop is not None else threading.Event()
+        self.queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.maxsize = self.queue.maxsize
+        self.samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.full_waits = 0
+
+    def put(self, item, stats=None):
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        if depth >= self.maxsize:
+            self.full_waits += 1
+        start = time.perf_counter()
+        while True:
+            if self.stop.is_set():
+                raise PipelineCancelled(f'pipeline stopped, {self.name} queue closed')
+            try:
+                self.queue.put(item, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        if stats is not None:
+            stats.blocked += time.perf_counter() - start
+            stats.items += 1
+
+    def close(self):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(CLOSED, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def cancel(self):
+        """Stops the pipeline and discards the queued items."""
+        self.stop.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def drain(self, stats=None):
+        """
+        Yields items until the queue is closed or the pipeline stopped, counting the wait for
+        each as blocked time.
+        """
+        while True:
+            start = time.perf_counter()
+            item = None
+            while item is None:
+                if self.stop.is_set():
+                    return
+                try:
+                    item = self.queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            if stats is not None:
+                stats.blocked += time.perf_counter() - start
+            if item is CLOSED:
+                return
+            yield item
+
+    def report(self):
+        return {'maxsize': self.maxsize, 'max_depth': self.max_depth,
+                'mean_depth': round(self.depth_total / self.samples, 1) if self.samples else 0.0,
+                'full_waits': self.full_waits}
+
+
+def run_stage(stats, work, output):
+    """
+    Starts a stage on a daemon thread. `work` is called with no arguments; whatever happens,
+    the output queue is closed when it returns so the next stage can finish. If it raises, the
+    pipeline is stopped.
+
+    Returns:
+        tuple: (thread, errors list that holds the stage's exception if it raised)
+    """
+    errors = []
+
+    def target():
+        stats.start()
+        try:
+            work()
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            errors.append(e)
+            output.stop.set()
+        finally:
+            stats.finish()
+            output.close()
+
+    thread = threading.Thread(target=target, name=f'etl-{stats.name}', daemon=True)
+    thread.start()
+    return thread, errors
+
+
+def format_report(stages, queues):
+    """Table of stage utilization and queue depths for the console."""
+    lines = [f"{'Stage':<10}{'Items':>8}{'Seconds':>10}{'Busy s':>9}{'Util':>7}"]
+    for stats in stages:
+        row = stats.report()
+        lines.append(f"{stats.name:<10}{row['items']:>8}{row['seconds']:>10.2f}{row['busy_s']:>9.2f}"
+                     f"{row['utilization']:>7.0%}")
+    for q in queues:
+        row = q.report()
+        lines.append(f"queue {q.name}: max depth {row['max_depth']}/{row['maxsize']}, "
+                     f"mean {row['mean_depth']}, full {row['full_waits']} times")
+    return '\n'.join(lines)
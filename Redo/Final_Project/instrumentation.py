@@ -0,0 +1,388 @@
+"""
+Stage-level instrumentation for the WNV pipeline.
+
+`instrument` wraps a pipeline function, as a decorator or a context manager, and records for
+each call: wall time, CPU time, resident memory (current and peak), optionally tracemalloc
+allocation figures, input and output feature counts, and the number of HTTP requests sent.
+Records are kept by the module-level RUN and written out with `write_report` (JSON) and
+`summary_table` (text). With a profile directory configured each top-level stage also
+dumps a cProfile file.
+
+Nothing is recorded until `configure` is called with `instrumentation: true`, so the
+decorators cost one attribute check per call otherwise.
+"""
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _peak_rss():
+    """Peak resident set size in bytes from the resource module, or None where it is missing."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _windows_memory():
+    """Working set and peak working set in bytes from GetProcessMemoryInfo, or (None, None)."""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    try:
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        kernel32.K32GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters),
+                                                     wintypes.DWORD]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None, None
+    except (AttributeError, OSError):
+        return None, None
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+def memory_usage():
+    """
+    Current and peak resident set size of this process.
+
+    Uses psutil when it is installed; otherwise the resource module, which only gives the peak,
+    or on Windows (which has no resource module) the process working set read through ctypes.
+    psutil only reports a peak on Windows (peak_wset), so elsewhere the peak comes from the
+    resource module as well.
+
+    Returns:
+        tuple: (rss, peak_rss) in bytes; either may be None when unavailable.
+    """
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        peak = getattr(info, 'peak_wset', None)
+        if peak is None:
+            peak = _peak_rss()
+        return info.rss, peak
+    if resource is None and sys.platform == 'win32':
+        return _windows_memory()
+    return None, _peak_rss()
+
+
+def feature_count(dataset):
+    """
+    Row count of a dataset or the summed count of a list of datasets; None if it cannot be read.
+    """
+    if dataset is None:
+        return None
+    if isinstance(dataset, (list, tuple)):
+        counts = [feature_count(item) for item in dataset]
+        return None if None in counts else sum(counts)
+    if not isinstance(dataset, str):
+        return None
+    try:
+        import arcpy
+
+        return int(arcpy.management.GetCount(dataset)[0])
+    except Exception:
+        return None
+
+
+class RunRecorder:
+    """
+    Collects stage records for one run.
+
+    Attributes:
+        enabled (bool): Whether stages are recorded.
+        trace_memory (bool): Whether tracemalloc is used (slows Python code noticeably).
+        profile_dir (str): Folder for per-stage cProfile dumps, or None.
+        count_features (callable): Function used for input and output counts.
+        network_counter (callable): Returns the total number of HTTP requests sent so far.
+        stages (list): One dict per finished stage call, in finishing order.
+        sections (dict): Extra top-level report entries added with add_section.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.profile_dir = None
+        self.count_features = feature_count
+        self.network_counter = None
+        self.stages = []
+        self.sections = {}
+        self.started = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+
+    def configure(self, config_dict, network_counter=None):
+        """
+        Turns recording on or off from the config.
+
+        Args:
+            config_dict (dict): Reads `instrumentation`, `trace_memory` and `profile_dir`.
+            network_counter (callable): Returns the total HTTP requests sent so far.
+        """
+        self.enabled = bool(config_dict.get('instrumentation', False))
+        self.trace_memory = bool(config_dict.get('trace_memory', False))
+        self.profile_dir = config_dict.get('profile_dir')
+        self.network_counter = network_counter
+        self.stages = []
+        self.sections = {}
+        self.started = datetime.now().isoformat(timespec='seconds')
+        if self.enabled and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.enabled and self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _network_calls(self):
+        return self.network_counter() if self.network_counter is not None else None
+
+    def add(self, record):
+        with self._lock:
+            self.stages.append(record)
+
+    def report(self):
+        """
+        Returns:
+            dict: The run report: start and end time, stage records and per-stage totals.
+        """
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                        'network_calls': 0})
+            total['calls'] += 1
+            total['wall_s'] = round(total['wall_s'] + record['wall_s'], 4)
+            total['cpu_s'] = round(total['cpu_s'] + record['cpu_s'], 4)
+            total['network_calls'] += record['network_calls'] or 0
+        return dict({'started': self.started, 'finished': datetime.now().isoformat(timespec='seconds'),
+                     'stages': self.stages, 'totals': totals}, **self.sections)
+
+    def write_report(self, path):
+        """
+        Writes the JSON run report.
+
+        Args:
+            path (str): Output JSON path.
+        """
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2, default=str)
+        logging.info(f'Wrote run report to {path}')
+
+    def summary_table(self):
+        """
+        Returns:
+            str: One line per stage call with time, memory, feature counts and network calls.
+        """
+        def mb(value):
+            return '' if value is None else f'{value / 1048576:.1f}'
+
+        def show(value):
+            return '' if value is None else str(value)
+
+        lines = [f"{'Stage':<36}{'Wall s':>9}{'CPU s':>9}{'Peak MB':>9}{'Alloc MB':>10}"
+                 f"{'In':>9}{'Out':>9}{'HTTP':>7}"]
+        for record in self.stages:
+            name = '  ' * record['depth'] + record['stage']
+            lines.append(f"{name[:35]:<36}{record['wall_s']:>9.2f}{record['cpu_s']:>9.2f}"
+                         f"{mb(record['peak_rss']):>9}{mb(record['traced_peak']):>10}"
+                         f"{show(record['input_count']):>9}{show(record['output_count']):>9}"
+                         f"{show(record['network_calls']):>7}")
+        return '\n'.join(lines)
+
+
+RUN = RunRecorder()
+
+
+class _Measurement:
+    """Measures one stage call; used by `instrument`."""
+    def __init__(self, recorder, name, input_count=None):
+        self.recorder = recorder
+        self.name = name
+        self.values = {'input_count': input_count, 'output_count': None}
+        self.child_traced_peak = 0
+        self.profiler = None
+
+    def start(self):
+        stack = self.recorder._stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.network_start = self.recorder._network_calls()
+        self.rss_start, _ = memory_usage()
+        if tracemalloc.is_tracing():
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if self.recorder.profile_dir and not self.recorder._profiling:
+            self.recorder._profiling = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def finish(self, error=None):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        if self.profiler is not None:
+            self.profiler.disable()
+            stamp = datetime.now().strftime('%H%M%S%f')
+            safe_name = re.sub(r'[^\w.-]', '_', self.name)
+            self.profiler.dump_stats(os.path.join(self.recorder.profile_dir, f'{safe_name}_{stamp}.prof'))
+            self.recorder._profiling = False
+
+        stack = self.recorder._stack()
+        stack.remove(self)
+        traced_delta = traced_peak = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # A nested stage resets the peak, so take the larger of ours and our children's
+            peak = max(peak, self.child_traced_peak)
+            traced_delta = current - self.traced_start
+            traced_peak = peak - self.traced_start
+            if stack:
+                stack[-1].child_traced_peak = max(stack[-1].child_traced_peak, peak)
+
+        rss, peak_rss = memory_usage()
+        network_end = self.recorder._network_calls()
+        record = {
+            'stage': self.name,
+            'depth': self.depth,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'rss_delta': None if rss is None or self.rss_start is None else rss - self.rss_start,
+            'peak_rss': peak_rss,
+            'traced_delta': traced_delta,
+            'traced_peak': traced_peak,
+            'network_calls': None if network_end is None else network_end - self.network_start,
+            'error': None if error is None else str(error),
+        }
+        record.update(self.values)
+        self.recorder.add(record)
+        logging.debug(f"Stage {self.name}: {record['wall_s']}s wall, {record['cpu_s']}s CPU, "
+                      f"{record['input_count']} in, {record['output_count']} out, "
+                      f"{record['network_calls']} network calls")
+
+
+class instrument:
+    """
+    Records a pipeline stage, as a decorator or a context manager.
+
+        @instrument(inputs=['intersect_fc'])
+        def erase_avoid_zones(intersect_fc, config_dict): ...
+
+        with instrument('exportMap') as stage:
+            ...
+            stage.set(output_count=len(layers))
+
+    As a decorator, `inputs` names the arguments whose feature counts are recorded, and the
+    return value's feature count is recorded as the output unless `count_output` is False.
+
+    Args:
+        name (str): Stage name; defaults to the decorated function's qualified name.
+        inputs (list): Argument names holding input datasets (decorator only).
+        count_output (bool): Count the features of the returned dataset (decorator only).
+        recorder (RunRecorder): Where to record; the module-level RUN by default.
+    """
+    def __init__(self, name=None, inputs=None, count_output=True, recorder=None):
+        self.name = name
+        self.inputs = list(inputs or [])
+        self.count_output = count_output
+        self.recorder = recorder or RUN
+        self._active = []
+
+    def __call__(self, func):
+        name = self.name or func.__qualname__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = self.recorder
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+
+            input_count = None
+            if self.inputs:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                input_count = recorder.count_features([bound.get(arg) for arg in self.inputs])
+            measurement = _Measurement(recorder, name, input_count).start()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                measurement.finish(e)
+                raise
+            if self.count_output and measurement.values['output_count'] is None:
+                measurement.values['output_count'] = recorder.count_features(result)
+            measurement.finish()
+            return result
+        return wrapper
+
+    def __enter__(self):
+        measurement = None
+        if self.recorder.enabled:
+            measurement = _Measurement(self.recorder, self.name or 'stage').start()
+        self._active.append(measurement)
+        return _StageHandle(measurement)
+
+    def __exit__(self, exc_type, exc, tb):
+        measurement = self._active.pop()
+        if measurement is not None:
+            measurement.finish(exc)
+        return False
+
+
+class _StageHandle:
+    """Returned by `with instrument(...)`; lets the block attach counts to its record."""
+    def __init__(self, measurement):
+        self.measurement = measurement
+
+    def set(self, **values):
+        if self.measurement is not None:
+            self.measurement.values.update(values)
+
+
+def annotate(**values):
+    """
+    Adds values (e.g. output_count=...) to the innermost stage running on this thread.
+    Does nothing when no stage is being recorded.
+    """
+    stack = RUN._stack()
+    if stack:
+        stack[-1].values.update(values)
+
+
+def add_section(name, value):
+    """Adds a top-level entry (e.g. where intermediates were stored) to the run report."""
+    RUN.sections[name] = value
+
+
+configure = RUN.configure
+write_report = RUN.write_report
+summary_table = RUN.summary_table
@@ -0,0 +1,128 @@
+"""
+Where the analysis chain writes its intermediate outputs.
+
+Buffers, the intersect output and the joins are only inputs to the next step, yet by default
+each one is written to the project geodatabase. `intermediate_storage` picks another home:
+
+- destination (default): the project geodatabase, as before
+- memory: the arcpy `memory` workspace. Before each write the process's resident memory is
+  checked; above `memory_spill_mb` the output goes to the scratch workspace instead
+- scratch: a scratch geodatabase (or folder for the numpy backend) under `scratch_dir`,
+  typically on a fast local disk
+
+Layers named in `persist_layers` (the deliverables) always go to the project geodatabase.
+Every placement is recorded with the memory in use at the time; summary() returns them for
+the log and the run report.
+"""
+import logging
+import os
+
+from analysis.geometry_backend import MEMORY_WORKSPACE, in_memory
+from instrumentation import memory_usage
+
+DEFAULT_PERSIST = ['Risk_Zone_Cleaned', 'Target_Addresses']
+
+# Layer name mapped to where it was written and the resident memory at that time
+_placements = {}
+# Set once the missing memory reading has been warned about
+_warned_no_memory = False
+
+
+def scratch_workspace(config_dict):
+    """
+    The scratch workspace for intermediates, created on first use.
+
+    Returns:
+        str: A file geodatabase path for arcpy, a folder for the numpy backend.
+    """
+    from analysis.geometry_backend import geometry_backend
+
+    scratch_dir = config_dict.get('scratch_dir') or os.path.join(config_dict['proj_dir'], 'scratch')
+    os.makedirs(scratch_dir, exist_ok=True)
+    if geometry_backend(config_dict).name != 'arcpy':
+        workspace = os.path.join(scratch_dir, 'intermediates')
+        os.makedirs(workspace, exist_ok=True)
+        return workspace
+
+    import arcpy
+
+    workspace = os.path.join(scratch_dir, 'intermediates.gdb')
+    if not arcpy.Exists(workspace):
+        arcpy.management.CreateFileGDB(scratch_dir, 'intermediates.gdb')
+    return workspace
+
+
+def output_path(config_dict, name):
+    """
+    Path to write an analysis output to under the configured policy.
+
+    Args:
+        config_dict (dict): Configuration dictionary.
+        name (str): Output layer name.
+
+    Returns:
+        str: Output path in the project geodatabase, the memory workspace or the scratch workspace.
+    """
+    from analysis.geometry_backend import geometry_backend
+
+    policy = config_dict.get('intermediate_storage', 'destination')
+    current, peak = memory_usage()
+    rss = current if current is not None else peak
+    if policy == 'destination' or name in config_dict.get('persist_layers', DEFAULT_PERSIST):
+        _placements[name] = {'storage': 'destination', 'rss_mb': _mb(rss)}
+        return os.path.join(config_dict['destination'], name)
+
+    if policy == 'memory' and geometry_backend(config_dict).name == 'arcpy':
+        limit = float(config_dict.get('memory_spill_mb', 2048)) * 1024 * 1024
+        if rss is None:
+            _warn_no_memory()
+        if rss is None or rss < limit:
+            _placements[name] = {'storage': 'memory', 'rss_mb': _mb(rss)}
+            return f'{MEMORY_WORKSPACE}\\{name}'
+        logging.warning(f'Resident memory {_mb(rss)} MB is over memory_spill_mb, writing {name} to scratch')
+        _placements[name] = {'storage': 'scratch (spilled)', 'rss_mb': _mb(rss)}
+    else:
+        _placements[name] = {'storage': 'scratch', 'rss_mb': _mb(rss)}
+    return os.path.join(scratch_workspace(config_dict), name)
+
+
+def _warn_no_memory():
+    global _warned_no_memory
+    if not _warned_no_memory:
+        _warned_no_memory = True
+        logging.warning('Resident memory cannot be read on this system (install psutil); '
+                        'memory_spill_mb is not enforced and intermediates stay in memory')
+
+
+def is_persistent(config_dict, path):
+    """True when a path is in the project geodatabase, so it survives the run."""
+    if not isinstance(path, str):
+        return False
+    return os.path.normcase(os.path.dirname(path)) == os.path.normcase(config_dict['destination'])
+
+
+def release(paths):
+    """
+    Deletes intermediates held in the memory workspace once nothing needs them any more.
+
+    Args:
+        paths (list): Output paths; anything not in memory is left alone.
+    """
+    for path in paths or []:
+        if in_memory(path):
+            import arcpy
+
+            arcpy.management.Delete(path)
+            logging.debug(f'Released {path}')
+
+
+def summary():
+    """
+    Returns:
+        dict: Layer name mapped to its storage and the resident memory (MB) when it was written.
+    """
+    return dict(_placements)
+
+
+def _mb(value):
+    return None if value is None else round(value / (1024 * 1024), 1)
@@ -0,0 +1,234 @@
+import copy
+import csv
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import yaml
+
+from Final_Project import BUFFER_LAYERS, buffer_loop, count_at_risk_addresses, erase_avoid_zones, exportMap, \
+    intersect_buffers, setup, spatial_join, spatial_join_to_final
+"""
+Headless batch runner for the West Nile Virus analysis.
+
+Reads a scenario file (see config/scenarios.yaml) where each scenario gives a buffer distance,
+intersect output name, map subtitle and layer list, runs every scenario in its own worker
+process and output geodatabase, and writes a summary table to scenario_results.csv.
+arcpy is only imported inside the functions that run a scenario, so the scenario file can be
+checked with --dry-run on a machine without ArcGIS.
+
+Usage:
+    python scenario_runner.py [path/to/scenarios.yaml] [--dry-run]
+"""
+
+SUMMARY_FIELDS = ['name', 'status', 'distance', 'output_name', 'target_count', 'seconds', 'workspace', 'error']
+
+
+def load_scenarios(path):
+    """
+    Reads and checks the scenario file.
+
+    Args:
+        path (str): Path to the scenario YAML file.
+
+    Returns:
+        tuple: (list of scenario dicts, number of worker processes)
+    """
+    with open(path) as f:
+        scenario_file = yaml.safe_load(f)
+
+    scenarios = scenario_file.get('scenarios', [])
+    names = set()
+    for scenario in scenarios:
+        for key in ('name', 'distance', 'output_name'):
+            if key not in scenario:
+                raise ValueError(f'Scenario {scenario} is missing {key}')
+        if scenario['name'] in names:
+            raise ValueError(f"Duplicate scenario name {scenario['name']}")
+        names.add(scenario['name'])
+        scenario.setdefault('layers', BUFFER_LAYERS)
+        scenario.setdefault('subtitle', None)
+
+    return scenarios, int(scenario_file.get('workers', 2))
+
+
+def scenario_project(config_dict, scenario, workspace, scenario_dir):
+    """
+    Copies the project's .aprx into the scenario folder and points the layers that show
+    analysis outputs at the scenario geodatabase. Each worker then exports its own results
+    from its own project file instead of all of them opening the shared one.
+
+    Args:
+        config_dict (dict): Project configuration dictionary.
+        scenario (dict): Scenario settings.
+        workspace (str): Scenario output geodatabase.
+        scenario_dir (str): Folder for the scenario's files.
+
+    Returns:
+        str: Path of the scenario's .aprx.
+    """
+    import arcpy
+
+    aprx_path = os.path.join(scenario_dir, f"{scenario['name']}.aprx")
+    shutil.copyfile(os.path.join(config_dict['proj_dir'], 'Programming_Lab1.aprx'), aprx_path)
+    # The project's intersect layer is named after the project run's output
+    renames = {config_dict.get('intersect_name'): scenario['output_name']}
+
+    project = arcpy.mp.ArcGISProject(aprx_path)
+    for map_obj in project.listMaps():
+        for layer in map_obj.listLayers():
+            if not layer.supports('DATASOURCE'):
+                continue
+            current = layer.connectionProperties
+            dataset = current.get('dataset')
+            dataset = renames.get(dataset, dataset) if dataset else None
+            if dataset is None or not arcpy.Exists(os.path.join(workspace, dataset)):
+                # Source layers stay on the project geodatabase
+                continue
+            new = copy.deepcopy(current)
+            new['connection_info']['database'] = workspace
+            new['dataset'] = dataset
+            layer.updateConnectionProperties(current, new)
+
+    # A project that has never had a full run has no output layers to repoint
+    map_obj = project.listMaps()[0]
+    for dataset in ('Risk_Zone_Cleaned', 'Target_Addresses'):
+        if not map_obj.listLayers(dataset):
+            map_obj.addDataFromPath(os.path.join(workspace, dataset))
+    project.save()
+    del project
+    return aprx_path
+
+
+def run_scenario(scenario, config_dict):
+    """
+    Runs one scenario end to end in its own output geodatabase. Inputs are still read from
+    the project geodatabase.
+
+    Args:
+        scenario (dict): Scenario settings.
+        config_dict (dict): Project configuration dictionary.
+
+    Returns:
+        dict: One row of the summary table.
+    """
+    start = time.perf_counter()
+    name = scenario['name']
+    scenario_dir = os.path.join(config_dict['proj_dir'], 'scenarios')
+    os.makedirs(scenario_dir, exist_ok=True)
+    workspace = os.path.join(scenario_dir, f'{name}.gdb')
+    result = {'name': name, 'distance': scenario['distance'], 'output_name': scenario['output_name'],
+              'workspace': workspace, 'target_count': None, 'status': 'failed', 'error': ''}
+
+    # basicConfig would do nothing in a reused worker, so each scenario gets its own handler
+    handler = logging.FileHandler(os.path.join(scenario_dir, f'{name}.log'), mode='w')
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+    try:
+        import arcpy
+
+        if not arcpy.Exists(workspace):
+            arcpy.management.CreateFileGDB(scenario_dir, f'{name}.gdb')
+
+        scenario_config = dict(
+            config_dict,
+            destination=workspace,
+            avoid_buffer=os.path.join(config_dict['destination'], 'Avoid_Points_buffer'),
+            parallel_buffers=False,
+            stage_cache=False
+        )
+        arcpy.env.workspace = config_dict['destination']
+        arcpy.env.overwriteOutput = True
+
+        buffer_outputs = buffer_loop(scenario_config, float(scenario['distance']), scenario['layers'])
+        if not buffer_outputs or None in buffer_outputs:
+            raise RuntimeError('buffering failed')
+        intersect_result = intersect_buffers(buffer_outputs, scenario_config, scenario['output_name'])
+        cleaned_result = erase_avoid_zones(intersect_result, scenario_config)
+        joined_result = spatial_join(cleaned_result, scenario_config)
+        result['target_count'] = count_at_risk_addresses(joined_result, cleaned_result, scenario_config)
+        spatial_join_to_final(cleaned_result, scenario_config)
+
+        if scenario['subtitle'] is not None:
+            aprx_path = scenario_project(config_dict, scenario, workspace, scenario_dir)
+            exportMap(scenario_config, scenario['subtitle'], os.path.join(scenario_dir, f'{name}.pdf'), aprx_path)
+
+        result['status'] = 'ok' if result['target_count'] is not None else 'failed'
+    except Exception as e:
+        logging.error(f'Scenario {name} failed: {e}')
+        result['error'] = str(e)
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+
+    result['seconds'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def run_scenarios(scenarios, config_dict, workers):
+    """
+    Runs scenarios in parallel worker processes.
+
+    Args:
+        scenarios (list): Scenario dicts.
+        config_dict (dict): Project configuration dictionary.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Summary rows in scenario file order.
+    """
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_scenario, scenario, config_dict): scenario['name'] for scenario in scenarios}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['name']] = result
+            logging.info(f"Scenario {result['name']}: {result['status']} in {result['seconds']}s")
+            print(f"Finished {result['name']} ({result['status']})")
+    return [results[scenario['name']] for scenario in scenarios]
+
+
+def write_summary(results, path):
+    """
+    Writes the summary table to CSV and prints it.
+
+    Args:
+        results (list): Summary rows.
+        path (str): Output CSV path.
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+    print(f"{'Scenario':<24}{'Status':<8}{'Distance':>10}{'Targets':>10}{'Seconds':>10}")
+    for row in results:
+        targets = '' if row['target_count'] is None else row['target_count']
+        print(f"{row['name']:<24}{row['status']:<8}{row['distance']:>10}{targets:>10}{row['seconds']:>10}")
+
+
+if __name__ == '__main__':
+    try:
+        args = [arg for arg in sys.argv[1:] if arg != '--dry-run']
+        scenario_path = args[0] if args else '../config/scenarios.yaml'
+        scenarios, workers = load_scenarios(scenario_path)
+        if '--dry-run' in sys.argv:
+            for scenario in scenarios:
+                print(f"{scenario['name']}: {scenario['distance']} ft -> {scenario['output_name']}, "
+                      f"layers {', '.join(scenario['layers'])}")
+            sys.exit(0)
+
+        config_dict = setup()
+        logging.info(f'Running {len(scenarios)} scenarios with {workers} workers')
+
+        results = run_scenarios(scenarios, config_dict, workers)
+        write_summary(results, os.path.join(config_dict['proj_dir'], 'scenario_results.csv'))
+    except Exception as e:
+        logging.error(f"An error occurred in scenario_runner: {e}")
+        print("An error occurred. Check the log file for details.")
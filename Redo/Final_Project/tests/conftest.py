@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The project modules import each other from the Final_Project folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_geocoder import ONELINE_PATH, GeocoderSettings, start_server  # noqa: E402
+
+
+@pytest.fixture
+def fake_geocoder():
+    """
+    A local fake Census geocoder answering in about a millisecond.
+
+    Yields:
+        tuple: (GeocoderSettings to change its behaviour mid-test, one-line request URL)
+    """
+    settings = GeocoderSettings(latency_ms=1, seed=1)
+    server, url = start_server(settings)
+    yield settings, url + ONELINE_PATH + '?address=1 Pearl St Boulder CO&benchmark=2020&format=json'
+    server.shutdown()
+    server.server_close()
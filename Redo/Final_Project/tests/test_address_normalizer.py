@@ -0,0 +1,32 @@
+import pytest
+
+from etl.address_normalizer import AddressDeduper, canonical_address
+
+
+@pytest.mark.parametrize('street, expected', [
+    ('123 north Main Street, Apt. 4', '123 N MAIN ST'),
+    ('123 N. Main St.', '123 N MAIN ST'),
+    ('123 North Main', '123 N MAIN'),
+    ('123 N Main', '123 N MAIN'),
+    ('123 North St', '123 NORTH ST'),
+    ('123 West', '123 WEST'),
+    ('123 West Pearl', '123 W PEARL'),
+    ('123 Main St North', '123 MAIN ST N'),
+    ('45 Court', '45 COURT'),
+    ('123 Front St', '123 FRONT ST'),
+    ('  9  West  Pearl  Avenue #2B ', '9 W PEARL AVE'),
+])
+def test_canonical_address(street, expected):
+    assert canonical_address(street) == expected
+    assert canonical_address(expected) == expected
+
+
+def test_deduper_collapses_variants():
+    deduper = AddressDeduper()
+    indexes = [deduper.add(street)[0] for street in
+               ['123 North Main Street', '123 N Main St Apt 4', '9 Pearl St', '123 n. main st.']]
+
+    assert indexes == [0, 0, 1, 0]
+    assert deduper.unique == ['123 N MAIN ST', '9 PEARL ST']
+    assert deduper.originals == ['123 North Main Street', '9 Pearl St']
+    assert deduper.report() == {'rows': 4, 'unique': 2, 'reduction': 0.5}
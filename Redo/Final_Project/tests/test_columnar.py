@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from analysis.columnar import ColumnarReader, MemoryBackend
+
+
+@pytest.fixture
+def columns():
+    rng = np.random.default_rng(7)
+    values = rng.integers(-50, 500, 1000).astype(float).tolist()
+    values[::37] = [None] * len(values[::37])
+    return {'POP': values, 'CLASS': rng.choice(['City', 'Town'], 1000).tolist()}
+
+
+def test_aggregate_matches_numpy(columns):
+    reader = ColumnarReader(None, ['POP'], where_clause="CLASS = 'City' AND POP > 100", chunk_size=64,
+                            backend=MemoryBackend(columns))
+    expected = np.array([v for v, c in zip(columns['POP'], columns['CLASS'])
+                         if v is not None and c == 'City' and v > 100])
+
+    stats = reader.aggregate('POP', ('count', 'sum', 'min', 'max', 'mean'))
+
+    assert stats == {'count': len(expected), 'sum': expected.sum(), 'min': expected.min(),
+                     'max': expected.max(), 'mean': pytest.approx(expected.mean())}
+    assert reader.count() == len(expected)
+    assert (reader.sum('POP'), reader.min('POP'), reader.max('POP')) == \
+        (expected.sum(), expected.min(), expected.max())
+
+
+def test_aggregate_skips_nulls(columns):
+    reader = ColumnarReader(None, ['POP'], backend=MemoryBackend(columns))
+    expected = np.array([v for v in columns['POP'] if v is not None])
+
+    assert reader.aggregate('POP', ('count', 'sum', 'min', 'mean')) == \
+        {'count': len(expected), 'sum': expected.sum(), 'min': expected.min(),
+         'mean': pytest.approx(expected.mean())}
+    assert len(expected) < len(columns['POP'])
+    assert len(reader.arrays()['POP']) == len(expected)
+
+
+def test_null_value_reads_nulls_as_that_value(columns):
+    reader = ColumnarReader(None, ['POP'], backend=MemoryBackend(columns, null_value=0))
+    expected = np.array([0 if v is None else v for v in columns['POP']])
+
+    assert reader.aggregate('POP', ('count', 'sum')) == {'count': 1000, 'sum': expected.sum()}
+
+
+def test_aggregate_with_no_matching_rows(columns):
+    reader = ColumnarReader(None, ['POP'], where_clause='POP > 10000', backend=MemoryBackend(columns))
+
+    assert reader.aggregate('POP', ('count', 'sum', 'min', 'max', 'mean')) == \
+        {'count': 0, 'sum': 0, 'min': None, 'max': None, 'mean': None}
+    assert reader.count() == 0
@@ -0,0 +1,59 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import Final_Project
+from analysis.distance_index import DistanceIndex, near_distances
+from benchmarks import stages
+from benchmarks.synthetic import blob_polygons, generate
+
+
+def brute_near(px, py, points, polygons):
+    """Closest point or polygon, one feature and one edge at a time."""
+    best = min((np.hypot(px - qx, py - qy) for qx, qy in points), default=np.inf)
+    for rings in polygons:
+        inside = False
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+                if (y1 > py) != (y2 > py) and px < x1 + (py - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+                dx, dy = x2 - x1, y2 - y1
+                t = min(1.0, max(0.0, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
+                best = min(best, np.hypot(px - x1 - t * dx, py - y1 - t * dy))
+        if inside:
+            return 0.0
+    return best
+
+
+def test_near_distances_match_brute_force():
+    rng = np.random.default_rng(21)
+    polygons = blob_polygons(rng, 6, 1000.0, 3000.0)
+    coords = np.concatenate([rings[0] for rings in polygons])
+    xmin, ymin = coords.min(axis=0) - 5000
+    xmax, ymax = coords.max(axis=0) + 5000
+    x, y = rng.uniform(xmin, xmax, 400), rng.uniform(ymin, ymax, 400)
+    points = np.column_stack([rng.uniform(xmin, xmax, 30), rng.uniform(ymin, ymax, 30)])
+
+    for features in [(points, []), (np.empty((0, 2)), polygons), (points, polygons)]:
+        expected = [brute_near(px, py, *features) for px, py in zip(x, y)]
+
+        np.testing.assert_allclose(near_distances(x, y, *features), expected)
+
+    assert np.isinf(near_distances(x, y, np.empty((0, 2)), [])).all()
+
+
+@pytest.mark.parametrize('distance', [1500.0, 3000.0])
+def test_distance_sweep_matches_the_numpy_pipeline(tmp_path, distance):
+    state = stages.prepare(generate(2000, seed=3), str(tmp_path / 'ws'), distance)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage in (stages.avoid_buffer, stages.buffer_loop, stages.intersect, stages.erase, stages.spatial_join):
+            stage(None, state)
+        pipeline_count = stages.count_at_risk(None, state)
+
+        curve = Final_Project.distance_sweep(state['config'], [distance])
+
+    assert pipeline_count > 0 and curve == [(distance, pipeline_count)]
+    index = DistanceIndex.load(str(tmp_path / 'Addresses.distances.npz'))
+    assert len(index.oids) == 2000
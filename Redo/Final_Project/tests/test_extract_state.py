@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import threading
+import time
+from collections import Counter
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from analysis.geometry_backend import geometry_backend
+from benchmarks.fake_geocoder import ONELINE_PATH
+from etl.Assignment11_SpatialEtl import GSheetEtl
+from etl.extract_state import ExtractState, row_fingerprint
+
+
+def test_row_fingerprint_ignores_surrounding_whitespace():
+    assert row_fingerprint({'Timestamp': 't1', 'Address': ' 1 Pearl St '}) == \
+        row_fingerprint({'Timestamp': 't1', 'Address': '1 Pearl St'})
+    assert row_fingerprint({'Timestamp': 't1', 'Address': '1 Pearl St'}) != \
+        row_fingerprint({'Timestamp': 't2', 'Address': '1 Pearl St'})
+
+
+def test_diff_counts_duplicate_rows(tmp_path):
+    state = ExtractState(str(tmp_path / 'extract_state.json'))
+    state.fingerprints = ['a', 'b', 'b', 'c']
+
+    added, removed = state.diff(['b', 'b', 'b', 'c', 'd'])
+
+    assert added == Counter({'b': 1, 'd': 1})
+    assert removed == Counter({'a': 1})
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / 'extract_state.json')
+    state = ExtractState(path)
+    assert not state.has_snapshot and state.conditional_headers() == {}
+    state.etag, state.fingerprints, state.points = '"v1"', ['a', 'b'], {'a': [1.0, 2.0]}
+    state.save()
+
+    loaded = ExtractState(path)
+    assert loaded.has_snapshot
+    assert loaded.conditional_headers() == {'If-None-Match': '"v1"'}
+    assert (loaded.fingerprints, loaded.points) == (['a', 'b'], {'a': [1.0, 2.0]})
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    """Serves sheet.csv from tmp_path; yields a function that rewrites it and the sheet URL."""
+    def write(streets, version):
+        path = tmp_path / 'sheet.csv'
+        with open(path, 'w', encoding='utf-8') as sheet_file:
+            sheet_file.write('Timestamp,Address\n')
+            for i, street in enumerate(streets):
+                sheet_file.write(f't{i % 7},{street}\n')
+        # A new Last-Modified for every version, even within the same second
+        stamp = time.time() + version * 10
+        os.utime(path, (stamp, stamp))
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(SimpleHTTPRequestHandler, directory=str(tmp_path)))
+    server.RequestHandlerClass.log_message = lambda *args: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield write, f'http://127.0.0.1:{server.server_address[1]}/sheet.csv'
+    server.shutdown()
+    server.server_close()
+
+
+def test_incremental_runs_match_a_full_run(tmp_path, sheet, fake_geocoder):
+    write, sheet_url = sheet
+    settings, geocoder_url = fake_geocoder
+    workspace = tmp_path / 'ws'
+    workspace.mkdir()
+    config = {'remote_url': sheet_url, 'proj_dir': str(tmp_path), 'data_format': 'csv',
+              'destination': str(workspace),
+              'geocoder_prefix_url': geocoder_url.split(ONELINE_PATH)[0] + ONELINE_PATH,
+              'geocoder_suffix_url': '?&benchmark=2020&format=json', 'geocode_workers': 4,
+              'geometry_backend': 'numpy', 'incremental_extract': True,
+              'http_retries': 0, 'circuit_failure_threshold': 100000}
+    streets = [f'{i} Pearl St' for i in range(1, 200)]
+
+    def run(run_config):
+        with contextlib.redirect_stdout(io.StringIO()):
+            GSheetEtl(run_config).process()
+        return np.sort(geometry_backend(run_config).load('avoid_points')['x'])
+
+    write(streets[:100], 1)
+    run(config)
+    # Rows added and removed, and a third of the new requests fail with HTTP 500
+    write(streets[10:150] + streets[20:25], 2)
+    settings.error_rate = 0.3
+    run(config)
+    assert settings.counts['errors'] > 0
+    settings.error_rate = 0.0
+    incremental = run(config)
+
+    os.remove(tmp_path / 'extract_state.json')
+    full = run(dict(config, incremental_extract=False))
+    assert len(full) > 100
+    np.testing.assert_allclose(incremental, full)
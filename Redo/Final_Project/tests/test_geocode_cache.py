@@ -0,0 +1,60 @@
+import sqlite3
+
+import pytest
+
+from etl import geocode_cache
+from etl.geocode_cache import GeocodeCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'geocode_cache.sqlite')
+
+
+def test_cache_round_trip_and_shared_keys(cache_path):
+    cache = GeocodeCache(cache_path)
+    cache.put('123 North Main Street', (-105.27, 40.01))
+    cache.put('9 Nowhere Rd', None)
+
+    assert cache.get('123 N Main St') == (GeocodeCache.MATCH, (-105.27, 40.01))
+    assert cache.get('9 nowhere road') == (GeocodeCache.NO_MATCH, None)
+    assert cache.get('10 Pearl St') is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+
+def test_cache_ttl_and_size_limit(cache_path, monkeypatch):
+    cache = GeocodeCache(cache_path, ttl_days=1, max_entries=2)
+    now = geocode_cache.time.time()
+    for i in range(4):
+        monkeypatch.setattr(geocode_cache.time, 'time', lambda i=i: now + i)
+        cache.put(f'{i} Pearl St', (i, i))
+
+    assert cache.evict() == 2
+    assert [cache.get(f'{i} Pearl St') is not None for i in range(4)] == [False, False, True, True]
+
+    monkeypatch.setattr(geocode_cache.time, 'time', lambda: now + 2 * 86400)
+    assert cache.get('3 Pearl St') is None
+    assert cache.evict() == 2
+    cache.close()
+
+
+def test_cache_commits_in_batches(cache_path):
+    cache = GeocodeCache(cache_path, commit_every=3)
+    reader = sqlite3.connect(cache_path)
+
+    def stored():
+        return reader.execute('SELECT COUNT(*) FROM geocodes').fetchone()[0]
+
+    cache.put('1 Pearl St', (1, 1))
+    cache.put_many([('2 Pearl St', (2, 2))])
+    assert stored() == 0
+    cache.put('3 Pearl St', None)
+    assert stored() == 3
+    cache.put('4 Pearl St', (4, 4))
+    cache.flush()
+    assert stored() == 4
+    cache.put('5 Pearl St', (5, 5))
+    cache.close()
+    assert stored() == 5
+    reader.close()
@@ -0,0 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from etl.geocoder_client import LATENCY_WINDOW, CircuitOpenError, GeocoderClient
+
+
+def test_retries_transient_errors(fake_geocoder):
+    settings, url = fake_geocoder
+    settings.error_rate = 0.3
+    client = GeocoderClient(retries=10, backoff=0.001, failure_threshold=1000)
+
+    statuses = [client.get(url).status_code for _ in range(20)]
+
+    assert statuses == [200] * 20
+    assert client.stats()['retries'] == settings.counts['errors'] > 0
+    assert client.request_count == settings.counts['oneline']
+
+
+def test_returns_last_error_after_retries(fake_geocoder):
+    settings, url = fake_geocoder
+    settings.error_rate = 1.0
+    client = GeocoderClient(retries=2, backoff=0.001)
+
+    assert client.get(url).status_code == 500
+    assert settings.counts['oneline'] == 3
+
+
+def test_no_rate_limit_by_default(fake_geocoder):
+    _, url = fake_geocoder
+    client = GeocoderClient()
+
+    client.get(url)
+
+    assert client.max_rate is None
+    assert client.stats()['rate'] is None
+
+
+def test_aimd_grows_on_fast_responses_and_halves_on_slow_ones(fake_geocoder):
+    settings, url = fake_geocoder
+    client = GeocoderClient(max_rate=100, max_concurrency=8, target_latency=0.05)
+    assert client.concurrency_limit == 4
+
+    for _ in range(40):
+        client.get(url)
+    grown_limit, grown_rate = client.concurrency_limit, client.rate
+    assert grown_limit > 4 and grown_rate > 50
+
+    settings.latency_ms = 100
+    client.get(url)
+    assert client.concurrency_limit == pytest.approx(grown_limit / 2)
+    assert client.rate == pytest.approx(grown_rate / 2)
+
+
+def test_rate_limiting_backs_off_without_opening_the_circuit(fake_geocoder):
+    settings, url = fake_geocoder
+    settings.rate_limit = 1.0
+    client = GeocoderClient(max_concurrency=8, retries=0, failure_threshold=1)
+
+    statuses = [client.get(url).status_code for _ in range(3)]
+
+    assert statuses == [200, 429, 429]
+    assert client.concurrency_limit < 4
+    client.get(url)
+
+
+def _open_circuit(client, settings, url):
+    settings.error_rate = 1.0
+    for _ in range(client.failure_threshold):
+        assert client.get(url).status_code == 500
+    assert client.circuit_state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.get(url)
+
+
+def test_circuit_opens_and_refuses_without_sending(fake_geocoder):
+    settings, url = fake_geocoder
+    client = GeocoderClient(retries=0, failure_threshold=3, reset_seconds=60)
+
+    _open_circuit(client, settings, url)
+
+    assert settings.counts['oneline'] == 3
+
+
+def test_half_open_circuit_lets_one_trial_request_through(fake_geocoder):
+    settings, url = fake_geocoder
+    client = GeocoderClient(max_concurrency=16, retries=0, failure_threshold=3, reset_seconds=0.2)
+    _open_circuit(client, settings, url)
+    time.sleep(0.25)
+    settings.error_rate = 0.0
+    settings.latency_ms = 200
+    sent = settings.counts['oneline']
+
+    def attempt():
+        try:
+            return client.get(url).status_code
+        except CircuitOpenError:
+            return 'refused'
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        outcomes = list(pool.map(lambda _: attempt(), range(6)))
+
+    assert sorted(map(str, outcomes)) == ['200'] + ['refused'] * 5
+    assert settings.counts['oneline'] == sent + 1
+    # The trial succeeded, so the circuit is closed again
+    assert client.get(url).status_code == 200
+
+
+def test_rate_limited_trial_request_keeps_the_circuit_half_open(fake_geocoder):
+    settings, url = fake_geocoder
+    client = GeocoderClient(max_concurrency=8, retries=0, failure_threshold=3, reset_seconds=0.2)
+    _open_circuit(client, settings, url)
+    assert client.circuit_state == 'open'
+    time.sleep(0.25)
+    settings.error_rate = 0.0
+    # Under 1 token per second the fake geocoder answers every request with 429
+    settings.rate_limit = 0.5
+    limit = client.concurrency_limit
+
+    assert client.get(url).status_code == 429
+    assert client.circuit_state == 'half-open'
+    assert client.concurrency_limit < limit
+
+    settings.rate_limit = 0.0
+    assert client.get(url).status_code == 200
+    assert client.circuit_state == 'closed'
+
+
+def test_failed_trial_request_reopens_the_circuit(fake_geocoder):
+    settings, url = fake_geocoder
+    client = GeocoderClient(retries=0, failure_threshold=3, reset_seconds=0.2)
+    _open_circuit(client, settings, url)
+    time.sleep(0.25)
+
+    assert client.get(url).status_code == 500
+    assert client.circuit_state == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.get(url)
+
+
+def test_latencies_are_bounded(fake_geocoder):
+    _, url = fake_geocoder
+    client = GeocoderClient()
+    client.get(url)
+
+    assert client.latencies.maxlen == LATENCY_WINDOW
+    assert client.stats()['latency_max'] > 0
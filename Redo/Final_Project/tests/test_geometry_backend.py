@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+import pytest
+
+from analysis.geometry_backend import NumpyGeometry
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return NumpyGeometry(str(tmp_path), project_lonlat=False)
+
+
+def test_update_points_adds_and_removes_duplicates(backend):
+    backend.load_points([(1, 1), (2, 2), (2, 2), (3, 3)], 'avoid_points')
+
+    assert backend.update_points('avoid_points', [(4, 4), (2, 2)], [(2, 2), (2, 2), (9, 9)]) == (2, 2)
+
+    data = backend.load('avoid_points')
+    assert sorted(zip(data['x'].tolist(), data['y'].tolist())) == [(1, 1), (2, 2), (3, 3), (4, 4)]
+
+
+def test_contains_honours_the_tolerance(backend):
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]], dtype=float)
+    backend.write_rings([square], 'area')
+    x, y = [5.0, 10.5, 11.5, -0.4], [5.0] * 4
+
+    assert backend.contains('area', x, y).tolist() == [True, False, False, False]
+    assert backend.contains('area', x, y, tolerance=1.0).tolist() == [True, True, False, True]
+
+    backend.buffer('area', 'area_buffer', 2.0)
+    assert backend.contains('area_buffer', x, y).tolist() == [True, True, True, True]
+    assert backend.contains('area_buffer', [12.5, 13.5], [5.0, 5.0], tolerance=1.0).tolist() == [True, False]
+
+
+def test_empty_point_dataset_has_an_empty_extent(backend):
+    backend.load_points([], 'nothing')
+
+    assert backend.extent('nothing') == (math.inf, math.inf, -math.inf, -math.inf)
+
+
+def test_select_writes_join_counts(backend):
+    backend.load_points([(1, 1), (2, 2), (3, 3)], 'addresses')
+
+    backend.select('addresses', [2, 0], 'targets', counts=[3, 1])
+
+    data = backend.load('targets')
+    assert data['x'].tolist() == [3, 1]
+    assert [p['Join_Count'] for p in data['properties']] == [3, 1]
@@ -0,0 +1,40 @@
+import os
+import struct
+
+from analysis.pipeline import _table_files
+
+
+def write_catalog(gdb, names):
+    """A minimal a00000001 system catalog: one row per name, None for a deleted row."""
+    table, offsets = bytearray(b'\0' * 40), []
+    for name in names:
+        if name is None:
+            offsets.append(0)
+            continue
+        encoded = name.encode('utf-8')
+        row = bytes([len(encoded)]) + encoded + struct.pack('<i', 0)
+        offsets.append(len(table))
+        table += struct.pack('<i', len(row)) + row
+    index = struct.pack('<iiii', 3, 1, len(names), 5)
+    index += b''.join(offset.to_bytes(5, 'little') for offset in offsets) + b'\0' * 5 * (1024 - len(names))
+    with open(os.path.join(gdb, 'a00000001.gdbtable'), 'wb') as table_file:
+        table_file.write(table)
+    with open(os.path.join(gdb, 'a00000001.gdbtablx'), 'wb') as index_file:
+        index_file.write(index)
+
+
+def test_table_files_are_found_through_the_catalog(tmp_path):
+    gdb = tmp_path / 'project.gdb'
+    gdb.mkdir()
+    names = ['GDB_SystemCatalog', 'GDB_DBTune', None, 'Addresses_At_Risk', 'Addresses', 'Wetlands']
+    write_catalog(str(gdb), names)
+    for row_id in (4, 5, 6):
+        for suffix in ('gdbtable', 'gdbtablx', 'spx'):
+            (gdb / f'a{row_id:08x}.{suffix}').write_bytes(b'')
+    (gdb / 'a00000005.gdbtable.lock').write_bytes(b'')
+
+    assert sorted(os.path.basename(path) for path in _table_files(str(gdb), 'Addresses')) == \
+        ['a00000005.gdbtable', 'a00000005.gdbtablx', 'a00000005.spx']
+    assert len(_table_files(str(gdb), 'addresses_at_risk')) == 3
+    assert _table_files(str(gdb), 'Lakes') == []
+    assert _table_files(str(tmp_path / 'missing.gdb'), 'Addresses') == []
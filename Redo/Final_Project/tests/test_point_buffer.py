@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from analysis.point_buffer import buffer_union, signed_area
+from analysis.point_in_polygon import points_in_rings
+
+
+@pytest.mark.parametrize('count, distance', [(1, 500.0), (40, 800.0), (300, 400.0)])
+def test_buffer_union_covers_the_circles(count, distance):
+    rng = np.random.default_rng(count)
+    x, y = rng.uniform(0, 10000, count), rng.uniform(0, 10000, count)
+    tolerance = 1.0
+
+    rings = buffer_union(x, y, distance, tolerance)
+
+    assert rings and all(np.array_equal(ring[0], ring[-1]) for ring in rings)
+    sx, sy = rng.uniform(-1000, 11000, 20000), rng.uniform(-1000, 11000, 20000)
+    min_dist = np.min(np.hypot(sx[:, None] - x[None, :], sy[:, None] - y[None, :]), axis=1)
+    # Chords sit up to the tolerance inside the true circles; skip samples that close to an edge
+    clear = np.abs(min_dist - distance) > 2 * tolerance
+    np.testing.assert_array_equal(points_in_rings(sx, sy, rings)[clear], (min_dist <= distance)[clear])
+
+
+def test_overlapping_circles_leave_a_hole():
+    # Six circles around a ring leave an uncovered middle
+    angles = np.arange(6) * np.pi / 3
+    x, y = 1000 * np.cos(angles), 1000 * np.sin(angles)
+
+    rings = buffer_union(x, y, 600.0)
+
+    assert sorted(np.sign(signed_area(ring)) for ring in rings) == [-1, 1]
+    assert not points_in_rings([0.0], [0.0], rings)[0]
+
+
+def test_duplicates_and_empty_input():
+    assert buffer_union([], [], 100.0) == []
+    assert buffer_union([1.0], [1.0], 0.0) == []
+    assert len(buffer_union([5.0, 5.0, 5.2], [5.0, 5.0, 5.0], 100.0)) == 1
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from analysis.point_in_polygon import join_counts, points_in_polygons, points_in_rings
+from benchmarks.synthetic import blob_polygons
+
+
+def brute_inside(px, py, rings):
+    """Even-odd crossing test, one point and one edge at a time."""
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+            if (y1 > py) != (y2 > py) and px < x1 + (py - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def brute_boundary_distance(px, py, rings):
+    best = np.inf
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring[:-1], ring[1:]):
+            dx, dy = x2 - x1, y2 - y1
+            t = min(1.0, max(0.0, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
+            best = min(best, np.hypot(px - x1 - t * dx, py - y1 - t * dy))
+    return best
+
+
+def centred_blob(seed):
+    ring = blob_polygons(np.random.default_rng(seed), 1, 400.0, 900.0)[0][0]
+    return [ring - ring[:-1].mean(axis=0) + 500.0]
+
+
+def square(x0, y0, size, clockwise=False):
+    ring = np.array([[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]], dtype=float)
+    return ring[::-1] if clockwise else ring
+
+
+POLYGONS = [
+    centred_blob(3),
+    [square(0, 0, 1000), square(250, 250, 500, clockwise=True)],
+    [square(-500, -500, 300), square(1200, 1200, 200)],
+]
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(11)
+    return rng.uniform(-1500, 2500, 3000), rng.uniform(-1500, 2500, 3000)
+
+
+@pytest.mark.parametrize('rings', POLYGONS, ids=['blob', 'hole', 'multipart'])
+def test_points_in_rings_matches_brute_force(points, rings):
+    x, y = points
+    expected = np.array([brute_inside(px, py, rings) for px, py in zip(x, y)])
+
+    np.testing.assert_array_equal(points_in_rings(x, y, rings), expected)
+
+
+@pytest.mark.parametrize('rings', POLYGONS, ids=['blob', 'hole', 'multipart'])
+def test_tolerance_takes_in_points_near_the_boundary(points, rings):
+    x, y = points
+    tolerance = 75.0
+    expected = np.array([brute_inside(px, py, rings) or brute_boundary_distance(px, py, rings) <= tolerance
+                         for px, py in zip(x, y)])
+
+    np.testing.assert_array_equal(points_in_rings(x, y, rings, tolerance=tolerance), expected)
+
+
+def test_join_counts_counts_every_polygon(points):
+    x, y = points
+    polygons = [[square(0, 0, 1000)], [square(500, 500, 1000)], [square(3000, 3000, 10)]]
+    expected = sum(np.array([brute_inside(px, py, rings) for px, py in zip(x, y)]).astype(int)
+                   for rings in polygons)
+
+    np.testing.assert_array_equal(join_counts(x, y, polygons), expected)
+    np.testing.assert_array_equal(points_in_polygons(x, y, polygons), expected > 0)
+
+
+def test_empty_input():
+    assert len(points_in_rings([], [], POLYGONS[0])) == 0
+    assert not points_in_polygons([1.0], [1.0], []).any()
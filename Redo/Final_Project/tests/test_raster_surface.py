@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from analysis.raster_surface import distance_transform
+
+
+@pytest.mark.parametrize('density', [0.002, 0.05])
+def test_distance_transform_matches_brute_force(density):
+    rng = np.random.default_rng(13)
+    mask = rng.random((60, 80)) < density
+    mask[0, 0] = True
+    max_cells = 12.5
+    rows, cols = np.nonzero(mask)
+    grid_r, grid_c = np.indices(mask.shape)
+    brute = np.min(np.hypot(grid_r[..., None] - rows, grid_c[..., None] - cols), axis=2)
+
+    result = distance_transform(mask, max_cells)
+
+    near = brute <= max_cells
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result[near], brute[near].astype(np.float32), rtol=1e-6)
+    assert (result[~near] > max_cells).all()
+
+
+def test_distance_transform_without_features():
+    assert np.isinf(distance_transform(np.zeros((5, 7), dtype=bool), 3)).all()
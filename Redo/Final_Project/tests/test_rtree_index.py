@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from analysis.point_in_polygon import points_in_rings
+from analysis.rtree_index import PointRTree
+from benchmarks.synthetic import SIZE, XMIN, YMIN, blob_polygons
+
+
+@pytest.fixture
+def tree_points():
+    rng = np.random.default_rng(5)
+    x, y = rng.uniform(XMIN, XMIN + SIZE, 5000), rng.uniform(YMIN, YMIN + SIZE, 5000)
+    oids = np.arange(100, 100 + len(x))
+    return oids, x, y, PointRTree.build(oids, x, y)
+
+
+def test_envelope_query_matches_brute_force(tree_points):
+    oids, x, y, tree = tree_points
+    for dx, dy, width, height in [(5000, 10000, 12000, 3000), (-50, -50, 60, SIZE), (45000, 45000, SIZE, SIZE)]:
+        xmin, ymin, xmax, ymax = XMIN + dx, YMIN + dy, XMIN + dx + width, YMIN + dy + height
+        brute = oids[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+
+        np.testing.assert_array_equal(np.sort(tree.envelope_query(xmin, ymin, xmax, ymax)), brute)
+
+
+@pytest.mark.parametrize('tolerance', [0.0, 120.0])
+def test_polygon_query_matches_a_full_scan(tree_points, tolerance):
+    oids, x, y, tree = tree_points
+    for rings in blob_polygons(np.random.default_rng(9), 5, 1500.0, 6000.0):
+        brute = oids[points_in_rings(x, y, rings, tolerance)]
+
+        np.testing.assert_array_equal(np.sort(tree.polygon_query(rings, tolerance)), brute)
+
+
+def test_nearest_matches_sorted_distances(tree_points):
+    oids, x, y, tree = tree_points
+    for qx, qy in [(XMIN + 25000, YMIN + 25000), (XMIN - 300, YMIN + 60000), (x[17], y[17])]:
+        dist = np.hypot(x - qx, y - qy)
+        order = np.argsort(dist, kind='stable')[:8]
+
+        result = tree.nearest(qx, qy, k=8)
+
+        np.testing.assert_allclose([d for d, _ in result], dist[order])
+        assert [oid for _, oid in result] == oids[order].tolist()
+
+
+def test_empty_tree():
+    tree = PointRTree.build(np.array([], dtype=np.int64), np.array([]), np.array([]))
+
+    assert len(tree.envelope_query(0, 0, 10, 10)) == 0
+    assert len(tree.polygon_query([np.array([[0, 0], [10, 0], [10, 10], [0, 0]], dtype=float)])) == 0
+    assert tree.nearest(0, 0, k=3) == []
+
+
+def test_saved_tree_keeps_its_fingerprint(tree_points, tmp_path):
+    oids, x, y, _ = tree_points
+    fingerprint = {'count': '5000', 'extent': '[1.0, 2.0, 3.0, 4.0]', 'checksum': '"a=b"'}
+    path = str(tmp_path / 'Addresses.rtree.npz')
+    PointRTree.build(oids, x, y, fingerprint=fingerprint).save(path)
+
+    loaded = PointRTree.load(path)
+
+    assert loaded.fingerprint == fingerprint
+    np.testing.assert_array_equal(np.sort(loaded.envelope_query(XMIN, YMIN, XMIN + 5000, YMIN + 5000)),
+                                  oids[(x <= XMIN + 5000) & (y <= YMIN + 5000)])
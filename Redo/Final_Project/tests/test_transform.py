@@ -0,0 +1,59 @@
+import contextlib
+import io
+
+import pytest
+
+from benchmarks.fake_geocoder import ONELINE_PATH
+from etl.Assignment11_SpatialEtl import GSheetEtl
+
+
+@pytest.fixture
+def transform_run(tmp_path, fake_geocoder):
+    """Yields a function that geocodes the given streets with GSheetEtl.transform."""
+    settings, url = fake_geocoder
+    streets_csv = tmp_path / 'addresses.csv'
+
+    def run(streets, workers, **options):
+        with open(streets_csv, 'w', encoding='utf-8') as csv_file:
+            csv_file.write('Timestamp,Address\n')
+            csv_file.writelines(f't,{street}\n' for street in streets)
+        etl = GSheetEtl({'remote_url': 'unused', 'proj_dir': str(tmp_path), 'data_format': 'csv',
+                         'destination': str(tmp_path),
+                         'geocoder_prefix_url': url.split(ONELINE_PATH)[0] + ONELINE_PATH,
+                         'geocoder_suffix_url': '?&benchmark=2020&format=json', 'geocode_workers': workers, **options})
+        etl.local_path = str(streets_csv)
+        with contextlib.redirect_stdout(io.StringIO()):
+            etl.transform()
+        return etl
+
+    yield settings, run
+
+
+def test_concurrent_transform_keeps_input_order(transform_run):
+    settings, run = transform_run
+    streets = [f'{i} Pearl St' for i in range(1, 81)]
+    serial = run(streets, workers=1)
+    # Random latencies so the requests finish out of order
+    settings.latency, settings.latency_ms = 'uniform', 10
+
+    pooled = run(streets, workers=8)
+
+    assert [address for address, _, _ in pooled.geocode_results] == [s + ' Boulder CO' for s in streets]
+    assert pooled.geocode_results == serial.geocode_results
+    assert pooled.points == serial.points
+    assert 0 < len(pooled.points) < len(streets)
+
+
+def test_normalized_transform_sends_addresses_as_typed(transform_run):
+    settings, run = transform_run
+    settings.match_rate = 1.0
+    sent = []
+    original_locate = settings.locate
+    settings.locate = lambda address: sent.append(address) or original_locate(address)
+    streets = ['123 North St', '123 north st.', '45 West Pearl Street', '45 W Pearl St Apt 2']
+
+    etl = run(streets, workers=2, normalize_addresses=True)
+
+    assert sorted(sent) == ['123 North St Boulder CO', '45 West Pearl Street Boulder CO']
+    assert [address for address, _, _ in etl.geocode_results] == [s + ' Boulder CO' for s in streets]
+    assert etl.points[0] == etl.points[1] and etl.points[2] == etl.points[3]
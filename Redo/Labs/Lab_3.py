@@ -46,7 +46,7 @@ def buffer_layer(layer_name, distance_ft, config_dict):
     return output_path
 
 #Loop through layers
-def buffer_loop(config_dict):
+def buffer_loop(config_dict, distance=None):
     layers = [
         "Mosquito_Larval_Sites",
         "Wetlands",
@@ -54,10 +54,9 @@ def buffer_loop(config_dict):
         "OSMP_Properties"
     ]
 
-    while True:
+    while distance is None:
         try:
             distance = float(input("Enter buffer distance in feet for all layers: "))
-            break
         except ValueError:
             print("Please enter a valid number.")
 
@@ -72,15 +71,17 @@ def buffer_loop(config_dict):
     return buffer_outputs
 
 #Intersect Analysis
-def intersect_buffers(buffer_outputs, config_dict):
+def intersect_buffers(buffer_outputs, config_dict, output_name=None):
 
-    response = input('Would you like to intersect the buffered layers?(yes/no): ').strip().lower()
+    # Only ask when running interactively
+    if output_name is None:
+        response = input('Would you like to intersect the buffered layers?(yes/no): ').strip().lower()
 
-    if response not in ['yes', 'y']:
-        print ('Okie dokie pardner!')
-        exit()
+        if response not in ['yes', 'y']:
+            print ('Okie dokie pardner!')
+            exit()
 
-    output_name = input("Enter name for the intersect output layer: ")
+        output_name = input("Enter name for the intersect output layer: ")
     output_path = os.path.join(config_dict['destination'], output_name)
 
     logging.info("Running intersect on buffer layers...")
@@ -141,7 +142,7 @@ def erase_avoid_zones(intersect_fc, config_dict):
     logging.debug('Analysis Complete!')
     return output_path
 
-def exportMap(config_dict):
+def exportMap(config_dict, subtitle=None):
     logging.debug("Entered exportMap function")
 
     # Get project
@@ -152,7 +153,8 @@ def exportMap(config_dict):
     lyt = aprx.listLayouts()[0]
 
     # Ask for user subtitle
-    subtitle = input("Enter a subtitle for your map layout: ")
+    if subtitle is None:
+        subtitle = input("Enter a subtitle for your map layout: ")
 
     # Update the title element
     for elm in lyt.listElements("TEXT_ELEMENT"):
@@ -195,8 +197,8 @@ def main(config_dict):
     map_obj = project.listMaps()[0]
 
     # Run geoprocessing
-    buffer_outputs = buffer_loop(config_dict)
-    intersect_result = intersect_buffers(buffer_outputs, config_dict)
+    buffer_outputs = buffer_loop(config_dict, config_dict.get('buffer_distance'))
+    intersect_result = intersect_buffers(buffer_outputs, config_dict, config_dict.get('intersect_name'))
     cleaned_result = erase_avoid_zones(intersect_result, config_dict)
     joined_result = spatial_join(cleaned_result, config_dict)
     count_at_risk_addresses(joined_result)
@@ -225,7 +227,7 @@ if __name__ == '__main__':
     print(config_dict)
     etl(config_dict)
     main(config_dict)
-    exportMap(config_dict)
+    exportMap(config_dict, config_dict.get('map_subtitle'))
 
 
 
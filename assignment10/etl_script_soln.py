@@ -1,13 +1,22 @@
 import arcpy
-import requests
 import csv
 import json
+import os
+import sys
+
+# Reuse the pooled, rate limited geocoder client from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Redo', 'Final_Project'))
+from etl.geocoder_client import GeocoderClient
+
+client = GeocoderClient()
+# Set CENSUS_GEOCODER_HOST to load test against Final_Project/benchmarks/fake_geocoder.py
+GEOCODER_HOST = os.environ.get('CENSUS_GEOCODER_HOST', 'https://geocoding.geo.census.gov')
 
 def extract():
     print("Extracting addresses from google form spreadsheet")
     #file = urllib.request.urlopen("https://docs.google.com/spreadsheets/d/e/2PACX-1vTaJ_1xRhGQAOSITkgn_C1wfPSnPX0BA37XuftlXVfVrpjfj4J3BHPu1soGeUtNt3XjLI1G_HT2Fy69/pub?output=csv")
 
-    r = requests.get("https://docs.google.com/spreadsheets/d/e/2PACX-1vTaJ_1xRhGQAOSITkgn_C1wfPSnPX0BA37XuftlXVfVrpjfj4J3BHPu1soGeUtNt3XjLI1G_HT2Fy69/pub?output=csv")
+    r = client.get("https://docs.google.com/spreadsheets/d/e/2PACX-1vTaJ_1xRhGQAOSITkgn_C1wfPSnPX0BA37XuftlXVfVrpjfj4J3BHPu1soGeUtNt3XjLI1G_HT2Fy69/pub?output=csv")
     r.encoding = "utf-8"
     data = r.text
     with open(r"C:\Users\David Neufeld\Downloads\addresses.csv", "w") as output_file:
@@ -24,9 +33,9 @@ def transform():
         for row in csv_dict:
             address = row["Street Address"] + " Boulder CO"
             print(address)
-            geocode_url = "https://geocoding.geo.census.gov/geocoder/locations/onelineaddress?address=" + address + "&benchmark=2020&format=json"
+            geocode_url = GEOCODER_HOST + "/geocoder/locations/onelineaddress?address=" + address + "&benchmark=2020&format=json"
             print(geocode_url)
-            r = requests.get(geocode_url)
+            r = client.get(geocode_url)
 
             resp_dict = r.json()
             x = resp_dict['result']['addressMatches'][0]['coordinates']['x']
@@ -59,4 +68,5 @@ def load():
 if __name__ == "__main__":
     extract()
     transform()
-    load()
\ No newline at end of file
+    load()
+    print(client.stats())
\ No newline at end of file
@@ -1,12 +1,21 @@
 import arcpy
-import requests
 import csv
+import os
+import sys
+
+# Reuse the pooled, rate limited geocoder client from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Redo', 'Final_Project'))
+from etl.geocoder_client import GeocoderClient
+
+client = GeocoderClient()
+# Set CENSUS_GEOCODER_HOST to load test against Final_Project/benchmarks/fake_geocoder.py
+GEOCODER_HOST = os.environ.get('CENSUS_GEOCODER_HOST', 'https://geocoding.geo.census.gov')
 
 arcpy.env.overwriteOutput = True
 
 def extract():
 
-    r = requests.get('https://docs.google.com/spreadsheets/d/e/2PACX-1vTDjitOlmILea7koCORJkq6QrUcwBJM7K3vy4guXB0mU_nWR6wsPn136bpH6ykoUxyYMW7wTwkzE37l/pub?output=csv')
+    r = client.get('https://docs.google.com/spreadsheets/d/e/2PACX-1vTDjitOlmILea7koCORJkq6QrUcwBJM7K3vy4guXB0mU_nWR6wsPn136bpH6ykoUxyYMW7wTwkzE37l/pub?output=csv')
     r.encoding = ('utf-8')
     data = r.text
     with open(r'C:\Users\benlj\OneDrive\Documents\School\SpringSemester2025\ProgrammingForGIS\addresses.csv', 'w') as output_file:
@@ -21,9 +30,9 @@ def transform():
         for row in csv_dist:
             address = row['Street Address'] + "Boulder CO"
             print(address)
-            geocode_url = "https://geocoding.geo.census.gov/geocoder/locations/onelineaddress" + \
+            geocode_url = GEOCODER_HOST + "/geocoder/locations/onelineaddress" + \
               f"?address={address}&benchmark=2020&format=json"
-            r = requests.get(geocode_url)
+            r = client.get(geocode_url)
 
             resp_dict = r.json()
             x = resp_dict['result']['addressMatches'][0]['coordinates']['x']
@@ -49,3 +58,4 @@ if __name__ == '__main__':
     extract()
     transform()
     load()
+    print(client.stats())